@@ -27,7 +27,7 @@ EOF
 
 chown --recursive www-data:www-data /giphouse/
 
-echo "Starting uwsgi server."
+echo "Starting uwsgi server and task worker."
 uwsgi --chdir=/giphouse/src/website \
     --module=giphousewebsite.wsgi:application \
     --master --pidfile=/tmp/project-master.pid \
@@ -44,4 +44,5 @@ uwsgi --chdir=/giphouse/src/website \
     --ignore-sigpipe \
     --ignore-write-errors \
     --disable-write-exception \
-    --enable-threads
+    --enable-threads \
+    --attach-daemon="./manage.py run_task_worker"
@@ -0,0 +1,14 @@
+from courses.models import Course
+
+
+class CourseCacheMiddleware:
+    """Cache the courses that are looked up by name for the duration of every request."""
+
+    def __init__(self, get_response):
+        """Create the middleware."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle the request with the course cache."""
+        with Course.objects.cache_lookups():
+            return self.get_response(request)
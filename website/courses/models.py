@@ -1,5 +1,10 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.core.validators import FileExtensionValidator, MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 
@@ -14,19 +19,53 @@ def max_value_current_year(value):
 
 
 class CourseManager(models.Manager):
-    """Manager for the Course model."""
+    """
+    Manager for the Course model.
+
+    Courses looked up by name are cached within cache_lookups, which the CourseCacheMiddleware enters for every
+    request, as the courses rarely change but are looked up for every registration in some places. The cache is not
+    shared between requests, so a course changed by another process is never served stale. It is cleared when a
+    course is saved or deleted.
+    """
+
+    # The cached courses of the current request, by database alias and name, or None outside of cache_lookups
+    _cache = ContextVar("courses", default=None)
+
+    @contextmanager
+    def cache_lookups(self):
+        """Cache the courses looked up by name within this context."""
+        token = self._cache.set({})
+        try:
+            yield
+        finally:
+            self._cache.reset(token)
+
+    def get_by_name(self, name):
+        """Get a course by its name, from the cache if it was looked up before within cache_lookups."""
+        cache = self._cache.get()
+        if cache is None:
+            return self.get(name=name)
+        if (self.db, name) not in cache:
+            cache[(self.db, name)] = self.get(name=name)
+        return cache[(self.db, name)]
+
+    def clear_cache(self):
+        """Clear the cached courses."""
+        cache = self._cache.get()
+        if cache is not None:
+            cache.clear()
 
     def se(self):
         """Create Software Engineering course."""
-        return self.get(name="Software Engineering")
+        return self.get_by_name("Software Engineering")
 
     def sdm(self):
         """Create System Development Management course."""
-        return self.get(name="System Development Management")
+        return self.get_by_name("System Development Management")
 
     def sde(self):
         """Create Software Development Entrepreneurship course."""
-        return self.get(name="Software Development Entrepreneurship")
+        return self.get_by_name("Software Development Entrepreneurship")
 
 
 class Course(models.Model):
@@ -41,6 +80,12 @@ class Course(models.Model):
         return f"{self.name}"
 
 
+@receiver([post_save, post_delete], sender=Course)
+def handle_course_change(**kwargs):
+    """Clear the cached courses when a course is saved or deleted."""
+    Course.objects.clear_cache()
+
+
 class SemesterManager(models.Manager):
     """Manager for the Semester model."""
 
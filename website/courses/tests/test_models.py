@@ -4,6 +4,7 @@ from django.utils import timezone
 
 from freezegun import freeze_time
 
+from courses.middleware import CourseCacheMiddleware
 from courses.models import Course, Lecture, Semester, current_year, get_slides_filename, max_value_current_year
 
 
@@ -81,3 +82,43 @@ class ModelTest(TestCase):
     @freeze_time("2018-09-09")
     def test_create_current_semester_fall(self):
         self.assertEqual(Semester.objects.get_or_create_current_semester().season, Semester.FALL)
+
+    def test_course_cache(self):
+        with Course.objects.cache_lookups(), self.assertNumQueries(1):
+            se = Course.objects.se()
+            self.assertEqual(Course.objects.se(), se)
+            self.assertEqual(se.name, "Software Engineering")
+
+    def test_course_cache__outside_of_cache_lookups(self):
+        with self.assertNumQueries(2):
+            Course.objects.se()
+            Course.objects.se()
+
+    def test_course_cache_cleared_on_save(self):
+        with Course.objects.cache_lookups():
+            sdm = Course.objects.sdm()
+            sdm.name = "System Development Management"
+            sdm.save()
+            with self.assertNumQueries(1):
+                Course.objects.sdm()
+
+    def test_course_cache_cleared_on_delete(self):
+        with Course.objects.cache_lookups():
+            Course.objects.sde().delete()
+            with self.assertRaises(Course.DoesNotExist):
+                Course.objects.sde()
+            Course.objects.create(name="Software Development Entrepreneurship")
+            self.assertEqual(Course.objects.sde().name, "Software Development Entrepreneurship")
+
+    def test_course_cache_middleware(self):
+        def get_response(request):
+            Course.objects.sdm()
+            return Course.objects.sdm()
+
+        middleware = CourseCacheMiddleware(get_response)
+        sdm = Course.objects.get(name="System Development Management")
+        with self.assertNumQueries(1):
+            self.assertEqual(middleware(None), sdm)
+        # Every request has its own cache
+        with self.assertNumQueries(1):
+            middleware(None)
@@ -0,0 +1,19 @@
+import random
+import string
+
+from faker import Faker
+from faker.providers import address, company, date_time, internet, lorem, person
+
+fake = Faker()
+fake.add_provider(date_time)
+fake.add_provider(company)
+fake.add_provider(person)
+fake.add_provider(address)
+fake.add_provider(lorem)
+fake.add_provider(internet)
+
+
+def generate_fake_github_username(rng=random):
+    """Generate a random username that isn't an existing Github username, with the given random generator."""
+    # Entropy should ensure we do not use real Github usernames (26 + 26 + 10)^39 = ~2^232
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=39))
@@ -8,11 +8,10 @@ from django.db.models import Count
 from django.utils import timezone
 from django.utils.text import slugify
 
-from faker import Faker
-from faker.providers import address, company, date_time, internet, lorem, person
-
 from courses.models import Course, Lecture, Semester
 
+from giphousewebsite.fake_data import fake, generate_fake_github_username
+
 
 from mailing_lists.models import ExtraEmailAddress, MailingList, MailingListAlias, MailingListCourseSemesterLink
 
@@ -34,14 +33,6 @@ from room_reservation.models import Reservation, Room
 
 User: Employee = get_user_model()
 
-fake = Faker()
-fake.add_provider(date_time)
-fake.add_provider(company)
-fake.add_provider(person)
-fake.add_provider(address)
-fake.add_provider(lorem)
-fake.add_provider(internet)
-
 DEFAULTS = {
     "lecture": 8,
     "project": 5,
@@ -180,12 +171,6 @@ class Command(BaseCommand):
                 is_archived=archived,
             )
 
-    @staticmethod
-    def generate_fake_github_username():
-        """Generate a random username that isn't an existing Github username."""
-        # Entropy should ensure we do not use real Github usernames (26 + 26 + 10)^39 = ~2^232
-        return "".join(random.choices(string.ascii_letters + string.digits, k=39))
-
     @staticmethod
     def generate_partner_preference(semester):
         """Generate a partner preference string of a full name, full name with typo, random string or None value."""
@@ -212,7 +197,7 @@ class Command(BaseCommand):
             first_name=fake.first_name(),
             last_name=fake.last_name(),
             github_id=random.randint(1, 999_999),
-            github_username=self.generate_fake_github_username(),
+            github_username=generate_fake_github_username(),
             student_number=fake.bothify("s#######"),
         )
         project = Project.objects.order_by("?").first()
@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'courses.middleware.CourseCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'giphousewebsite.urls'
@@ -189,3 +190,34 @@ BLEACH_ALLOWED_ATTRIBUTES = {
 
 BLEACH_STRIP_TAGS = True
 BLEACH_STRIP_COMMENTS = False
+
+# Run long tasks, such as the automatic team assignment, in the task worker (manage.py run_task_worker) instead of in
+# a thread of the web server process.
+TASK_WORKER_ENABLED = False
+
+# The seconds between the heartbeats of a running task, and after which a task without heartbeat is failed, because
+# the worker running it stopped.
+TASK_WORKER_HEARTBEAT_INTERVAL = 30
+TASK_WORKER_STALE_AFTER = 300
+
+# The number of projects that are synced to GitHub concurrently, and of requests that list the GitHub organization at
+# the same time. With more than one worker, changes on GitHub are still made one at a time, to respect GitHub's
+# secondary rate limits.
+GITHUB_SYNC_WORKERS = 1
+
+# The number of days after which `manage.py sync_github --changed` syncs a project again, even if it did not change.
+GITHUB_SYNC_RECONCILE_DAYS = 7
+
+# The number of requests that `manage.py sync_github --async` makes at the same time to list the GitHub organization.
+GITHUB_SYNC_CONCURRENT_REQUESTS = 8
+
+# Default parameters of the CP-SAT solver used for the automatic team assignment.
+# These can be overridden per run from the employee admin.
+TEAM_ASSIGNMENT_SOLVER_PARAMETERS = {
+    "num_search_workers": 8,
+    "max_time_in_seconds": 180.0,
+    "relative_gap_limit": 0.0,
+    "random_seed": 0,
+    "deterministic": False,
+    "log_search_progress": False,
+}
@@ -70,6 +70,11 @@ LOGGING = {
             'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
+        'tasks': {
+            'handlers': ['console', 'file'],
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }
 
@@ -82,6 +87,9 @@ STATIC_URL = '/static/'
 MEDIA_ROOT = '/giphouse/media/'
 MEDIA_URL = '/media/'
 
+# The task worker runs next to uWSGI, see resources/entrypoint.sh
+TASK_WORKER_ENABLED = True
+
 # GitHub App Settings
 DJANGO_GITHUB_CLIENT_ID = os.environ['DJANGO_GITHUB_CLIENT_ID']
 DJANGO_GITHUB_CLIENT_SECRET = os.environ['DJANGO_GITHUB_CLIENT_SECRET']
@@ -90,6 +98,7 @@ DJANGO_GITHUB_SYNC_APP_ID = os.environ['DJANGO_GITHUB_SYNC_APP_ID']
 DJANGO_GITHUB_SYNC_APP_PRIVATE_KEY_BASE64 = os.environ['DJANGO_GITHUB_SYNC_APP_PRIVATE_KEY_BASE64']
 DJANGO_GITHUB_SYNC_APP_PRIVATE_KEY = base64.urlsafe_b64decode(DJANGO_GITHUB_SYNC_APP_PRIVATE_KEY_BASE64)
 DJANGO_GITHUB_SYNC_APP_INSTALLATION_ID = os.environ['DJANGO_GITHUB_SYNC_APP_INSTALLATION_ID']
+GITHUB_SYNC_WORKERS = 4
 
 # GSuite service account credentials
 GSUITE_ADMIN_USER = os.environ["DJANGO_GSUITE_ADMIN_USER"]
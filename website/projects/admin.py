@@ -18,7 +18,7 @@ from mailing_lists.models import MailingList
 
 from projects.forms import ProjectAdminForm, RepositoryInlineForm
 from projects.githubsync import GitHubSync
-from projects.models import Client, Project, Repository
+from projects.models import Client, Project, ProjectSyncState, Repository
 
 from registrations.models import Employee
 
@@ -122,6 +122,7 @@ class ProjectAdmin(admin.ModelAdmin):
             num_archived += Repository.objects.filter(
                 is_archived=Repository.Archived.NOT_ARCHIVED, project=project
             ).update(is_archived=Repository.Archived.PENDING)
+        ProjectSyncState.mark_changed(queryset)
         messages.success(
             request,
             f"Succesfully archived {num_archived} repositories.",
@@ -5,3 +5,7 @@ class ProjectsConfig(AppConfig):
     """AppConfig for projects app."""
 
     name = "projects"
+
+    def ready(self):
+        """Connect the signals that record which projects have to be synced to GitHub."""
+        from projects import signals  # noqa: F401
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import re
+import ssl
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from github import BadCredentialsException, GithubException, RateLimitExceededException, UnknownObjectException
+from github.NamedUser import NamedUser
+from github.Repository import Repository as GitHubRepository
+from github.Team import Team
+
+from projects.githubsync import GitHubSync, InstallationTokenAuth, OrganizationSnapshot
+
+
+class AsyncGitHubClient:
+    """
+    Make GET requests to the GitHub REST API with asyncio, over a pool of persistent HTTP connections.
+
+    At most `concurrency` requests are made at the same time, each on its own connection, and the connections are
+    kept open for the next requests. The requests authenticate with the current access token of the talker and are
+    scheduled within the rate limits by its scheduler. Failing requests raise the same exceptions as PyGithub.
+    """
+
+    NEXT_PAGE = re.compile(r'<([^>]+)>;\s*rel="next"')
+    USER_AGENT = "giphousewebsite"
+
+    def __init__(self, talker, concurrency):
+        """
+        Create a client for the API of a talker.
+
+        :param talker: The GitHubAPITalker to get the access token, the base url and the scheduler from
+        :param concurrency: The maximal number of requests, and of open connections, at the same time
+        """
+        self.auth = InstallationTokenAuth(talker)
+        base_url = urlsplit(talker.base_url)
+        self.https = base_url.scheme == "https"
+        self.netloc = base_url.netloc
+        self.host = base_url.hostname
+        self.port = base_url.port or (443 if self.https else 80)
+        self.base_path = base_url.path.rstrip("/")
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._connections = []  # the open connections that are not used by a request
+        self._send = talker.scheduler.schedule_async(self._request)
+
+    async def _open(self):
+        """Open a new connection to GitHub."""
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=ssl.create_default_context() if self.https else None
+        )
+
+    def _path(self, url):
+        """Get the path of an API url, or of an absolute url like the links to the next pages."""
+        if not url.startswith("http"):
+            return f"{self.base_path}{url}"
+        url = urlsplit(url)
+        return f"{url.path}?{url.query}" if url.query else url.path
+
+    async def _request(self, verb, url):
+        """Make a request, and return its status, headers and output like a PyGithub requester."""
+        # Reading the token renews it when it is about to expire, which is a short blocking request every few minutes
+        head = (
+            f"{verb} {self._path(url)} HTTP/1.1\r\n"
+            f"Host: {self.netloc}\r\n"
+            f"Authorization: {self.auth.token_type} {self.auth.token}\r\n"
+            "Accept: application/vnd.github+json\r\n"
+            f"User-Agent: {self.USER_AGENT}\r\n\r\n"
+        )
+        async with self._semaphore:
+            while True:
+                reused = bool(self._connections)
+                reader, writer = self._connections.pop() if reused else await self._open()
+                try:
+                    writer.write(head.encode())
+                    await writer.drain()
+                    status, headers, output, keep_alive = await self._read_response(reader)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if not reused:
+                        raise
+                    # GitHub closed the connection while it was not used, so make the request on a new one
+                except BaseException:
+                    writer.close()
+                    raise
+
+        if keep_alive:
+            self._connections.append((reader, writer))
+        else:
+            writer.close()
+        return status, headers, output
+
+    @staticmethod
+    async def _read_response(reader):
+        """Read a response, and return its status, headers, output and whether the connection can be reused."""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("The connection was closed before a response was sent")
+        version, status = status_line.decode("latin-1").split()[:2]
+
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                body += await reader.readexactly(size)
+                await reader.readline()
+            await reader.readline()
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), headers, body.decode(), keep_alive
+
+    @staticmethod
+    def _check(status, headers, output):
+        """Return the headers and data of a successful response, or raise the exception PyGithub would raise."""
+        data = json.loads(output) if output else None
+        if status < 400:
+            return headers, data
+        if status == 401:
+            raise BadCredentialsException(status, data, headers)
+        if status == 404:
+            raise UnknownObjectException(status, data, headers)
+        if status in (403, 429) and "rate limit" in output.lower():
+            raise RateLimitExceededException(status, data, headers)
+        raise GithubException(status, data, headers)
+
+    async def get(self, url):
+        """Get a resource, and return the headers and data of the response."""
+        return self._check(*await self._send("GET", url))
+
+    async def get_all(self, url):
+        """Get all pages of a list, following the links to the next pages."""
+        items = []
+        while url is not None:
+            headers, data = await self.get(url)
+            items += data
+            next_page = self.NEXT_PAGE.search(headers.get("link", ""))
+            url = next_page.group(1) if next_page else None
+        return items
+
+    async def close(self):
+        """Close the open connections."""
+        connections, self._connections = self._connections, []
+        for _, writer in connections:
+            writer.close()
+            await writer.wait_closed()
+
+
+class AsyncOrganizationSnapshot(OrganizationSnapshot):
+    """
+    An OrganizationSnapshot that lists the organization with asyncio.
+
+    The members, repositories and teams of the organization are listed at the same time, and then the members and
+    repositories of all synced teams. The listed objects are complete, so reading their attributes while planning
+    never makes another request.
+    """
+
+    def __init__(self, talker, team_ids, workers=1):
+        """
+        List the organization, with at most GITHUB_SYNC_CONCURRENT_REQUESTS requests at the same time.
+
+        :param talker: The GitHubAPITalker to list the organization with and to pass everything else on to
+        :param team_ids: The ids of the teams of which the members and repositories are listed
+        :param workers: Not used, as the requests are made concurrently by one event loop
+        :except: GithubException when listing fails
+        """
+        self.talker = talker
+        self.workers = workers
+        # The objects use the requester of the organization, which authenticates with the renewed token as well
+        self.requester = talker.github_organization._requester
+        asyncio.run(self._list({int(team_id) for team_id in team_ids if team_id is not None}))
+
+    async def _list(self, team_ids):
+        """List everything with a client of which the connections are closed afterwards."""
+        client = AsyncGitHubClient(self.talker, settings.GITHUB_SYNC_CONCURRENT_REQUESTS)
+        try:
+            await self._list_with(client, team_ids)
+        finally:
+            await client.close()
+
+    async def _list_with(self, client, team_ids):
+        """List everything with the client."""
+        organization = f"/orgs/{self.talker.organization_name}"
+        admins, members, repos, teams = await asyncio.gather(
+            client.get_all(f"{organization}/members?role=admin&per_page=100"),
+            client.get_all(f"{organization}/members?role=member&per_page=100"),
+            client.get_all(f"{organization}/repos?per_page=100"),
+            client.get_all(f"{organization}/teams?per_page=100"),
+        )
+
+        self.users = {}
+        self.roles = {}
+        for role, users in (("admin", admins), ("member", members)):
+            for user in users:
+                self.users[user["id"]] = self._complete(NamedUser, user)
+                self.roles[user["id"]] = role
+        self.repos = {repo["id"]: self._complete(GitHubRepository, repo) for repo in repos}
+        self.teams = {team["id"]: self._complete(Team, team) for team in teams}
+
+        team_ids = sorted(team_ids.intersection(self.teams))
+        team_lists = await asyncio.gather(
+            *(client.get_all(f"/teams/{team_id}/members?per_page=100") for team_id in team_ids),
+            *(client.get_all(f"/teams/{team_id}/repos?per_page=100") for team_id in team_ids),
+        )
+        self.team_members = {
+            team_id: [self._complete(NamedUser, user) for user in users]
+            for team_id, users in zip(team_ids, team_lists[: len(team_ids)])
+        }
+        self.team_repo_permissions = {
+            team_id: {repo["id"]: self._complete(GitHubRepository, repo).permissions for repo in repos}
+            for team_id, repos in zip(team_ids, team_lists[len(team_ids) :])
+        }
+
+    def _complete(self, github_class, data):
+        """Create a complete PyGithub object from the data of a response."""
+        return github_class(self.requester, {}, data, completed=True)
+
+
+class AsyncGitHubSync(GitHubSync):
+    """
+    Sync with GitHub, listing the organization with asyncio over pooled connections.
+
+    Everything else works like the GitHubSync, including the progress of the task and the counters: the changes are
+    planned from the listed organization, and then applied one at a time.
+    """
+
+    snapshot_class = AsyncOrganizationSnapshot
@@ -1,19 +1,54 @@
 import logging
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import partial
 
 from django.conf import settings
+from django.db import IntegrityError, connection
 from django.urls import reverse
-
-from github import Auth, Github, GithubException, GithubIntegration, UnknownObjectException
-
-from projects.models import ProjectToBeDeleted, Repository, RepositoryToBeDeleted
+from django.utils import timezone
+
+from github import Auth, Consts, Github, GithubException, GithubIntegration, UnknownObjectException
+from github.NamedUser import NamedUser
+from github.Repository import Repository as GitHubRepository
+from github.Team import Team
+
+from projects.models import (
+    GitHubResponseCache,
+    ProjectSyncState,
+    ProjectToBeDeleted,
+    Repository,
+    RepositoryToBeDeleted,
+)
+from projects.ratelimits import RequestScheduler
 
 from registrations.models import Employee
 
 from tasks.models import Task
 
 
+class InstallationTokenAuth(Auth.Auth):
+    """
+    Authenticate the requests of PyGithub with the current access token of a GitHubAPITalker.
+
+    The token is read for every request, so the PyGithub objects of a long sync keep working after it is renewed.
+    """
+
+    token_type = "token"
+
+    def __init__(self, talker):
+        """Authenticate with the access token of a talker."""
+        self.talker = talker
+
+    @property
+    def token(self):
+        """Get a valid access token."""
+        return self.talker.access_token
+
+
 class GitHubAPITalker:
     """Communicate with GitHub API v3."""
 
@@ -23,6 +58,7 @@ class GitHubAPITalker:
         self._organization = None  # the organization to sync with
         self.installation_id = settings.DJANGO_GITHUB_SYNC_APP_INSTALLATION_ID
         self.organization_name = settings.DJANGO_GITHUB_SYNC_ORGANIZATION_NAME
+        self.base_url = Consts.DEFAULT_BASE_URL
 
         self._github = Github()  # used to talk to GitHub as our own app
 
@@ -39,18 +75,32 @@ class GitHubAPITalker:
             self._gi = None
 
         self._logger = logging.getLogger("django.github")
+        self.scheduler = RequestScheduler()  # schedules the requests of every organization within the rate limits
+        # The talker is shared by the workers of a concurrent sync, which must not renew the token at the same time.
+        # Creating the organization gets the token within the lock.
+        self._token_lock = threading.RLock()
 
     @property
-    def github_service(self):
-        """Get a valid Github service instance (API endpoint) to make calls to."""
-        self.renew_access_token_if_required()
-        return self._github
+    def github_organization(self):
+        """
+        Get the Github Organization to make calls to.
+
+        The organization is created once, and its requests are scheduled within the rate limits. It, and every
+        PyGithub object it creates, authenticates with the current access token, so objects that are kept during a
+        long sync keep working when the token is renewed.
+        """
+        with self._token_lock:
+            if self._organization is None:
+                self._github = Github(auth=InstallationTokenAuth(self), base_url=self.base_url, per_page=100)
+                self._organization = self._github.get_organization(self.organization_name)
+                self.scheduler.install(self._organization._requester)
+        return self._organization
 
     @property
-    def github_organization(self):
-        """Get a valid Github Organization to make calls to."""
+    def access_token(self):
+        """Get a valid access token."""
         self.renew_access_token_if_required()
-        return self._organization
+        return self._access_token.token
 
     def renew_access_token_if_required(self):
         """
@@ -60,14 +110,12 @@ class GitHubAPITalker:
         Access tokens are valid for only 10 minutes and must be recreated afterwards. A timedelta of 60 seconds is used
         to renew access tokens that are not longer than 60 seconds valid. Hence, all methods that require the access
         token are assumed to not take longer than 60 seconds.
-        Also set the organization to use while syncing.
 
         :except: GithubException when requesting a new access token fails
         """
-        if self._access_token is None or self._access_token.expires_at < datetime.now() + timedelta(seconds=60):
-            self._access_token = self._gi.get_access_token(self.installation_id)
-            self._github = Github(self._access_token.token)
-            self._organization = self._github.get_organization(self.organization_name)
+        with self._token_lock:
+            if self._access_token is None or self._access_token.expires_at < datetime.now() + timedelta(seconds=60):
+                self._access_token = self._gi.get_access_token(self.installation_id)
 
     def create_team(self, project):
         """
@@ -90,13 +138,51 @@ class GitHubAPITalker:
         """
         return self.github_organization.create_repo(name=repo.name, private=repo.private)
 
+    def get_conditionally(self, url, github_class):
+        """
+        Get a resource from GitHub with a conditional request, and reuse the previous response if it did not change.
+
+        The ETag and Last-Modified headers of every response are stored in the database with its data. If GitHub
+        answers the next request for the resource with 304 Not Modified, which does not count against the rate
+        limit, the stored data is used.
+
+        :param url: The API url of the resource
+        :param github_class: The PyGithub class of the resource
+        :return: The resource as an instance of github_class
+        :except: GithubException when the request fails
+        """
+        requester = self.github_organization._requester
+        cached = GitHubResponseCache.objects.filter(url=url).first()
+        headers = {}
+        if cached is not None and cached.etag:
+            headers[Consts.REQ_IF_NONE_MATCH] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers[Consts.REQ_IF_MODIFIED_SINCE] = cached.last_modified
+
+        response_headers, data = requester.requestJsonAndCheck("GET", url, headers=headers)
+        if data is None:
+            # A 304 Not Modified response has no body
+            return github_class(requester, {}, cached.data, completed=True)
+
+        values = {
+            "etag": response_headers.get(Consts.RES_ETAG, ""),
+            "last_modified": response_headers.get(Consts.RES_LAST_MODIFIED, ""),
+            "data": data,
+        }
+        try:
+            GitHubResponseCache.objects.update_or_create(url=url, defaults=values)
+        except IntegrityError:
+            # Another worker stored the same resource at the same time
+            GitHubResponseCache.objects.filter(url=url).update(**values)
+        return github_class(requester, response_headers, data, completed=True)
+
     def get_team(self, team_id):
         """Get a team from the GiPHouse GitHub organization."""
-        return self.github_organization.get_team(team_id)
+        return self.get_conditionally(f"/teams/{team_id}", Team)
 
     def get_user(self, user_id):
         """Get a user from GitHub."""
-        return self.github_service.get_user_by_id(user_id)
+        return self.get_conditionally(f"/user/{user_id}", NamedUser)
 
     def get_role_of_user(self, user):
         """Get the role of a user in the GiPHouse GitHub organization."""
@@ -104,23 +190,399 @@ class GitHubAPITalker:
 
     def get_repo(self, repo_id):
         """Get a repo from GitHub."""
-        return self.github_service.get_repo(repo_id)
+        return self.get_conditionally(f"/repositories/{repo_id}", GitHubRepository)
 
     def remove_user(self, user):
         """Remove a user from the GiPHouse GitHub organization."""
         self.github_organization.remove_from_members(user)
 
+    def get_team_members(self, team):
+        """Get the members of a team."""
+        return team.get_members()
+
+    def is_team_member(self, team, user):
+        """Check whether a user is a member of a team."""
+        return team.has_in_members(user)
+
+    def team_has_repo(self, team, repo):
+        """Check whether a team has access to a repository."""
+        return team.has_in_repos(repo)
+
+    def get_team_repo_permission(self, team, repo):
+        """Get the permissions of a team for a repository."""
+        return team.get_repo_permission(repo)
+
+
+class OrganizationSnapshot:
+    """
+    The members, teams and repositories of the GiPHouse GitHub organization, listed once at the start of a sync.
+
+    The snapshot answers the same questions as the GitHubAPITalker, but from memory, so the number of requests of a
+    sync depends on the number of changes instead of the number of employees. Only the members and repositories of
+    the teams that are synced are listed. Anything that is not in the snapshot, and every change, is passed on to the
+    talker. The snapshot is not updated by the changes of the sync, as every team is only synced once per sync.
+    """
+
+    def __init__(self, talker, team_ids, workers=1):
+        """
+        List the organization members with their roles, the teams and the repositories with paginated requests.
+
+        With more than one worker, the lists are requested concurrently by a pool of worker threads: first those of
+        the organization, and then the members and repositories of the synced teams.
+
+        :param talker: The GitHubAPITalker to list the organization with and to pass everything else on to
+        :param team_ids: The ids of the teams of which the members and repositories are listed
+        :param workers: The number of lists to request concurrently
+        :except: GithubException when listing fails
+        """
+        self.talker = talker
+        self.workers = workers
+        organization = talker.github_organization
+
+        admins, members, repos, teams = self._map(
+            list,
+            [
+                organization.get_members(role="admin"),
+                organization.get_members(role="member"),
+                organization.get_repos(),
+                organization.get_teams(),
+            ],
+        )
+        self.users = {}
+        self.roles = {}
+        for role, users in (("admin", admins), ("member", members)):
+            for user in users:
+                self.users[user.id] = user
+                self.roles[user.id] = role
+
+        self.repos = {repo.id: repo for repo in repos}
+        self.teams = {team.id: team for team in teams}
+        team_ids = sorted({int(team_id) for team_id in team_ids if team_id is not None}.intersection(self.teams))
+        team_lists = self._map(
+            list,
+            [self.teams[team_id].get_members() for team_id in team_ids]
+            + [self.teams[team_id].get_repos() for team_id in team_ids],
+        )
+        self.team_members = dict(zip(team_ids, team_lists[: len(team_ids)]))
+        self.team_repo_permissions = {
+            team_id: {repo.id: repo.permissions for repo in repos}
+            for team_id, repos in zip(team_ids, team_lists[len(team_ids) :])
+        }
+
+    def _map(self, function, items):
+        """Call a function for every item and return the results, concurrently if there is more than one worker."""
+        if self.workers == 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="github-snapshot") as executor:
+            return list(executor.map(function, items))
+
+    def create_team(self, project):
+        """Create a team in GitHub for a project."""
+        return self.talker.create_team(project)
+
+    def create_repo(self, repo):
+        """Create a repository in GitHub for a project."""
+        return self.talker.create_repo(repo)
+
+    def remove_user(self, user):
+        """Remove a user from the GiPHouse GitHub organization."""
+        self.talker.remove_user(user)
+
+    def get_team(self, team_id):
+        """Get a team from the snapshot, or from GitHub if it was not listed."""
+        team = self.teams.get(int(team_id))
+        return team if team is not None else self.talker.get_team(team_id)
+
+    def get_user(self, user_id):
+        """Get an organization member from the snapshot, or any other user from GitHub."""
+        user = self.users.get(int(user_id))
+        return user if user is not None else self.talker.get_user(user_id)
+
+    def get_repo(self, repo_id):
+        """Get a repository of the organization from the snapshot, or from GitHub if it was not listed."""
+        repo = self.repos.get(int(repo_id))
+        return repo if repo is not None else self.talker.get_repo(repo_id)
+
+    def get_role_of_user(self, user):
+        """Get the role of an organization member from the snapshot, or from GitHub if it was not listed."""
+        role = self.roles.get(user.id)
+        return role if role is not None else self.talker.get_role_of_user(user)
+
+    def get_team_members(self, team):
+        """Get the members of a team from the snapshot, or from GitHub if they were not listed."""
+        members = self.team_members.get(team.id)
+        return members if members is not None else self.talker.get_team_members(team)
+
+    def is_team_member(self, team, user):
+        """Check whether a user is a member of a team, in the snapshot if the members were listed."""
+        if team.id not in self.team_members:
+            return self.talker.is_team_member(team, user)
+        return any(member.id == user.id for member in self.team_members[team.id])
+
+    def team_has_repo(self, team, repo):
+        """Check whether a team has access to a repository, in the snapshot if its repositories were listed."""
+        if team.id not in self.team_repo_permissions:
+            return self.talker.team_has_repo(team, repo)
+        return repo.id in self.team_repo_permissions[team.id]
+
+    def get_team_repo_permission(self, team, repo):
+        """Get the permissions of a team for a repository, from the snapshot if its repositories were listed."""
+        permissions = self.team_repo_permissions.get(team.id, {}).get(repo.id)
+        return permissions if permissions is not None else self.talker.get_team_repo_permission(team, repo)
+
+
+class GraphQLOrganizationSnapshot(OrganizationSnapshot):
+    """
+    An OrganizationSnapshot that is loaded with a few paginated GraphQL queries.
+
+    With the REST API, every team needs its own requests for its members and its repositories. The GraphQL API
+    returns all teams with their first members and repositories, including the permission of the team and whether
+    the repository is archived, in one query per 100 teams. Only the teams with more than 100 members or
+    repositories need more queries.
+    """
+
+    REPOSITORY_FIELDS = "databaseId name nameWithOwner owner { login } isPrivate isArchived"
+    TEAM_MEMBERS = (
+        "members(first: 100, after: $cursor) { pageInfo { hasNextPage endCursor } "
+        "edges { node { databaseId login } } }"
+    )
+    TEAM_REPOSITORIES = (
+        "repositories(first: 100, after: $cursor) { pageInfo { hasNextPage endCursor } "
+        f"edges {{ permission node {{ {REPOSITORY_FIELDS} }} }} }}"
+    )
+
+    MEMBERS_QUERY = """
+        query($organization: String!, $cursor: String) {
+            organization(login: $organization) {
+                membersWithRole(first: 100, after: $cursor) {
+                    pageInfo { hasNextPage endCursor }
+                    edges { role node { databaseId login } }
+                }
+            }
+        }
+    """
+    REPOSITORIES_QUERY = f"""
+        query($organization: String!, $cursor: String) {{
+            organization(login: $organization) {{
+                repositories(first: 100, after: $cursor) {{
+                    pageInfo {{ hasNextPage endCursor }}
+                    edges {{ node {{ {REPOSITORY_FIELDS} }} }}
+                }}
+            }}
+        }}
+    """
+    TEAMS_QUERY = f"""
+        query($organization: String!, $cursor: String) {{
+            organization(login: $organization) {{
+                teams(first: 100, after: $cursor) {{
+                    pageInfo {{ hasNextPage endCursor }}
+                    edges {{
+                        node {{
+                            databaseId slug name description
+                            {TEAM_MEMBERS.replace(", after: $cursor", "")}
+                            {TEAM_REPOSITORIES.replace(", after: $cursor", "")}
+                        }}
+                    }}
+                }}
+            }}
+        }}
+    """
+    TEAM_QUERY = """
+        query($organization: String!, $slug: String!, $cursor: String) {
+            organization(login: $organization) { team(slug: $slug) { %s } }
+        }
+    """
+
+    def __init__(self, talker, team_ids, workers=1):
+        """
+        Load the organization members with their roles, the repositories and the teams with GraphQL queries.
+
+        With more than one worker, the members, repositories and teams are queried concurrently, and then the pages
+        after the first of the members and repositories of the synced teams.
+
+        :param talker: The GitHubAPITalker to query the organization with and to pass everything else on to
+        :param team_ids: The ids of the teams of which the members and repositories are kept
+        :param workers: The number of queries to run concurrently
+        :except: GithubException when a query fails
+        """
+        self.talker = talker
+        self.workers = workers
+        self.requester = talker.github_organization._requester
+        organization = {"organization": talker.organization_name}
+
+        members, repos, teams = self._map(
+            lambda args: self._paginate(*args),
+            [
+                (self.MEMBERS_QUERY, organization, "membersWithRole"),
+                (self.REPOSITORIES_QUERY, organization, "repositories"),
+                (self.TEAMS_QUERY, organization, "teams"),
+            ],
+        )
+        self.users = {}
+        self.roles = {}
+        for edge in members:
+            self.users[edge["node"]["databaseId"]] = self._user(edge["node"])
+            self.roles[edge["node"]["databaseId"]] = edge["role"].lower()
+
+        self.repos = {edge["node"]["databaseId"]: self._repo(edge["node"]) for edge in repos}
+
+        team_ids = {int(team_id) for team_id in team_ids if team_id is not None}
+        self.teams = {edge["node"]["databaseId"]: self._team(edge["node"]) for edge in teams}
+        nodes = [edge["node"] for edge in teams if edge["node"]["databaseId"] in team_ids]
+        team_lists = self._map(
+            lambda args: self._rest_of_team(*args),
+            [(node, "members") for node in nodes] + [(node, "repositories") for node in nodes],
+        )
+        self.team_members = {}
+        self.team_repo_permissions = {}
+        for node, members, repos in zip(nodes, team_lists[: len(nodes)], team_lists[len(nodes) :]):
+            self.team_members[node["databaseId"]] = [self._user(member["node"]) for member in members]
+            self.team_repo_permissions[node["databaseId"]] = {
+                repo["node"]["databaseId"]: self._repo(repo["node"], repo["permission"]).permissions for repo in repos
+            }
+
+    def _rest_of_team(self, node, field):
+        """Get the edges of the members or repositories of a team, of the first page and of the pages after it."""
+        query = self.TEAM_QUERY % {"members": self.TEAM_MEMBERS, "repositories": self.TEAM_REPOSITORIES}[field]
+        team = {"organization": self.talker.organization_name, "slug": node["slug"]}
+        return self._rest_of(node[field], query, team, "team", field)
+
+    def _query(self, query, variables):
+        """Run a GraphQL query, and return its data."""
+        headers, data = self.requester.requestJsonAndCheck(
+            "POST", "/graphql", input={"query": query, "variables": variables}
+        )
+        if data.get("errors"):
+            raise GithubException(200, data["errors"], headers)
+        return data["data"]
+
+    def _paginate(self, query, variables, *path, cursor=None):
+        """Run a query for every page of a connection, and return the edges of all pages."""
+        edges = []
+        while True:
+            connection = self._query(query, {**variables, "cursor": cursor})["organization"]
+            for name in path:
+                connection = connection[name]
+            edges += connection["edges"]
+            if not connection["pageInfo"]["hasNextPage"]:
+                return edges
+            cursor = connection["pageInfo"]["endCursor"]
+
+    def _rest_of(self, connection, query, variables, *path):
+        """Get the edges of the first page of a nested connection, and of the pages after it."""
+        if not connection["pageInfo"]["hasNextPage"]:
+            return connection["edges"]
+        return connection["edges"] + self._paginate(
+            query, variables, *path, cursor=connection["pageInfo"]["endCursor"]
+        )
+
+    def _user(self, node):
+        """Create a PyGithub user from a GraphQL user."""
+        data = {
+            "id": node["databaseId"],
+            "login": node["login"],
+            "url": f"{self.talker.base_url}/users/{node['login']}",
+        }
+        return NamedUser(self.requester, {}, data, completed=True)
+
+    def _repo(self, node, permission=None):
+        """Create a PyGithub repository from a GraphQL repository, with the permission of a team if given."""
+        data = {
+            "id": node["databaseId"],
+            "name": node["name"],
+            "full_name": node["nameWithOwner"],
+            # PyGithub identifies a repository by the login of its owner and its name in the requests of a team
+            "owner": {
+                "login": node["owner"]["login"],
+                "url": f"{self.talker.base_url}/users/{node['owner']['login']}",
+            },
+            "private": node["isPrivate"],
+            "archived": node["isArchived"],
+            "url": f"{self.talker.base_url}/repos/{node['nameWithOwner']}",
+        }
+        if permission is not None:
+            data["permissions"] = {
+                "admin": permission == "ADMIN",
+                "push": permission in ("ADMIN", "MAINTAIN", "WRITE"),
+                "pull": True,
+            }
+        return GitHubRepository(self.requester, {}, data, completed=True)
+
+    def _team(self, node):
+        """Create a PyGithub team from a GraphQL team."""
+        data = {
+            "id": node["databaseId"],
+            "slug": node["slug"],
+            "name": node["name"],
+            "description": node["description"],
+            "url": f"{self.talker.base_url}/teams/{node['databaseId']}",
+        }
+        return Team(self.requester, {}, data, completed=True)
+
+
+class PlannedChange:
+    """A change to GitHub, or to the synced objects in Django, that is planned by a GitHubSync."""
+
+    TEAM = "team"
+    REPOSITORY = "repository"
+    MEMBERSHIP = "membership"
+    PERMISSION = "permission"
+    ARCHIVE = "archive"
+    REMOVAL = "removal"
+
+    # The kinds of changes in the order in which they are applied, so a team or repository exists before its members
+    # and permissions are changed, and everything is removed last
+    KINDS = [TEAM, REPOSITORY, MEMBERSHIP, PERMISSION, ARCHIVE, REMOVAL]
+
+    def __init__(self, kind, description, apply, counter=None, subject=None, on_github=True):
+        """
+        Create a planned change.
+
+        :param kind: The kind of change, one of KINDS
+        :param description: A description of the change, which is logged when it is applied
+        :param apply: A function without arguments that applies the change
+        :param counter: The counter of the GitHubSync to increment when the change is applied
+        :param subject: The object that the change is about, changes that are not on GitHub are skipped when an
+        earlier change of their subject failed
+        :param on_github: Whether the change itself is a request to GitHub, instead of a change in Django or a change
+        that plans its requests when it is applied
+        """
+        self.kind = kind
+        self.description = description
+        self.apply = apply
+        self.counter = counter
+        self.subject = subject
+        self.on_github = on_github
+
+    def __str__(self):
+        """Return the description of the change."""
+        return self.description
+
 
 class GitHubSync:
-    """Sync with GitHub."""
+    """
+    Sync with GitHub.
+
+    A sync is done in two phases. First, every project is compared with GitHub to plan the changes that have to be
+    made, which only reads from GitHub. Then, the planned changes are applied, one kind at a time. When a method of
+    the sync is called outside of planning, the changes it finds are applied right away.
+    """
+
+    # The minimal number of seconds between two changes on GitHub, when projects are synced concurrently
+    MUTATION_INTERVAL = 1.0
+
+    # The class that loads the organization at the start of a sync
+    snapshot_class = GraphQLOrganizationSnapshot
 
-    def __init__(self, projects):
+    def __init__(self, projects, workers=None):
         """
         Create a GitHub Sync with given projects.
 
         :param projects: An iterable of all projects that should be synced
+        :param workers: The number of projects to plan concurrently, defaults to settings.GITHUB_SYNC_WORKERS
         """
         self.projects = projects
+        self.workers = workers or settings.GITHUB_SYNC_WORKERS
         self.logger = logging.getLogger("django.github")
         self.fail = False
         self.teams_created = 0
@@ -129,8 +591,16 @@ class GitHubSync:
         self.users_invited = 0
         self.users_removed = 0
         self.github = talker
+        self.plan = []
+        self._planning = threading.local()  # the changes planned by the current thread, if it is planning
+        self._counter_lock = threading.Lock()
+        self._mutation_lock = threading.Lock()
+        self._last_mutation = 0.0
+        self._active_employees = None
+        self._active_employees_lock = threading.Lock()
+        # Every project is a step of the progress, and applying the plan is the last step
         self.task = Task.objects.create(
-            total=len(self.projects), completed=0, redirect_url=reverse("admin:projects_project_changelist")
+            total=len(self.projects) + 1, completed=0, redirect_url=reverse("admin:projects_project_changelist")
         )
 
     def error(self, msg):
@@ -146,6 +616,77 @@ class GitHubSync:
         """Log an info message."""
         self.logger.info(msg)
 
+    def count(self, counter):
+        """Increment one of the counters of the sync, which can be done by multiple workers at the same time."""
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @contextmanager
+    def mutating(self):
+        """
+        Make requests that change something on GitHub within this context.
+
+        GitHub's secondary rate limits ask to make changes one at a time and to pause between them. When projects are
+        synced concurrently, the changes of all workers are made one at a time and at least MUTATION_INTERVAL seconds
+        apart. Requests that only read from GitHub are not limited.
+        """
+        if self.workers == 1:
+            yield
+            return
+
+        with self._mutation_lock:
+            time.sleep(max(0.0, self._last_mutation + self.MUTATION_INTERVAL - time.monotonic()))
+            try:
+                yield
+            finally:
+                self._last_mutation = time.monotonic()
+
+    @property
+    def planning(self):
+        """Whether the current thread is planning changes instead of applying them."""
+        return getattr(self._planning, "changes", None) is not None
+
+    def change(self, kind, description, apply, counter=None, subject=None, on_github=True):
+        """
+        Make a change, or add it to the plan when planning.
+
+        The arguments are those of a PlannedChange.
+
+        :return: What applying the change returned, or None when the change is planned
+        """
+        change = PlannedChange(kind, description, apply, counter=counter, subject=subject, on_github=on_github)
+        if self.planning:
+            self._planning.changes.append(change)
+            return None
+        return self.apply(change)
+
+    def apply(self, change):
+        """Apply a change, and log and count it if it is a change on GitHub."""
+        if not change.on_github:
+            return change.apply()
+
+        with self.mutating():
+            result = change.apply()
+        self.info(change.description)
+        if change.counter is not None:
+            self.count(change.counter)
+        return result
+
+    @staticmethod
+    def _save(instance, **values):
+        """Change fields of an object and save only those fields, so the object is not marked as changed."""
+        for name, value in values.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=list(values))
+
+    def _create_team(self, project_team):
+        """Create the GitHub team of a project, and save its id."""
+        self._save(project_team, github_team_id=self.github.create_team(project_team).id)
+
+    def _create_repo(self, project_repo):
+        """Create a GitHub repository, and save its id."""
+        self._save(project_repo, github_repo_id=self.github.create_repo(project_repo).id)
+
     def sync_team_member(self, employee, project):
         """
         Add a employee to a GitHub team for a project, if not already in the team.
@@ -159,13 +700,33 @@ class GitHubSync:
             github_team = self.github.get_team(project.github_team_id)
 
             github_employee = self.github.get_user(employee.github_id)
-            if not github_team.has_in_members(github_employee):
-                github_team.add_membership(github_employee, role="member")
-                self.users_invited += 1
-                self.info(f"Invited {employee.get_full_name()} to team {github_team.name}")
+            if not self.github.is_team_member(github_team, github_employee):
+                self.change(
+                    PlannedChange.MEMBERSHIP,
+                    f"Invite {employee.get_full_name()} to team {github_team.name}",
+                    partial(github_team.add_membership, github_employee, role="member"),
+                    counter="users_invited",
+                )
                 return True
         return False
 
+    def sync_team_members(self, project_team):
+        """
+        Invite the employees of a project to its GitHub team, and remove everyone else from the team.
+
+        :param project_team: The project to sync the members of
+        """
+        for employee in project_team.get_employees():
+            try:
+                self.sync_team_member(employee, project_team)
+            except (GithubException, AssertionError):
+                self.error(f"Something went wrong syncing {employee} with the GitHub team for '{project_team}'.")
+
+        try:
+            self.remove_users_not_in_team(project_team)
+        except (GithubException, AssertionError):
+            self.error(f"Something went wrong while removing unwanted users from GitHub team for '{project_team}'.")
+
     def create_or_update_team(self, project_team):
         """
         Create a GitHub team for a project, or update it if already existing.
@@ -176,12 +737,26 @@ class GitHubSync:
         """
         if project_team.github_team_id is None:
             try:
-                project_team.github_team_id = self.github.create_team(project_team).id
-                self.info(f"Created team {project_team.name}")
-                self.teams_created += 1
-                project_team.save()
+                self.change(
+                    PlannedChange.TEAM,
+                    f"Create team {project_team.name}",
+                    partial(self._create_team, project_team),
+                    counter="teams_created",
+                    subject=project_team,
+                )
             except (GithubException, AssertionError):
                 self.error(f"Something went wrong creating the project team for '{project_team}'.")
+
+            if self.planning:
+                # The members of a new team can only be compared once the team exists
+                self.change(
+                    PlannedChange.MEMBERSHIP,
+                    f"Invite the employees of {project_team} to its new team",
+                    partial(self.sync_team_members, project_team),
+                    subject=project_team,
+                    on_github=False,
+                )
+                return
         else:
             try:
                 self.update_team(project_team)  # if this fails, we might have a problem with the github_team_id
@@ -191,47 +766,72 @@ class GitHubSync:
                     f"github_team_id still belong to a valid team on GitHub?"
                 )
 
-        for employee in project_team.get_employees():
-            try:
-                self.sync_team_member(employee, project_team)
-            except (GithubException, AssertionError):
-                self.error(f"Something went wrong syncing {employee} with the GitHub team for '{project_team}'.")
+        self.sync_team_members(project_team)
 
-        try:
-            self.remove_users_not_in_team(project_team)
-        except (GithubException, AssertionError):
-            self.error(f"Something went wrong while removing unwanted users from GitHub team for '{project_team}'.")
+    def active_employees(self):
+        """
+        Get the GitHub usernames of the employees of all projects that are not archived, also those not synced now.
+
+        These employees are invited to the team of their project by a sync, so they must not be removed from the
+        organization when they are removed from the team of another project. A sync of only the changed projects must
+        not remove the employees of the projects that did not change either.
+        """
+        with self._active_employees_lock:
+            if self._active_employees is None:
+                self._active_employees = set(
+                    Employee.objects.filter(
+                        registration__projects__repository__is_archived=Repository.Archived.NOT_ARCHIVED
+                    ).values_list("github_username", flat=True)
+                )
+            return self._active_employees
 
     def remove_users_not_in_team(self, project):
         """
         Remove all GitHub users from a GitHub team that are not employees of a project.
 
+        Users are also removed from the organization, unless they are an admin or an employee of another project
+        that is not archived. The removals are applied after the invites, so removing someone who moved to another
+        project from the organization would undo their invite.
+
         :param project: The project to use
         """
         github_team = self.github.get_team(project.github_team_id)
         employee_list = [r[0] for r in project.get_employees().values_list("github_username")]
 
-        for github_user in github_team.get_members():
+        for github_user in self.github.get_team_members(github_team):
             if github_user.login not in employee_list:
                 try:
-                    if self.github.get_role_of_user(github_user) != "admin":  # Prevent removing organization owners
-                        self.github.remove_user(github_user)
-                        self.info(f"Removed {github_user.name} from team {github_team.name} and the organization.")
+                    if self.github.get_role_of_user(github_user) == "admin":  # Prevent removing organization owners
+                        self.change(
+                            PlannedChange.REMOVAL,
+                            f"Remove {github_user.login} from team {github_team.name} but not from the organization, "
+                            f"because {github_user.login} is an admin",
+                            partial(github_team.remove_membership, github_user),
+                            counter="users_removed",
+                        )
+                    elif github_user.login in self.active_employees():
+                        self.change(
+                            PlannedChange.REMOVAL,
+                            f"Remove {github_user.login} from team {github_team.name} but not from the organization, "
+                            f"because {github_user.login} is an employee of another project",
+                            partial(github_team.remove_membership, github_user),
+                            counter="users_removed",
+                        )
                     else:
-                        github_team.remove_membership(github_user)
-                        self.info(
-                            f"Removed {github_user.name} from team {github_team.name} but not from the organization, "
-                            f"because {github_user.name} is an admin"
+                        self.change(
+                            PlannedChange.REMOVAL,
+                            f"Remove {github_user.login} from team {github_team.name} and the organization",
+                            partial(self.github.remove_user, github_user),
+                            counter="users_removed",
                         )
-                    self.users_removed += 1
                 except GithubException:
-                    self.error(f"Something went wrong while removing {github_user.name} from team {github_team.name}")
+                    self.error(f"Something went wrong while removing {github_user.login} from team {github_team.name}")
 
     def remove_team(self, project):
         """Remove a team for a project from GitHub and remove all employees of the project from the organization."""
         github_team = self.github.get_team(project.github_team_id)
 
-        for github_user in github_team.get_members():
+        for github_user in self.github.get_team_members(github_team):
             try:
                 employee = Employee.objects.get(github_username=github_user.login, github_id=github_user.id)
             except Employee.DoesNotExist:
@@ -244,14 +844,16 @@ class GitHubSync:
                 )
             ):  # Prevent removing organization owners and employees that are still active in a different team
                 try:
-                    self.github.remove_user(github_user)
-                    self.users_removed += 1
-                    self.info(f"Removed {github_user.name} from the organization")
+                    self.change(
+                        PlannedChange.REMOVAL,
+                        f"Remove {github_user.login} from the organization",
+                        partial(self.github.remove_user, github_user),
+                        counter="users_removed",
+                    )
                 except GithubException:
-                    self.error(f"Something went wrong while removing {github_user.name} from team {github_team.name}")
+                    self.error(f"Something went wrong while removing {github_user.login} from team {github_team.name}")
         try:
-            github_team.delete()
-            self.info(f"Removed team {github_team.name}")
+            self.change(PlannedChange.REMOVAL, f"Remove team {github_team.name}", github_team.delete)
         except GithubException:
             self.error(f"Something went wrong while removing team {github_team.name}")
 
@@ -259,9 +861,13 @@ class GitHubSync:
         """Archive a repository and return whether it is archived (True) or was already archived (False)."""
         github_repo = self.github.get_repo(repo.github_repo_id)
         if not github_repo.archived:
-            github_repo.edit(archived=True)
-            self.info(f"Archived repository {github_repo.name}")
-            self.repos_archived += 1
+            self.change(
+                PlannedChange.ARCHIVE,
+                f"Archive repository {github_repo.name}",
+                partial(github_repo.edit, archived=True),
+                counter="repos_archived",
+                subject=repo,
+            )
             return True
         return False
 
@@ -274,8 +880,12 @@ class GitHubSync:
         if project_team.github_team_id is not None:
             try:
                 self.remove_team(project_team)
-                project_team.github_team_id = None
-                project_team.save()
+                self.change(
+                    PlannedChange.REMOVAL,
+                    f"Forget the removed GitHub team of {project_team}",
+                    partial(self._save, project_team, github_team_id=None),
+                    on_github=False,
+                )
             except (GithubException, AssertionError):
                 self.error(f"Something went wrong removing the GitHub team for '{project_team}'.")
         else:
@@ -288,24 +898,58 @@ class GitHubSync:
         :param repo: the repository that must be updated
         """
         github_repo = self.github.get_repo(repo.github_repo_id)
-        github_team = self.github.get_team(repo.project.github_team_id)
 
-        if not github_team.has_in_repos(github_repo):
-            github_team.add_to_repos(github_repo)
-            self.info(f"Added team {github_team.name} to repository {github_repo.name}")
-
-        if not github_team.get_repo_permission(github_repo).admin:
-            github_team.set_repo_permission(github_repo, "admin")
-            self.info(f"Gave admin permissions to team {github_team.name} for repository {github_repo.name}")
+        if self.planning and repo.project.github_team_id is None:
+            # The access of a new team can only be compared once the team exists
+            self.change(
+                PlannedChange.PERMISSION,
+                f"Give the new team of {repo.project} admin access to repository {github_repo.name}",
+                partial(self.update_repo_team, repo, github_repo),
+                subject=repo.project,
+                on_github=False,
+            )
+        else:
+            self.update_repo_team(repo, github_repo)
 
         if github_repo.name != repo.name:
-            old_name = github_repo.name
-            github_repo.edit(name=repo.name)
-            self.info(f"Changed name of repository {old_name} to {github_repo.name}")
+            self.change(
+                PlannedChange.REPOSITORY,
+                f"Change name of repository {github_repo.name} to {repo.name}",
+                partial(github_repo.edit, name=repo.name),
+            )
 
         if github_repo.private != repo.private:
-            github_repo.edit(private=repo.private)
-            self.info(f"Changed privacy of repository {github_repo.name} to {'private' if repo.private else 'public'}")
+            self.change(
+                PlannedChange.REPOSITORY,
+                f"Change privacy of repository {repo.name} to {'private' if repo.private else 'public'}",
+                partial(github_repo.edit, private=repo.private),
+            )
+
+    def update_repo_team(self, repo, github_repo):
+        """
+        Give the GitHub team of the project of a repository admin access to the repository.
+
+        :param repo: the repository
+        :param github_repo: the repository on GitHub
+        """
+        github_team = self.github.get_team(repo.project.github_team_id)
+
+        if not self.github.team_has_repo(github_team, github_repo):
+            self.change(
+                PlannedChange.PERMISSION,
+                f"Add team {github_team.name} to repository {github_repo.name}",
+                partial(github_team.add_to_repos, github_repo),
+            )
+            is_admin = False  # teams are added with pull permissions
+        else:
+            is_admin = self.github.get_team_repo_permission(github_team, github_repo).admin
+
+        if not is_admin:
+            self.change(
+                PlannedChange.PERMISSION,
+                f"Give admin permissions to team {github_team.name} for repository {github_repo.name}",
+                partial(github_team.set_repo_permission, github_repo, "admin"),
+            )
 
     def create_or_update_repos(self, project_team):
         """
@@ -315,13 +959,16 @@ class GitHubSync:
 
         :param project_team: The team to create or update the repos for
         """
-        for project_repo in Repository.objects.filter(project=project_team):
+        # The repositories share the project instance, so they see the id of a team that is created by the plan
+        for project_repo in project_team.repository_set.all():
             if project_repo.github_repo_id is None:
                 try:
-                    project_repo.github_repo_id = self.github.create_repo(project_repo).id
-                    project_repo.save()
-                    self.info(f"Created repository {project_repo}")
-                    self.repos_created += 1
+                    self.change(
+                        PlannedChange.REPOSITORY,
+                        f"Create repository {project_repo}",
+                        partial(self._create_repo, project_repo),
+                        counter="repos_created",
+                    )
                 except (GithubException, AssertionError):
                     self.error(f"Something went wrong creating repository '{project_repo}' for '{project_team}'.")
             else:
@@ -338,23 +985,29 @@ class GitHubSync:
         """
         github_team = self.github.get_team(project.github_team_id)
         if github_team.name != project.name or github_team.description != project.generate_team_description():
-            github_team.edit(name=project.name, description=project.generate_team_description())
-            self.info(f"Updated name and description of team {project.name}")
+            self.change(
+                PlannedChange.TEAM,
+                f"Update name and description of team {project.name}",
+                partial(github_team.edit, name=project.name, description=project.generate_team_description()),
+            )
             return True
         return False
 
     def create_repo(self, repo):
         """
-        Create a repository in GitHub.
+        Create a repository in GitHub right away, and give the team of its project access.
 
         :param repo: The repository to create
         :return: the GitHub repository that is created
         """
-        github_repo = self.github.create_repo(repo)
+        with self.mutating():
+            github_repo = self.github.create_repo(repo)
         self.info(f"Created repository {repo.name}")
         github_team = self.github.get_team(repo.project.github_team_id)
-        github_team.add_to_repos(github_repo)
-        github_team.set_repo_permission(github_repo, "admin")
+        with self.mutating():
+            github_team.add_to_repos(github_repo)
+        with self.mutating():
+            github_team.set_repo_permission(github_repo, "admin")
         self.info(f"Added team {github_team.name} to repository {repo.name}")
         return github_repo
 
@@ -369,8 +1022,13 @@ class GitHubSync:
                         self.warning(
                             f"Repository {project_repo} was not archived, because it does not exist on GitHub either."
                         )
-                    project_repo.is_archived = Repository.Archived.CONFIRMED
-                    project_repo.save()
+                    self.change(
+                        PlannedChange.ARCHIVE,
+                        f"Mark repository {project_repo} as archived",
+                        partial(self._save, project_repo, is_archived=Repository.Archived.CONFIRMED),
+                        subject=project_repo,
+                        on_github=False,
+                    )
                 except (GithubException, AssertionError):
                     self.error(f"Something went wrong archiving the repository '{project_repo}'.")
 
@@ -400,7 +1058,13 @@ class GitHubSync:
                     f"Will try again at next sync."
                 )
                 continue
-            repo.delete()
+            self.change(
+                PlannedChange.ARCHIVE,
+                f"Forget orphan GitHub repository with id {repo.github_repo_id}",
+                repo.delete,
+                subject=repo,
+                on_github=False,
+            )
 
         for team in ProjectToBeDeleted.objects.all():
             try:
@@ -416,23 +1080,106 @@ class GitHubSync:
                     f"Will try again at next sync."
                 )
                 continue
-            team.delete()
+            self.change(
+                PlannedChange.REMOVAL,
+                f"Forget orphan GitHub team with id {team.github_team_id}",
+                team.delete,
+                on_github=False,
+            )
 
-    def perform_sync(self):
-        """Sync all selected projects to GitHub."""
+    def _plan(self, step, *args):
+        """Run a step of the sync while planning, log the error if that fails, and return the planned changes."""
+        self._planning.changes = []
         try:
-            self.delete_teams_and_repos_to_be_deleted()
+            step(*args)
         except Exception as e:
             self.logger.exception(e)
             self.fail = True
-        for project in self.projects:
+        changes, self._planning.changes = self._planning.changes, None
+        return changes
+
+    def _plan_project_in_worker(self, project):
+        """Plan the changes for one project in a worker thread, which has its own database connection."""
+        try:
+            return self._plan(self.sync_project, project)
+        finally:
+            connection.close()
+
+    def plan_sync(self):
+        """
+        Plan the changes that sync all selected projects to GitHub, without changing anything.
+
+        With more than one worker, the projects are compared with GitHub concurrently by a pool of worker threads.
+        The progress of the task is only updated by the thread that runs the sync.
+
+        :return: The planned changes, in the order in which they have to be applied
+        """
+        plan = self._plan(self.delete_teams_and_repos_to_be_deleted)
+        if self.workers == 1:
+            for project in self.projects:
+                plan += self._plan(self.sync_project, project)
+                self.task.completed += 1
+                self.task.save()
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="github-sync") as executor:
+                for changes in executor.map(self._plan_project_in_worker, self.projects):
+                    plan += changes
+                    self.task.completed += 1
+                    self.task.save()
+        return sorted(plan, key=lambda change: PlannedChange.KINDS.index(change.kind))
+
+    def execute_plan(self, plan):
+        """
+        Apply planned changes, in order.
+
+        A change that fails is logged, and the changes that are not on GitHub and have the same subject are skipped.
+        """
+        failed = []
+        for change in plan:
+            if not change.on_github and change.subject is not None and change.subject in failed:
+                continue
             try:
-                self.sync_project(project)
+                self.apply(change)
+            except (GithubException, AssertionError):
+                self.error(f"Something went wrong while applying the change '{change}'.")
+                failed.append(change.subject)
             except Exception as e:
                 self.logger.exception(e)
                 self.fail = True
-            self.task.completed += 1
-            self.task.save()
+                failed.append(change.subject)
+
+    def perform_sync(self, dry_run=False):
+        """
+        Sync all selected projects to GitHub.
+
+        The organization is listed once at the start, by the workers of the sync, so planning only has to make
+        requests for the teams, members and repositories that changed.
+
+        The projects are marked as synced if the sync did not fail, so `manage.py sync_github --changed` skips them
+        until they change again.
+
+        :param dry_run: Only plan the changes, without applying them
+        :return: The planned changes
+        """
+        started_at = timezone.now()
+        talker = self.github
+        metrics = talker.scheduler.metrics.copy()
+        team_ids = [project.github_team_id for project in self.projects]
+        team_ids += ProjectToBeDeleted.objects.values_list("github_team_id", flat=True)
+        try:
+            self.github = self.snapshot_class(talker, team_ids, workers=self.workers)
+        except (GithubException, AssertionError):
+            self.warning("Listing the GitHub organization failed, so every team and employee is checked separately.")
+
+        self.plan = self.plan_sync()
+        if not dry_run:
+            self.execute_plan(self.plan)
+            if not self.fail:
+                ProjectSyncState.mark_synced(self.projects, started_at)
+        self.github = talker
+        self.request_metrics = talker.scheduler.metrics - metrics
+        self.info(f"Made {self.request_metrics}")
+        self.task.completed += 1
         self.task.fail = self.fail
 
         self.task.success_message = (
@@ -442,6 +1189,7 @@ class GitHubSync:
             f"{self.repos_archived} repositories have been archived."
         )
         self.task.save()
+        return self.plan
 
     def perform_asynchronous_sync(self):
         """Sync all selected projects to GitHub asynchronously."""
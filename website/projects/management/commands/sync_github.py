@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 
+from projects.githubasync import AsyncGitHubSync
 from projects.githubsync import GitHubSync
-from projects.models import Project
+from projects.models import Project, ProjectSyncState
 
 
 class Command(BaseCommand):
@@ -9,7 +10,41 @@ class Command(BaseCommand):
 
     help = "Synchronise teams and repositories to GitHub"
 
+    def add_arguments(self, parser):
+        """Add the number of workers and the changed, async and dry run flags as arguments."""
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="The number of projects to sync concurrently, defaults to the GITHUB_SYNC_WORKERS setting",
+        )
+        parser.add_argument(
+            "--changed",
+            action="store_true",
+            help="Only sync the projects that changed since they were last synced, or that were not synced for "
+            "GITHUB_SYNC_RECONCILE_DAYS days",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="use_async",
+            help="List the GitHub organization with concurrent requests, see GITHUB_SYNC_CONCURRENT_REQUESTS",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the changes that the sync would make, without changing anything",
+        )
+
     def handle(self, *args, **options):
-        """Run GitHub sync."""
-        sync = GitHubSync(Project.objects.all())
-        sync.perform_sync()
+        """Run GitHub sync, or print its plan."""
+        projects = ProjectSyncState.projects_to_sync() if options["changed"] else Project.objects.all()
+        sync_class = AsyncGitHubSync if options["use_async"] else GitHubSync
+        sync = sync_class(projects, workers=options["workers"])
+        plan = sync.perform_sync(dry_run=options["dry_run"])
+        if options["dry_run"]:
+            sync.task.delete()
+            for change in plan:
+                self.stdout.write(f"{change.kind}: {change}")
+            if not plan:
+                self.stdout.write("Nothing to change")
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0007_alter_project_description"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GitHubResponseCache",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("url", models.CharField(max_length=200, unique=True)),
+                ("etag", models.CharField(blank=True, default="", max_length=200)),
+                ("last_modified", models.CharField(blank=True, default="", max_length=100)),
+                ("data", models.JSONField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0008_githubresponsecache"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectSyncState",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="sync_state",
+                        serialize=False,
+                        to="projects.project",
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(blank=True, null=True)),
+                ("synced_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
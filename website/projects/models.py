@@ -1,7 +1,12 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.core import validators
 from django.db import models
+from django.db.models import F, Q
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
 from tinymce.models import HTMLField
 
@@ -161,3 +166,71 @@ class RepositoryToBeDeleted(models.Model):
         """Create a RepositoryToBeDeleted if a Repository is deleted."""
         if instance.github_repo_id is not None:
             RepositoryToBeDeleted.objects.create(github_repo_id=instance.github_repo_id)
+
+
+class GitHubResponseCache(models.Model):
+    """The last response to a GET request to the GitHub API, to repeat the request as a conditional request."""
+
+    url = models.CharField(max_length=200, unique=True)
+    etag = models.CharField(max_length=200, blank=True, default="")
+    last_modified = models.CharField(max_length=100, blank=True, default="")
+    data = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """Return the url of the cached response."""
+        return f"Cached GitHub response for {self.url}"
+
+
+class ProjectSyncState(models.Model):
+    """
+    When a project last changed in a way that matters for GitHub, and when it was last synced to GitHub.
+
+    The changes are recorded by the signals in projects.signals, so a sync can skip the projects that did not change
+    since they were last synced.
+    """
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name="sync_state")
+    changed_at = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """Return the project of the state."""
+        return f"Sync state of {self.project}"
+
+    @classmethod
+    def _update(cls, projects, **values):
+        """Set fields of the states of projects or project pks that still exist, creating the missing states."""
+        pks = {getattr(project, "pk", project) for project in projects}
+        pks = Project.objects.filter(pk__in=pks).values_list("pk", flat=True)
+        cls.objects.bulk_create(
+            [cls(project_id=pk, **values) for pk in pks],
+            update_conflicts=True,
+            unique_fields=["project"],
+            update_fields=list(values),
+        )
+
+    @classmethod
+    def mark_changed(cls, projects):
+        """Record that projects changed, given as projects or pks."""
+        cls._update(projects, changed_at=timezone.now())
+
+    @classmethod
+    def mark_synced(cls, projects, synced_at):
+        """Record that projects were synced, with the time at which the sync started."""
+        cls._update(projects, synced_at=synced_at)
+
+    @staticmethod
+    def projects_to_sync():
+        """
+        Get the projects that changed since they were last synced, or that were not synced for a while.
+
+        Every project is synced again at least every GITHUB_SYNC_RECONCILE_DAYS days, to also undo the changes that
+        are made on GitHub itself.
+        """
+        reconcile_before = timezone.now() - timedelta(days=settings.GITHUB_SYNC_RECONCILE_DAYS)
+        return Project.objects.filter(
+            Q(sync_state__synced_at__isnull=True)
+            | Q(sync_state__synced_at__lt=F("sync_state__changed_at"))
+            | Q(sync_state__synced_at__lt=reconcile_before)
+        )
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from functools import wraps
+
+
+class RequestMetrics:
+    """The number of requests made to GitHub, how many of them were retries, and how long they were throttled."""
+
+    def __init__(self, calls=0, retries=0, throttled_seconds=0.0):
+        """Create metrics with the given counts."""
+        self.calls = calls
+        self.retries = retries
+        self.throttled_seconds = throttled_seconds
+
+    def __sub__(self, other):
+        """Get the metrics of the requests made since other was copied."""
+        return RequestMetrics(
+            self.calls - other.calls, self.retries - other.retries, self.throttled_seconds - other.throttled_seconds
+        )
+
+    def __str__(self):
+        """Describe the metrics."""
+        return (
+            f"{self.calls} requests to GitHub, of which {self.retries} retries, "
+            f"throttled for {self.throttled_seconds:.1f} seconds"
+        )
+
+    def copy(self):
+        """Copy the metrics, to compute the metrics of a run afterwards."""
+        return RequestMetrics(self.calls, self.retries, self.throttled_seconds)
+
+
+class RequestScheduler:
+    """
+    Schedule all requests to the GitHub API within its rate limits.
+
+    The primary rate limit is tracked from the X-RateLimit-Remaining and X-RateLimit-Reset headers of the responses.
+    When no requests remain, every request waits until the limit is reset. The secondary rate limit on the number of
+    points per minute is tracked with a token bucket, in which reading costs one point and changing something costs
+    five, like GitHub counts them.
+
+    A request that is refused because of a rate limit is retried after the time GitHub asks for in the Retry-After
+    header, after the primary limit is reset, or with an exponential backoff for secondary limits. A random jitter is
+    added to every wait, so the workers of a concurrent sync do not retry at the same moment. The scheduler is shared
+    by all threads that use the talker.
+    """
+
+    POINTS_PER_MINUTE = 900
+    READ_POINTS = 1
+    WRITE_POINTS = 5
+
+    MAX_RETRIES = 5
+    SECONDARY_LIMIT_WAIT = 60.0  # GitHub asks to wait at least a minute if it does not say how long
+    MAX_JITTER = 1.0
+
+    def __init__(self):
+        """Create a scheduler with a full token bucket, and no known primary limit."""
+        self.logger = logging.getLogger("django.github")
+        self.metrics = RequestMetrics()
+        self.points = float(self.POINTS_PER_MINUTE)
+        self.remaining = None  # the number of requests left within the primary limit, if known
+        self.reset_at = 0.0  # the time at which the primary limit is reset
+        self.blocked_until = 0.0  # the time until which all requests wait after a request was refused
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def install(self, requester):
+        """Schedule all requests that are made by a PyGithub requester, and by the objects it creates."""
+        for name in ("requestJson", "requestMultipart", "requestBlob"):
+            setattr(requester, name, self.schedule(getattr(requester, name)))
+
+    def schedule(self, request):
+        """
+        Wrap a request function of a PyGithub requester, to wait for the rate limits and retry refused requests.
+
+        :param request: A function taking the verb and url of a request and returning its status, headers and output
+        :return: The scheduled function
+        """
+
+        @wraps(request)
+        def scheduled(verb, url, *args, **kwargs):
+            attempt = 0
+            while True:
+                self._sleep(self._reserve(verb))
+                status, headers, output = request(verb, url, *args, **kwargs)
+                if not self._retry(verb, url, status, headers, output, attempt):
+                    return status, headers, output
+                attempt += 1
+
+        return scheduled
+
+    def schedule_async(self, request):
+        """
+        Wrap an asynchronous request function like `schedule`, waiting in the event loop instead of the thread.
+
+        :param request: A coroutine function taking the verb and url of a request and returning its status, headers
+        and output
+        :return: The scheduled coroutine function
+        """
+
+        @wraps(request)
+        async def scheduled(verb, url, *args, **kwargs):
+            attempt = 0
+            while True:
+                wait = self._reserve(verb)
+                if wait > 0:
+                    self._throttle(wait)
+                    await asyncio.sleep(wait)
+                status, headers, output = await request(verb, url, *args, **kwargs)
+                if not self._retry(verb, url, status, headers, output, attempt):
+                    return status, headers, output
+                attempt += 1
+
+        return scheduled
+
+    def _retry(self, verb, url, status, headers, output, attempt):
+        """Check whether a request has to be retried because it was refused by a rate limit, and count the retry."""
+        wait = self._update(status, headers, output, attempt)
+        if wait is None or attempt == self.MAX_RETRIES:
+            return False
+        self.logger.warning(f"GitHub refused {verb} {url} because of a rate limit, retrying in {wait:.0f}s")
+        with self._lock:
+            self.metrics.retries += 1
+        return True
+
+    def _reserve(self, verb):
+        """Take the points of a request from the bucket, and return how long to wait before making it."""
+        with self._lock:
+            now = time.time()
+            rate = self.POINTS_PER_MINUTE / 60
+            self.points = min(self.POINTS_PER_MINUTE, self.points + (now - self._updated_at) * rate)
+            self._updated_at = now
+
+            # The points may go below zero, so the next requests wait for the points of this one as well
+            self.points -= self.READ_POINTS if verb in ("GET", "HEAD") else self.WRITE_POINTS
+            wait = max(0.0, self.blocked_until - now, -self.points / rate)
+            if self.remaining is not None:
+                if self.remaining <= 0:
+                    wait = max(wait, self.reset_at - now)
+                self.remaining -= 1
+            self.metrics.calls += 1
+            return wait
+
+    def _sleep(self, seconds):
+        """Wait before making a request, and count the time as throttled."""
+        if seconds > 0:
+            self._throttle(seconds)
+            time.sleep(seconds)
+
+    def _throttle(self, seconds):
+        """Count the time that a request waits as throttled."""
+        with self._lock:
+            self.metrics.throttled_seconds += seconds
+
+    def _update(self, status, headers, output, attempt):
+        """
+        Update the primary limit from the headers of a response, and check whether it was refused by a rate limit.
+
+        :return: The number of seconds after which the request can be retried, or None if it was not refused
+        """
+        with self._lock:
+            if "x-ratelimit-remaining" in headers:
+                self.remaining = int(headers["x-ratelimit-remaining"])
+                self.reset_at = float(headers.get("x-ratelimit-reset", self.reset_at))
+
+            if status not in (403, 429):
+                return None
+
+            now = time.time()
+            if "retry-after" in headers and headers["retry-after"].isdigit():
+                wait = float(headers["retry-after"])
+            elif headers.get("x-ratelimit-remaining") == "0":
+                wait = max(0.0, self.reset_at - now)
+            elif "rate limit" in str(output).lower() or "abuse" in str(output).lower():
+                wait = self.SECONDARY_LIMIT_WAIT * 2**attempt
+            else:
+                return None  # refused for another reason, such as missing permissions
+
+            wait += random.uniform(0, self.MAX_JITTER)
+            self.blocked_until = max(self.blocked_until, now + wait)
+            return wait
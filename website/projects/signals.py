@@ -0,0 +1,63 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from projects.models import Project, ProjectSyncState, Repository
+
+from registrations.models import Employee, Registration
+
+# The fields that the GitHub sync saves itself, which do not make a project out of sync
+SYNCED_FIELDS = {Project: {"github_team_id"}, Repository: {"github_repo_id", "is_archived"}}
+
+
+def _saved_by_sync(sender, update_fields):
+    """Check whether a save only updated fields that are saved by the GitHub sync."""
+    return update_fields is not None and set(update_fields) <= SYNCED_FIELDS[sender]
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, update_fields=None, **kwargs):
+    """Mark a project as changed when it is saved."""
+    if not _saved_by_sync(sender, update_fields):
+        ProjectSyncState.mark_changed([instance])
+
+
+@receiver(post_save, sender=Repository)
+def repository_saved(sender, instance, update_fields=None, **kwargs):
+    """Mark the project of a repository as changed when the repository is saved."""
+    if instance.project_id is not None and not _saved_by_sync(sender, update_fields):
+        ProjectSyncState.mark_changed([instance.project_id])
+
+
+@receiver(post_delete, sender=Repository)
+def repository_deleted(sender, instance, **kwargs):
+    """Mark the project of a repository as changed when the repository is deleted."""
+    if instance.project_id is not None:
+        ProjectSyncState.mark_changed([instance.project_id])
+
+
+@receiver(m2m_changed, sender=Registration.projects.through)
+def registration_projects_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mark the projects that registrations are added to or removed from as changed."""
+    if action in ("post_add", "post_remove"):
+        ProjectSyncState.mark_changed([instance] if reverse else pk_set)
+    elif action == "pre_clear":
+        ProjectSyncState.mark_changed([instance] if reverse else instance.projects.all())
+
+
+@receiver(pre_delete, sender=Registration)
+def registration_deleted(sender, instance, **kwargs):
+    """Mark the projects of a registration as changed when it is deleted."""
+    ProjectSyncState.mark_changed(instance.projects.all())
+
+
+@receiver(pre_save, sender=Employee)
+def employee_saved(sender, instance, update_fields=None, **kwargs):
+    """Mark the projects of an employee as changed when the GitHub account of the employee changes."""
+    if instance.pk is None or (
+        update_fields is not None and not {"github_id", "github_username"} & set(update_fields)
+    ):
+        return
+
+    github_account = (instance.github_id, instance.github_username)
+    if Employee.objects.filter(pk=instance.pk).values_list("github_id", "github_username").first() != github_account:
+        ProjectSyncState.mark_changed(Project.objects.filter(registration__user=instance))
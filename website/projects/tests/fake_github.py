@@ -0,0 +1,130 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from projects.githubsync import GitHubAPITalker
+
+
+class FakeGitHubServer:
+    """
+    A local HTTP server that answers like the GitHub REST API, to test the sync against.
+
+    GET requests are answered from `resources`, by path and query without the pagination parameters. Lists are
+    paginated with `page_size` items per page and Link headers. Every other request is recorded in `changes`, and
+    its Authorization header in `authorizations`, and answered with an empty object, or with 204 No Content for DELETE
+    requests. GraphQL queries are answered with the result of `graphql`, a function of the query and its variables,
+    and are not recorded as changes. Requests without an Authorization header are refused with 401 Unauthorized.
+    Connections are kept open for the next requests, and counted in `connections`.
+    """
+
+    def __init__(self, page_size=100):
+        """Start the server on a free port."""
+        self.resources = {}
+        self.requests = []
+        self.changes = []
+        self.authorizations = []
+        self.connections = 0
+        self.page_size = page_size
+        self.graphql = None
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def create_talker(self, organization="giphouse"):
+        """
+        Create a GitHubAPITalker that talks to the server, for an organization that must be in `resources`.
+
+        The talker gets the access tokens token1, token2 and so on, which are valid for an hour.
+        """
+        talker = GitHubAPITalker()
+        talker.organization_name = organization
+        talker.base_url = self.url
+        talker._gi = MagicMock()
+        talker._gi.get_access_token.side_effect = lambda installation_id: MagicMock(
+            token=f"token{talker._gi.get_access_token.call_count}", expires_at=datetime.now() + timedelta(hours=1)
+        )
+        talker.github_organization
+        return talker
+
+    def stop(self):
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _authorized(self):
+                if self.headers.get("Authorization"):
+                    return True
+                self._respond(401, {"message": "Requires authentication"})
+                return False
+
+            def _respond(self, status, data=None, headers=None):
+                body = json.dumps(data).encode() if data is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                page = int(query.pop("page", 1))
+                query.pop("per_page", None)
+                key = url.path + ("?" + "&".join(f"{k}={v}" for k, v in sorted(query.items())) if query else "")
+                with fake._lock:
+                    fake.requests.append(("GET", key))
+                if key not in fake.resources:
+                    return self._respond(404, {"message": "Not Found"})
+
+                data = fake.resources[key]
+                if not isinstance(data, list):
+                    return self._respond(200, data)
+                headers = {}
+                if page * fake.page_size < len(data):
+                    next_query = urlencode({**parse_qs(url.query), "page": page + 1}, doseq=True)
+                    headers["Link"] = f'<{fake.url}{url.path}?{next_query}>; rel="next"'
+                return self._respond(200, data[(page - 1) * fake.page_size : page * fake.page_size], headers)
+
+            def _change(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                if not self._authorized():
+                    return
+                if self.path == "/graphql":
+                    with fake._lock:
+                        fake.requests.append((self.command, self.path))
+                    return self._respond(200, fake.graphql(body["query"], body["variables"]))
+                with fake._lock:
+                    fake.requests.append((self.command, self.path))
+                    fake.changes.append((self.command, self.path, body))
+                    fake.authorizations.append(self.headers.get("Authorization"))
+                if self.command == "DELETE":
+                    return self._respond(204)
+                return self._respond(200, {})
+
+            do_POST = do_PATCH = do_PUT = do_DELETE = _change
+
+        return Handler
@@ -6,6 +6,7 @@ from django.contrib.admin.sites import AdminSite
 from django.contrib.auth import get_user_model
 from django.shortcuts import reverse
 from django.test import Client, RequestFactory, TestCase
+from django.utils import timezone
 
 from freezegun import freeze_time
 
@@ -15,7 +16,7 @@ from mailing_lists.models import MailingList
 
 from projects.admin import ProjectAdmin, ProjectAdminArchivedFilter
 from projects.forms import ProjectAdminForm
-from projects.models import Project, Repository
+from projects.models import Project, ProjectSyncState, Repository
 
 from registrations.models import Employee, Registration
 
@@ -243,6 +244,11 @@ class GetProjectsTest(TestCase):
         self.assertTrue(self.repo2.is_archived)
         self.assertTrue(self.repo_archived.is_archived)
 
+    def test_archive_all_repositories__marks_changed(self):
+        ProjectSyncState.mark_synced(Project.objects.all(), timezone.now())
+        self.project_admin.archive_all_repositories(self.request, Project.objects.filter(pk=self.project.pk))
+        self.assertEqual(list(ProjectSyncState.projects_to_sync()), [self.project])
+
     def test_repository_deleted(self):
         response = self.client.post(
             reverse("admin:projects_project_add"),
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from github import BadCredentialsException, GithubException, RateLimitExceededException, UnknownObjectException
+
+from courses.models import Course, Semester
+
+from projects.githubasync import AsyncGitHubClient, AsyncGitHubSync, AsyncOrganizationSnapshot
+from projects.models import Project, Repository
+from projects.tests.fake_github import FakeGitHubServer
+
+from registrations.models import Employee, Registration
+
+
+@override_settings(GITHUB_SYNC_CONCURRENT_REQUESTS=4)
+class AsyncGitHubSyncTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.create(year=2020, season=Semester.FALL)
+        cls.project = Project.objects.create(name="test1", slug="test1", github_team_id=1, semester=cls.semester)
+        cls.repo = Repository.objects.create(name="test-repo1", github_repo_id=201, project=cls.project, private=True)
+        for github_id, username in ((101, "member1"), (102, "newmember")):
+            employee = Employee.objects.create(github_id=github_id, github_username=username)
+            registration = Registration.objects.create(
+                user=employee,
+                dev_experience=Registration.EXPERIENCE_BEGINNER,
+                course=Course.objects.se(),
+                preference1=cls.project,
+                semester=cls.semester,
+            )
+            registration.projects.add(cls.project)
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        # A page size of one makes every list span multiple pages
+        self.server = FakeGitHubServer(page_size=1)
+        self.addCleanup(self.server.stop)
+        url = self.server.url
+
+        def user(login, github_id):
+            return {"login": login, "id": github_id, "url": f"{url}/users/{login}"}
+
+        repo = {
+            "id": 201,
+            "name": "test-repo1",
+            "full_name": "giphouse/test-repo1",
+            "private": False,
+            "archived": False,
+            "url": f"{url}/repos/giphouse/test-repo1",
+        }
+        team = {"id": 1, "name": "wrong name", "description": "", "url": f"{url}/teams/1"}
+        self.server.resources = {
+            "/orgs/giphouse": {"login": "giphouse", "url": f"{url}/orgs/giphouse"},
+            "/orgs/giphouse/members?role=admin": [user("owner", 1)],
+            "/orgs/giphouse/members?role=member": [user("member1", 101), user("leaver", 103)],
+            "/orgs/giphouse/repos": [repo],
+            "/orgs/giphouse/teams": [team, {"id": 2, "name": "other", "url": f"{url}/teams/2"}],
+            "/teams/1/members": [user("member1", 101), user("leaver", 103)],
+            "/teams/1/repos": [{**repo, "permissions": {"admin": True, "push": True, "pull": True}}],
+            "/user/102": user("newmember", 102),
+        }
+
+        self.talker = self.server.create_talker()
+
+        self.sync = AsyncGitHubSync(Project.objects.all())
+        self.sync.github = self.talker
+        self.sync.logger = MagicMock()
+
+    def test_perform_sync(self):
+        self.sync.perform_sync()
+
+        self.assertEqual(
+            self.server.changes,
+            [
+                ("PATCH", "/teams/1", {"name": "test1", "description": self.project.generate_team_description()}),
+                ("PATCH", "/repos/giphouse/test-repo1", {"name": "test-repo1", "private": True}),
+                ("PUT", "/teams/1/memberships/newmember", {"role": "member"}),
+                ("DELETE", "/orgs/giphouse/members/leaver", None),
+            ],
+        )
+        # Everything is read before the first change, and the members of other teams are not listed
+        first_change = self.server.requests.index(("PATCH", "/teams/1"))
+        self.assertTrue(all(verb == "GET" for verb, _ in self.server.requests[:first_change]))
+        self.assertNotIn(("GET", "/teams/2/members"), self.server.requests)
+
+        self.assertEqual(self.sync.users_invited, 1)
+        self.assertEqual(self.sync.users_removed, 1)
+        self.assertEqual(self.sync.task.completed, self.sync.task.total)
+        self.assertFalse(self.sync.task.fail)
+        self.sync.logger.error.assert_not_called()
+
+    def test_snapshot(self):
+        connections, calls = self.server.connections, self.talker.scheduler.metrics.calls
+        snapshot = AsyncOrganizationSnapshot(self.talker, [1, None])
+        self.assertEqual(snapshot.roles, {1: "admin", 101: "member", 103: "member"})
+        self.assertEqual(set(snapshot.teams), {1, 2})
+        self.assertEqual([user.login for user in snapshot.team_members[1]], ["member1", "leaver"])
+        self.assertTrue(snapshot.team_repo_permissions[1][201].admin)
+        self.assertEqual(snapshot.get_repo(201).full_name, "giphouse/test-repo1")
+        self.assertEqual(list(snapshot.team_members), [1])
+        # The 9 pages are requested over at most one connection per concurrent request, and the requests are scheduled
+        self.assertLessEqual(self.server.connections - connections, 4)
+        self.assertEqual(self.talker.scheduler.metrics.calls - calls, 9)
+
+    def test_snapshot__renewed_token(self):
+        self.talker._access_token.expires_at = datetime.now()
+        AsyncOrganizationSnapshot(self.talker, [1])
+        self.assertEqual(self.talker._gi.get_access_token.call_count, 2)
+        self.assertEqual(self.talker._access_token.token, "token2")
+
+    def test_snapshot__failed(self):
+        del self.server.resources["/orgs/giphouse/teams"]
+        with self.assertRaises(UnknownObjectException):
+            AsyncOrganizationSnapshot(self.talker, [1])
+
+    @patch("projects.management.commands.sync_github.AsyncGitHubSync")
+    def test_sync_github_command__async(self, sync_mock):
+        call_command("sync_github", use_async=True)
+        sync_mock.return_value.perform_sync.assert_called_once_with(dry_run=False)
+
+
+def reader(data):
+    """Create a stream reader that reads the given data."""
+    stream = asyncio.StreamReader()
+    stream.feed_data(data)
+    stream.feed_eof()
+    return stream
+
+
+def writer():
+    """Create a mock stream writer."""
+    return MagicMock(drain=AsyncMock(), wait_closed=AsyncMock())
+
+
+class AsyncGitHubClientTest(SimpleTestCase):
+    def setUp(self):
+        self.talker = MagicMock(base_url="https://api.github.com")
+        self.talker.scheduler.schedule_async.side_effect = lambda request: request
+        self.talker.access_token = "token1"
+        self.client = AsyncGitHubClient(self.talker, 2)
+
+    async def test_read_response__chunked(self):
+        response = b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n4;x=y\r\n[1, \r\n2\r\n2]\r\n0\r\n\r\n"
+        status, headers, output, keep_alive = await self.client._read_response(reader(response))
+        self.assertEqual((status, output, keep_alive), (200, "[1, 2]", True))
+        self.assertEqual(headers, {"transfer-encoding": "chunked"})
+
+    async def test_read_response__until_closed(self):
+        response = b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n{}"
+        self.assertEqual(
+            await self.client._read_response(reader(response)),
+            (200, {"content-type": "application/json"}, "{}", False),
+        )
+
+    async def test_read_response__connection_close(self):
+        response = b"HTTP/1.1 204 No Content\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+        self.assertFalse((await self.client._read_response(reader(response)))[3])
+
+    async def test_read_response__closed(self):
+        with self.assertRaises(ConnectionError):
+            await self.client._read_response(reader(b""))
+
+    @patch("projects.githubasync.asyncio.open_connection")
+    async def test_request__closed_connection(self, open_connection_mock):
+        """Test that a request is made on a new connection when an open connection was closed by GitHub."""
+        closed, new = writer(), writer()
+        self.client._connections = [(reader(b""), closed)]
+        response = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}"
+        open_connection_mock.return_value = (reader(response), new)
+
+        self.assertEqual(await self.client._request("GET", "/teams/1"), (200, {"content-length": "2"}, "{}"))
+        closed.close.assert_called_once()
+        self.assertEqual(open_connection_mock.call_args.args, ("api.github.com", 443))
+        self.assertIsNotNone(open_connection_mock.call_args.kwargs["ssl"])
+        request = new.write.call_args.args[0].decode()
+        self.assertTrue(request.startswith("GET /teams/1 HTTP/1.1\r\nHost: api.github.com\r\n"))
+        self.assertIn("Authorization: token token1\r\n", request)
+        self.assertEqual(self.client._connections[0][1], new)
+
+        await self.client.close()
+        new.close.assert_called_once()
+        self.assertEqual(self.client._connections, [])
+
+    @patch("projects.githubasync.asyncio.open_connection")
+    async def test_request__connection_close(self, open_connection_mock):
+        connection = writer()
+        response = b"HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: 2\r\n\r\n{}"
+        open_connection_mock.return_value = (reader(response), connection)
+        self.assertEqual((await self.client._request("GET", "/teams/1"))[0], 200)
+        connection.close.assert_called_once()
+        self.assertEqual(self.client._connections, [])
+
+    @patch("projects.githubasync.asyncio.open_connection")
+    async def test_request__failed(self, open_connection_mock):
+        connection = writer()
+        open_connection_mock.return_value = (reader(b""), connection)
+        with self.assertRaises(ConnectionError):
+            await self.client._request("GET", "/teams/1")
+        connection.close.assert_called_once()
+
+        connection.drain.side_effect = asyncio.CancelledError
+        with self.assertRaises(asyncio.CancelledError):
+            await self.client._request("GET", "/teams/1")
+        self.assertEqual(connection.close.call_count, 2)
+        self.assertEqual(self.client._connections, [])
+
+    def test_path(self):
+        self.assertEqual(self.client._path("/teams/1"), "/teams/1")
+        self.assertEqual(self.client._path("https://api.github.com/teams/1/members?page=2"), "/teams/1/members?page=2")
+        self.assertEqual(self.client._path("https://api.github.com/teams/1"), "/teams/1")
+
+    def test_check(self):
+        self.assertEqual(self.client._check(200, {}, '{"id": 1}'), ({}, {"id": 1}))
+        self.assertEqual(self.client._check(204, {}, ""), ({}, None))
+        for status, output, exception in (
+            (401, '{"message": "Bad credentials"}', BadCredentialsException),
+            (404, '{"message": "Not Found"}', UnknownObjectException),
+            (403, '{"message": "API rate limit exceeded"}', RateLimitExceededException),
+            (500, "", GithubException),
+        ):
+            with self.assertRaises(exception) as context:
+                self.client._check(status, {}, output)
+            self.assertEqual(context.exception.status, status)
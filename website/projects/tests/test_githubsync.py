@@ -1,15 +1,31 @@
+import logging
+import threading
 from datetime import datetime, timedelta
+from io import StringIO
 from unittest import mock
 from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase
 
 from github import GithubException, MainClass, UnknownObjectException
+from github.NamedUser import NamedUser
+from github.Team import Team
 
 from courses.models import Course, Semester
 
 from projects import githubsync
-from projects.models import Project, ProjectToBeDeleted, Repository, RepositoryToBeDeleted
+from projects.models import (
+    GitHubResponseCache,
+    Project,
+    ProjectSyncState,
+    ProjectToBeDeleted,
+    Repository,
+    RepositoryToBeDeleted,
+)
+from projects.ratelimits import RequestMetrics
+from projects.tests.fake_github import FakeGitHubServer
 
 from registrations.models import Employee, Registration
 
@@ -70,6 +86,26 @@ class GitHubAPITalkerTest(TestCase):
         self.talker._gi.get_access_token.assert_called_once_with(self.talker.installation_id)
         self.assertIsNotNone(self.talker._organization)
 
+    def test_github_organization(self):
+        """Test that the organization is created once, and authenticates with the current token of the talker."""
+        self.talker._organization = None
+        organization = self.talker.github_organization
+        self.assertEqual(organization, MainClass.Github.get_organization.return_value)
+        self.assertIs(self.talker.github_organization, organization)
+        MainClass.Github.get_organization.assert_called_once_with(self.talker.organization_name)
+        auth = MainClass.Github.__init__.call_args.kwargs["auth"]
+        self.assertIsInstance(auth, githubsync.InstallationTokenAuth)
+
+        self.talker._access_token.expires_at = datetime.now() - timedelta(hours=1)
+        self.talker._gi.get_access_token.return_value = MagicMock(token="renewed")
+        self.assertEqual(auth.token, "renewed")
+        self.assertIs(self.talker.github_organization, organization)
+
+    def test_github_organization__schedules_requests(self):
+        self.talker._organization = None
+        request_json = self.talker.github_organization._requester.requestJson
+        self.assertTrue(hasattr(request_json, "__wrapped__"))
+
     def test_renew_access_token_if_required__almost_expired(self):
         """Test if when requesting an almost expiring token, a new token is requested."""
         self.talker._access_token.expires_at = datetime.utcnow() + timedelta(seconds=30)
@@ -96,22 +132,90 @@ class GitHubAPITalkerTest(TestCase):
         self.talker.create_repo(self.repo1)
         self.talker._organization.create_repo.assert_called_once_with(name="test-repo1", private=self.repo1.private)
 
+    def _respond(self, headers=None, data=None):
+        """Let the requester of the organization answer the next request, without data for 304 Not Modified."""
+        requester = self.talker._organization._requester
+        requester.requestJsonAndCheck.return_value = (headers or {}, data)
+        requester.requestJsonAndCheck.reset_mock()
+        return requester
+
     def test_get_team(self):
-        self.talker.get_team(self.project1.github_team_id)
-        self.talker._organization.get_team.assert_called_once_with(self.project1.github_team_id)
+        requester = self._respond({"etag": '"team1"'}, {"id": 87654321, "name": "test1"})
+        team = self.talker.get_team(self.project1.github_team_id)
+        requester.requestJsonAndCheck.assert_called_once_with("GET", "/teams/87654321", headers={})
+        self.assertIsInstance(team, Team)
+        self.assertEqual(team.name, "test1")
+
+        cached = GitHubResponseCache.objects.get(url="/teams/87654321")
+        self.assertEqual(cached.etag, '"team1"')
+        self.assertEqual(cached.last_modified, "")
+        self.assertEqual(cached.data, {"id": 87654321, "name": "test1"})
+
+    def test_get_team__not_modified(self):
+        GitHubResponseCache.objects.create(
+            url="/teams/87654321",
+            etag='"team1"',
+            last_modified="Thu, 01 Oct 2026 12:00:00 GMT",
+            data={"id": 87654321, "name": "test1"},
+        )
+        requester = self._respond()
+        team = self.talker.get_team(self.project1.github_team_id)
+        requester.requestJsonAndCheck.assert_called_once_with(
+            "GET",
+            "/teams/87654321",
+            headers={"If-None-Match": '"team1"', "If-Modified-Since": "Thu, 01 Oct 2026 12:00:00 GMT"},
+        )
+        self.assertEqual(team.name, "test1")
+
+    def test_get_team__modified(self):
+        GitHubResponseCache.objects.create(url="/teams/87654321", etag='"team1"', data={"id": 87654321, "name": "old"})
+        self._respond({"etag": '"team2"'}, {"id": 87654321, "name": "test1"})
+        self.assertEqual(self.talker.get_team(self.project1.github_team_id).name, "test1")
+        cached = GitHubResponseCache.objects.get(url="/teams/87654321")
+        self.assertEqual((cached.etag, cached.data["name"]), ('"team2"', "test1"))
+
+    def test_get_team__error(self):
+        requester = self._respond()
+        requester.requestJsonAndCheck.side_effect = UnknownObjectException(404, {"message": "Not Found"}, {})
+        with self.assertRaises(UnknownObjectException):
+            self.talker.get_team(self.project1.github_team_id)
+        self.assertFalse(GitHubResponseCache.objects.exists())
+
+    def test_get_team__stored_concurrently(self):
+        self._respond({"etag": '"team2"'}, {"id": 87654321, "name": "test1"})
+        GitHubResponseCache.objects.create(url="/teams/87654321", etag='"team1"', data={"id": 87654321, "name": "old"})
+        with patch.object(GitHubResponseCache.objects, "update_or_create", side_effect=IntegrityError):
+            self.assertEqual(self.talker.get_team(self.project1.github_team_id).name, "test1")
+        cached = GitHubResponseCache.objects.get(url="/teams/87654321")
+        self.assertEqual((cached.etag, cached.data["name"]), ('"team2"', "test1"))
 
     def test_get_user(self):
-        self.talker.get_user(self.employee1.github_id)
-        self.talker._github.get_user_by_id.assert_called_once_with(self.employee1.github_id)
+        requester = self._respond({"last-modified": "Thu, 01 Oct 2026 12:00:00 GMT"}, {"id": 123456})
+        self.assertIsInstance(self.talker.get_user(self.employee1.github_id), NamedUser)
+        requester.requestJsonAndCheck.assert_called_once_with("GET", "/user/123456", headers={})
+        self.assertEqual(
+            GitHubResponseCache.objects.get(url="/user/123456").last_modified, "Thu, 01 Oct 2026 12:00:00 GMT"
+        )
 
     def test_get_repo(self):
-        self.talker.get_repo(self.repo1.github_repo_id)
-        self.talker._github.get_repo.assert_called_once_with(self.repo1.github_repo_id)
+        requester = self._respond({}, {"id": 987654321, "name": "test-repo1"})
+        self.assertEqual(self.talker.get_repo(self.repo1.github_repo_id).name, "test-repo1")
+        requester.requestJsonAndCheck.assert_called_once_with("GET", "/repositories/987654321", headers={})
 
     def test_remove_user(self):
         self.talker.remove_user(self.employee1.github_username)
         self.talker._organization.remove_from_members.assert_called_once_with(self.employee1.github_username)
 
+    def test_team_methods(self):
+        team, user, repo = MagicMock(), MagicMock(), MagicMock()
+        self.assertEqual(self.talker.get_team_members(team), team.get_members.return_value)
+        self.assertEqual(self.talker.is_team_member(team, user), team.has_in_members.return_value)
+        team.has_in_members.assert_called_once_with(user)
+        self.assertEqual(self.talker.team_has_repo(team, repo), team.has_in_repos.return_value)
+        team.has_in_repos.assert_called_once_with(repo)
+        self.assertEqual(self.talker.get_team_repo_permission(team, repo), team.get_repo_permission.return_value)
+        team.get_repo_permission.assert_called_once_with(repo)
+
     def test_get_role_of_user(self):
         user = MagicMock()
         self.talker.get_role_of_user(user)
@@ -167,6 +271,17 @@ class GitHubSyncTest(TestCase):
         self.talker.get_user.return_value = self.github_user
         self.talker.get_team.return_value = self.github_team
         self.talker.get_repo.return_value = self.github_repo
+        self.talker.get_team_members.side_effect = lambda team: team.get_members()
+        self.talker.is_team_member.side_effect = lambda team, user: team.has_in_members(user)
+        self.talker.team_has_repo.side_effect = lambda team, repo: team.has_in_repos(repo)
+        self.talker.get_team_repo_permission.side_effect = lambda team, repo: team.get_repo_permission(repo)
+        # The GraphQL queries of the snapshot find an empty organization
+        empty = {"edges": [], "pageInfo": {"hasNextPage": False, "endCursor": None}}
+        organization = {"membersWithRole": empty, "repositories": empty, "teams": empty}
+        self.talker.github_organization._requester.requestJsonAndCheck.return_value = (
+            {},
+            {"data": {"organization": organization}},
+        )
 
         self.sync.github = self.talker
 
@@ -342,6 +457,89 @@ class GitHubSyncTest(TestCase):
         self.assertEqual(self.sync.users_removed, 0)
         self.assert_error()
 
+    def test_remove_users_not_in_team__employee_of_other_project(self):
+        project2 = Project.objects.create(name="test2", slug="test2", github_team_id="11111", semester=self.semester)
+        Repository.objects.create(name="test-repo3", github_repo_id="333", project=project2)
+        mover = Employee.objects.create(github_username="mover", github_id=654321)
+        Registration.objects.create(
+            user=mover,
+            dev_experience=Registration.EXPERIENCE_BEGINNER,
+            course=Course.objects.se(),
+            preference1=project2,
+            semester=self.semester,
+        ).projects.add(project2)
+        self.sync.projects = [self.project1, project2]
+
+        self.remove_users_not_in_team("mover", "member")
+        self.github_team.remove_membership.assert_called_once_with(self.github_user)
+        self.talker.remove_user.assert_not_called()
+        self.assertEqual(self.sync.users_removed, 1)
+        self.assert_info()
+        # The employees are only queried once per sync
+        with self.assertNumQueries(0):
+            self.assertEqual(self.sync.active_employees(), {"testgithubuser", "mover"})
+
+    def test_remove_users_not_in_team__employee_of_unchanged_project(self):
+        """Test that an employee of a project that is not synced, like with --changed, stays in the organization."""
+        project2 = Project.objects.create(name="test2", slug="test2", github_team_id="11111", semester=self.semester)
+        Repository.objects.create(name="test-repo3", github_repo_id="333", project=project2)
+        archived = Project.objects.create(name="test3", slug="test3", semester=self.semester)
+        Repository.objects.create(
+            name="test-repo4", github_repo_id="444", project=archived, is_archived=Repository.Archived.CONFIRMED
+        )
+        for username, github_id, project in (("mover", 654321, project2), ("alumnus", 654322, archived)):
+            Registration.objects.create(
+                user=Employee.objects.create(github_username=username, github_id=github_id),
+                dev_experience=Registration.EXPERIENCE_BEGINNER,
+                course=Course.objects.se(),
+                preference1=project,
+                semester=self.semester,
+            ).projects.add(project)
+        self.sync.projects = [self.project1]
+
+        self.remove_users_not_in_team("mover", "member")
+        self.github_team.remove_membership.assert_called_once_with(self.github_user)
+        self.talker.remove_user.assert_not_called()
+        self.assertEqual(self.sync.active_employees(), {"testgithubuser", "mover"})
+
+    def test_plan_sync__employee_moved_to_other_project(self):
+        RepositoryToBeDeleted.objects.all().delete()
+        ProjectToBeDeleted.objects.all().delete()
+        project2 = Project.objects.create(name="test2", slug="test2", github_team_id="11111", semester=self.semester)
+        repo3 = Repository.objects.create(name="test-repo3", github_repo_id="333", project=project2, private=True)
+        # The employee moved from the first project to the second
+        self.employee1.registration_set.get().projects.set([project2])
+        self.sync.projects = [self.project1, project2]
+
+        team1, team2 = self.github_team, MagicMock()
+        team2.name = project2.name
+        team2.description = project2.generate_team_description()
+        team2.get_members.return_value = []
+        team2.has_in_members.return_value = False
+        team2.get_repo_permission.return_value = MagicMock(admin=True)
+        github_repo3 = MagicMock(private=True)
+        github_repo3.name = repo3.name
+        self.talker.get_team.side_effect = lambda team_id: {87654321: team1, 11111: team2}[int(team_id)]
+        self.talker.get_repo.side_effect = lambda repo_id: {987654321: self.github_repo, 333: github_repo3}[
+            int(repo_id)
+        ]
+        self.talker.get_role_of_user.return_value = "member"
+
+        plan = self.sync.plan_sync()
+        self.assertEqual(
+            [str(change) for change in plan],
+            [
+                f"Invite {self.employee1.get_full_name()} to team test2",
+                "Remove testgithubuser from team test1 but not from the organization, because testgithubuser is an "
+                "employee of another project",
+            ],
+        )
+        self.sync.execute_plan(plan)
+        team2.add_membership.assert_called_once_with(self.github_user, role="member")
+        team1.remove_membership.assert_called_once_with(self.github_user)
+        self.talker.remove_user.assert_not_called()
+        self.assertFalse(self.sync.fail)
+
     def test_remove_team__user_in_employees(self):
         self.setUpUser(self.employee1.github_username, "member")
         self.sync.remove_team(self.project1)
@@ -455,8 +653,9 @@ class GitHubSyncTest(TestCase):
         self.sync.update_repo(self.repo1)
         self.github_team.add_to_repos.assert_called_once_with(self.github_repo)
         self.github_repo.edit.assert_not_called()
-        self.github_team.set_repo_permission.assert_not_called()
-        self.assert_info()
+        self.github_team.set_repo_permission.assert_called_once_with(self.github_repo, "admin")
+        self.assertEqual(self.logger.info.call_count, 2)
+        self.logger.error.assert_not_called()
 
     def test_update_repo__all_correct(self):
         self.sync.update_repo(self.repo1)
@@ -695,6 +894,258 @@ class GitHubSyncTest(TestCase):
         self.assertEqual(self.sync.task.completed, self.sync.task.total)
         self.assertTrue(self.sync.task.fail)
 
+    @patch("projects.githubsync.connection")
+    def test_perform_sync__workers(self, connection_mock):
+        projects = [self.project1] + [
+            Project.objects.create(name=f"test{i}", slug=f"test{i}", semester=self.semester) for i in range(2, 6)
+        ]
+        sync = githubsync.GitHubSync(Project.objects.all(), workers=3)
+        sync.github = self.talker
+        sync.delete_teams_and_repos_to_be_deleted = MagicMock()
+        synced = []
+        sync.sync_project = MagicMock(side_effect=lambda project: synced.append((project, threading.current_thread())))
+        sync.perform_sync()
+
+        self.assertCountEqual([project for project, _ in synced], projects)
+        self.assertTrue(all(thread.name.startswith("github-sync") for _, thread in synced))
+        self.assertEqual(connection_mock.close.call_count, len(projects))
+        self.assertEqual(sync.task.completed, len(projects) + 1)
+        self.assertFalse(sync.task.fail)
+
+    @patch("projects.githubsync.connection")
+    def test_perform_sync__workers_errors(self, connection_mock):
+        sync = githubsync.GitHubSync(Project.objects.all(), workers=2)
+        sync.github = self.talker
+        sync.logger = self.logger
+        sync.delete_teams_and_repos_to_be_deleted = MagicMock()
+        sync.sync_project = MagicMock(side_effect=self.exception)
+        sync.perform_sync()
+        self.logger.exception.assert_called_once()
+        connection_mock.close.assert_called_once()
+        self.assertEqual(sync.task.completed, sync.task.total)
+        self.assertTrue(sync.task.fail)
+
+    def test_count(self):
+        def invite():
+            for _ in range(1000):
+                self.sync.count("users_invited")
+
+        threads = [threading.Thread(target=invite) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.sync.users_invited, 4000)
+
+    @patch("projects.githubsync.time")
+    def test_mutating__one_worker(self, time_mock):
+        self.sync.workers = 1
+        with self.sync.mutating():
+            pass
+        time_mock.sleep.assert_not_called()
+
+    @patch("projects.githubsync.time")
+    def test_mutating__workers(self, time_mock):
+        self.sync.workers = 2
+        time_mock.monotonic.side_effect = [100.0, 100.0, 100.25, 101.0]
+        with self.sync.mutating():
+            pass
+        time_mock.sleep.assert_called_once_with(0.0)
+        with self.sync.mutating():
+            pass
+        time_mock.sleep.assert_called_with(0.75)
+        self.assertEqual(self.sync._last_mutation, 101.0)
+
+    @patch("projects.githubsync.time")
+    def test_mutating__workers_error(self, time_mock):
+        self.sync.workers = 2
+        time_mock.monotonic.return_value = 100.0
+        with self.assertRaises(GithubException):
+            with self.sync.mutating():
+                raise self.exception
+        self.assertEqual(self.sync._last_mutation, 100.0)
+
+    @patch("projects.management.commands.sync_github.GitHubSync")
+    def test_sync_github_command(self, sync_mock):
+        call_command("sync_github", workers=4)
+        self.assertEqual(sync_mock.call_args.kwargs, {"workers": 4})
+        sync_mock.return_value.perform_sync.assert_called_once_with(dry_run=False)
+        sync_mock.return_value.task.delete.assert_not_called()
+
+    @patch("projects.management.commands.sync_github.GitHubSync")
+    def test_sync_github_command__dry_run(self, sync_mock):
+        sync_mock.return_value.perform_sync.return_value = [
+            githubsync.PlannedChange(githubsync.PlannedChange.TEAM, "Create team test1", None)
+        ]
+        out = StringIO()
+        call_command("sync_github", dry_run=True, stdout=out)
+        sync_mock.return_value.perform_sync.assert_called_once_with(dry_run=True)
+        sync_mock.return_value.task.delete.assert_called_once_with()
+        self.assertEqual(out.getvalue(), "team: Create team test1\n")
+
+    @patch("projects.management.commands.sync_github.GitHubSync")
+    def test_sync_github_command__dry_run_nothing_to_change(self, sync_mock):
+        sync_mock.return_value.perform_sync.return_value = []
+        out = StringIO()
+        call_command("sync_github", dry_run=True, stdout=out)
+        self.assertEqual(out.getvalue(), "Nothing to change\n")
+
+    def test_change__planning(self):
+        apply = MagicMock()
+        self.assertFalse(self.sync.planning)
+        plan = self.sync._plan(self.sync.change, githubsync.PlannedChange.TEAM, "Create team test1", apply)
+        self.assertFalse(self.sync.planning)
+        apply.assert_not_called()
+        self.assertEqual([str(change) for change in plan], ["Create team test1"])
+        self.assert_no_log()
+
+    def test_plan_sync(self):
+        RepositoryToBeDeleted.objects.all().delete()
+        ProjectToBeDeleted.objects.all().delete()
+        self.github_team.name = "The wrong name"
+        self.github_repo.private = False
+        plan = self.sync.plan_sync()
+        self.assertEqual(
+            [change.kind for change in plan], [githubsync.PlannedChange.TEAM, githubsync.PlannedChange.REPOSITORY]
+        )
+        self.github_team.edit.assert_not_called()
+        self.github_repo.edit.assert_not_called()
+        self.assert_no_log()
+
+        self.sync.execute_plan(plan)
+        self.github_team.edit.assert_called_once_with(
+            name=self.project1.name, description=self.project1.generate_team_description()
+        )
+        self.github_repo.edit.assert_called_once_with(private=True)
+        self.assertEqual(self.logger.info.call_count, 2)
+        self.assertFalse(self.sync.fail)
+
+    def test_plan_sync__new_team(self):
+        RepositoryToBeDeleted.objects.all().delete()
+        ProjectToBeDeleted.objects.all().delete()
+        self.project1.github_team_id = None
+        self.project1.save()
+        self.sync.projects = [self.project1]
+        self.talker.create_team.return_value = MagicMock(id=42)
+        plan = self.sync.plan_sync()
+        self.assertEqual(
+            [change.kind for change in plan],
+            [
+                githubsync.PlannedChange.TEAM,
+                githubsync.PlannedChange.MEMBERSHIP,
+                githubsync.PlannedChange.PERMISSION,
+            ],
+        )
+        self.talker.create_team.assert_not_called()
+        self.talker.get_team.assert_not_called()
+
+        self.sync.execute_plan(plan)
+        self.project1.refresh_from_db()
+        self.assertEqual(self.project1.github_team_id, 42)
+        self.assertEqual(self.sync.teams_created, 1)
+        self.talker.get_team.assert_called_with(42)
+        self.github_team.has_in_members.assert_called_once_with(self.github_user)
+        self.github_team.has_in_repos.assert_called_once_with(self.github_repo)
+        self.assertFalse(self.sync.fail)
+
+    def test_plan_sync__new_team_failed(self):
+        """Test that the changes that need the new team are skipped when creating it fails."""
+        RepositoryToBeDeleted.objects.all().delete()
+        ProjectToBeDeleted.objects.all().delete()
+        self.project1.github_team_id = None
+        self.project1.save()
+        self.sync.projects = [self.project1]
+        self.talker.create_team.side_effect = self.exception
+        self.sync.execute_plan(self.sync.plan_sync())
+
+        self.project1.refresh_from_db()
+        self.assertIsNone(self.project1.github_team_id)
+        self.assertEqual(self.sync.teams_created, 0)
+        self.talker.get_team.assert_not_called()
+        self.logger.error.assert_called_once()
+        self.logger.exception.assert_not_called()
+        self.assertTrue(self.sync.fail)
+
+    def test_execute_plan__failed_change(self):
+        self.repo1.is_archived = Repository.Archived.PENDING
+        self.repo1.save()
+        self.github_repo.archived = False
+        self.github_repo.edit.side_effect = self.exception
+        plan = self.sync._plan(self.sync.archive_repos_marked_as_archived, self.project1)
+        self.assertEqual(len(plan), 2)
+        self.sync.execute_plan(plan)
+        self.repo1.refresh_from_db()
+        self.assertEqual(self.repo1.is_archived, Repository.Archived.PENDING)
+        self.assertEqual(self.sync.repos_archived, 0)
+        self.assert_error()
+
+    def test_execute_plan__unexpected_error(self):
+        apply = MagicMock(side_effect=ValueError)
+        self.sync.execute_plan([githubsync.PlannedChange(githubsync.PlannedChange.TEAM, "Create team test1", apply)])
+        self.logger.exception.assert_called_once()
+        self.assertTrue(self.sync.fail)
+
+    def test_perform_sync__marks_synced(self):
+        self.sync.plan_sync = MagicMock(return_value=[])
+        self.sync.perform_sync()
+        self.assertNotIn(self.project1, ProjectSyncState.projects_to_sync())
+
+    def test_perform_sync__request_metrics(self):
+        self.talker.scheduler.metrics = RequestMetrics(10, 1, 2.0)
+
+        def plan_sync():
+            self.talker.scheduler.metrics.calls += 3
+            return []
+
+        self.sync.plan_sync = plan_sync
+        self.sync.perform_sync()
+        self.assertEqual(self.sync.request_metrics.calls, 3)
+        self.assertEqual(self.sync.request_metrics.retries, 0)
+        self.logger.info.assert_called_once_with(
+            "Made 3 requests to GitHub, of which 0 retries, throttled for 0.0 seconds"
+        )
+
+    def test_perform_sync__failed_not_marked_synced(self):
+        self.sync.plan_sync = MagicMock(return_value=[])
+        self.sync.fail = True
+        self.sync.perform_sync()
+        self.assertIn(self.project1, ProjectSyncState.projects_to_sync())
+
+    @patch("projects.management.commands.sync_github.GitHubSync")
+    def test_sync_github_command__changed(self, sync_mock):
+        project2 = Project.objects.create(name="test2", slug="test2", semester=self.semester)
+        ProjectSyncState.mark_synced([self.project1], githubsync.timezone.now())
+        call_command("sync_github", changed=True)
+        self.assertEqual(list(sync_mock.call_args.args[0]), [project2])
+
+    def test_perform_sync__dry_run(self):
+        self.sync.plan_sync = MagicMock(return_value=["change"])
+        self.sync.execute_plan = MagicMock()
+        self.assertEqual(self.sync.perform_sync(dry_run=True), ["change"])
+        self.sync.execute_plan.assert_not_called()
+        self.assertEqual(self.sync.task.completed, 1)
+
+    def test_perform_sync__snapshot(self):
+        snapshots = []
+        self.sync.sync_project = MagicMock(side_effect=lambda project: snapshots.append(self.sync.github))
+        self.sync.delete_teams_and_repos_to_be_deleted = MagicMock()
+        with patch.object(githubsync.GitHubSync, "snapshot_class") as snapshot_mock:
+            self.sync.perform_sync()
+        snapshot_mock.assert_called_once_with(
+            self.talker, [87654321, 5566778899, 9988776655], workers=self.sync.workers
+        )
+        self.assertEqual(snapshots, [snapshot_mock.return_value])
+        self.assertIs(self.sync.github, self.talker)
+
+    def test_perform_sync__snapshot_failed(self):
+        self.sync.sync_project = MagicMock()
+        self.sync.delete_teams_and_repos_to_be_deleted = MagicMock()
+        self.talker.github_organization._requester.requestJsonAndCheck.side_effect = self.exception
+        self.sync.perform_sync()
+        self.logger.warning.assert_called_once()
+        self.assertFalse(self.sync.task.fail)
+        self.assertIs(self.sync.github, self.talker)
+
     def test_perform_asynchronous_sync(self):
         thread_instance = MagicMock()
         thread_mock = MagicMock(return_value=thread_instance)
@@ -702,3 +1153,334 @@ class GitHubSyncTest(TestCase):
             self.sync.perform_asynchronous_sync()
         thread_mock.assert_called_once_with(target=self.sync.perform_sync)
         thread_instance.start.assert_called_once()
+
+
+class OrganizationSnapshotTest(TestCase):
+    def setUp(self):
+        self.talker = MagicMock()
+        organization = self.talker.github_organization
+        self.owner = MagicMock(id=1)
+        self.member = MagicMock(id=2)
+        self.outsider = MagicMock(id=3)
+        organization.get_members.side_effect = lambda role: {"admin": [self.owner], "member": [self.member]}[role]
+
+        self.repo = MagicMock(id=20, permissions=MagicMock(admin=True))
+        self.other_repo = MagicMock(id=21)
+        organization.get_repos.return_value = [self.repo, self.other_repo]
+
+        self.team = MagicMock(id=10)
+        self.team.get_members.return_value = [self.member]
+        self.team.get_repos.return_value = [self.repo]
+        self.unsynced_team = MagicMock(id=11)
+        organization.get_teams.return_value = [self.team, self.unsynced_team]
+
+        self.snapshot = githubsync.OrganizationSnapshot(self.talker, ["10", None, 12])
+
+    def test_listing(self):
+        self.assertEqual(self.snapshot.roles, {1: "admin", 2: "member"})
+        self.assertEqual(self.snapshot.team_members, {10: [self.member]})
+        self.assertEqual(self.snapshot.team_repo_permissions, {10: {20: self.repo.permissions}})
+        self.unsynced_team.get_members.assert_not_called()
+
+    def test_listing__workers(self):
+        snapshot = githubsync.OrganizationSnapshot(self.talker, ["10", None, 12], workers=4)
+        self.assertEqual(snapshot.roles, self.snapshot.roles)
+        self.assertEqual(snapshot.team_members, self.snapshot.team_members)
+        self.assertEqual(snapshot.team_repo_permissions, self.snapshot.team_repo_permissions)
+
+    def test_get(self):
+        self.assertIs(self.snapshot.get_team("10"), self.team)
+        self.assertIs(self.snapshot.get_team(12), self.talker.get_team.return_value)
+        self.assertIs(self.snapshot.get_user(2), self.member)
+        self.assertIs(self.snapshot.get_user(3), self.talker.get_user.return_value)
+        self.assertIs(self.snapshot.get_repo("21"), self.other_repo)
+        self.assertIs(self.snapshot.get_repo(22), self.talker.get_repo.return_value)
+        self.talker.get_team.assert_called_once_with(12)
+        self.talker.get_user.assert_called_once_with(3)
+        self.talker.get_repo.assert_called_once_with(22)
+
+    def test_get_role_of_user(self):
+        self.assertEqual(self.snapshot.get_role_of_user(self.owner), "admin")
+        self.assertEqual(self.snapshot.get_role_of_user(self.outsider), self.talker.get_role_of_user.return_value)
+
+    def test_team_members(self):
+        self.assertEqual(self.snapshot.get_team_members(self.team), [self.member])
+        self.assertTrue(self.snapshot.is_team_member(self.team, self.member))
+        self.assertFalse(self.snapshot.is_team_member(self.team, self.owner))
+        self.assertEqual(self.snapshot.get_team_members(self.unsynced_team), self.talker.get_team_members.return_value)
+        self.assertEqual(
+            self.snapshot.is_team_member(self.unsynced_team, self.owner), self.talker.is_team_member.return_value
+        )
+        self.talker.is_team_member.assert_called_once_with(self.unsynced_team, self.owner)
+
+    def test_team_repos(self):
+        self.assertTrue(self.snapshot.team_has_repo(self.team, self.repo))
+        self.assertFalse(self.snapshot.team_has_repo(self.team, self.other_repo))
+        self.assertIs(self.snapshot.get_team_repo_permission(self.team, self.repo), self.repo.permissions)
+        self.assertEqual(
+            self.snapshot.team_has_repo(self.unsynced_team, self.repo), self.talker.team_has_repo.return_value
+        )
+        self.assertEqual(
+            self.snapshot.get_team_repo_permission(self.team, self.other_repo),
+            self.talker.get_team_repo_permission.return_value,
+        )
+
+    def test_changes(self):
+        project, repo, user = MagicMock(), MagicMock(), MagicMock()
+        self.assertIs(self.snapshot.create_team(project), self.talker.create_team.return_value)
+        self.assertIs(self.snapshot.create_repo(repo), self.talker.create_repo.return_value)
+        self.snapshot.remove_user(user)
+        self.talker.create_team.assert_called_once_with(project)
+        self.talker.create_repo.assert_called_once_with(repo)
+        self.talker.remove_user.assert_called_once_with(user)
+
+
+class GraphQLOrganizationSnapshotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.create(year=2020, season=Semester.FALL)
+        cls.project = Project.objects.create(name="test1", slug="test1", github_team_id=1, semester=cls.semester)
+        cls.repo = Repository.objects.create(name="test-repo1", github_repo_id=201, project=cls.project, private=True)
+        for github_id, username in ((101, "member1"), (102, "newmember")):
+            employee = Employee.objects.create(github_id=github_id, github_username=username)
+            registration = Registration.objects.create(
+                user=employee,
+                dev_experience=Registration.EXPERIENCE_BEGINNER,
+                course=Course.objects.se(),
+                preference1=cls.project,
+                semester=cls.semester,
+            )
+            registration.projects.add(cls.project)
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.server = FakeGitHubServer()
+        self.addCleanup(self.server.stop)
+        self.server.resources = {
+            "/orgs/giphouse": {"login": "giphouse", "url": f"{self.server.url}/orgs/giphouse"},
+            "/user/102": {"login": "newmember", "id": 102, "url": f"{self.server.url}/users/newmember"},
+        }
+        self.server.graphql = self.graphql
+        self.queries = []
+        self.team_repos = [self.repo_edge(permission="ADMIN")]
+        self.talker = self.server.create_talker()
+
+    @staticmethod
+    def page(edges, next_cursor=None):
+        """Get a page of a connection, that is followed by the page after next_cursor if it is given."""
+        return {"edges": edges, "pageInfo": {"hasNextPage": next_cursor is not None, "endCursor": next_cursor}}
+
+    @staticmethod
+    def user_edge(login, github_id, role=None):
+        edge = {"node": {"login": login, "databaseId": github_id}}
+        return {**edge, "role": role} if role else edge
+
+    @staticmethod
+    def repo_edge(private=False, archived=False, permission=None):
+        node = {
+            "databaseId": 201,
+            "name": "test-repo1",
+            "nameWithOwner": "giphouse/test-repo1",
+            "owner": {"login": "giphouse"},
+            "isPrivate": private,
+            "isArchived": archived,
+        }
+        return {"node": node, "permission": permission} if permission else {"node": node}
+
+    def graphql(self, query, variables):
+        """Answer the queries of the snapshot like GitHub, with the members of team 1 on two pages."""
+        self.queries.append(variables)
+        cursor = variables["cursor"]
+        if "team(slug" in query:
+            self.assertEqual((variables["slug"], cursor), ("test1", "members1"))
+            organization = {"team": {"members": self.page([self.user_edge("leaver", 103)])}}
+        elif "teams(" in query:
+            team = {
+                "databaseId": 1,
+                "slug": "test1",
+                "name": "wrong name",
+                "description": "",
+                "members": self.page([self.user_edge("member1", 101)], "members1"),
+                "repositories": self.page(self.team_repos),
+            }
+            other = {**team, "databaseId": 2, "slug": "other", "name": "other"}
+            organization = {"teams": self.page([{"node": team}, {"node": other}])}
+        elif "membersWithRole" in query:
+            if cursor is None:
+                organization = {"membersWithRole": self.page([self.user_edge("owner", 1, "ADMIN")], "page2")}
+            else:
+                members = [self.user_edge("member1", 101, "MEMBER"), self.user_edge("leaver", 103, "MEMBER")]
+                organization = {"membersWithRole": self.page(members)}
+        else:
+            organization = {"repositories": self.page([self.repo_edge()])}
+        return {"data": {"organization": organization}}
+
+    def test_snapshot(self):
+        snapshot = githubsync.GraphQLOrganizationSnapshot(self.talker, [1, None])
+        self.assertEqual(snapshot.roles, {1: "admin", 101: "member", 103: "member"})
+        self.assertEqual(snapshot.get_user(103).login, "leaver")
+        self.assertEqual(set(snapshot.teams), {1, 2})
+        self.assertEqual(snapshot.get_team(1).name, "wrong name")
+        self.assertEqual([user.login for user in snapshot.team_members[1]], ["member1", "leaver"])
+        self.assertEqual(list(snapshot.team_members), [1])
+        permissions = snapshot.team_repo_permissions[1][201]
+        self.assertEqual((permissions.admin, permissions.push, permissions.pull), (True, True, True))
+        repo = snapshot.get_repo(201)
+        self.assertEqual((repo.full_name, repo.private, repo.archived), ("giphouse/test-repo1", False, False))
+        self.assertEqual(repo.owner.login, "giphouse")
+        # Two pages of members, the repositories, the teams and the second page of members of team 1
+        self.assertEqual(len(self.queries), 5)
+        self.assertEqual(self.server.requests, [("GET", "/orgs/giphouse")] + [("POST", "/graphql")] * 5)
+
+    def test_snapshot__workers(self):
+        snapshot = githubsync.GraphQLOrganizationSnapshot(self.talker, [1, None], workers=4)
+        self.assertEqual(snapshot.roles, {1: "admin", 101: "member", 103: "member"})
+        self.assertEqual(set(snapshot.repos), {201})
+        self.assertEqual(set(snapshot.teams), {1, 2})
+        self.assertEqual([user.login for user in snapshot.team_members[1]], ["member1", "leaver"])
+        self.assertTrue(snapshot.team_repo_permissions[1][201].admin)
+        self.assertEqual(len(self.queries), 5)
+
+    def test_snapshot__errors(self):
+        self.server.graphql = lambda query, variables: {"errors": [{"message": "Something went wrong"}]}
+        with self.assertRaises(GithubException):
+            githubsync.GraphQLOrganizationSnapshot(self.talker, [1])
+
+    def test_perform_sync(self):
+        sync = githubsync.GitHubSync(Project.objects.all())
+        sync.github = self.talker
+        sync.perform_sync()
+
+        self.assertEqual(
+            self.server.changes,
+            [
+                ("PATCH", "/teams/1", {"name": "test1", "description": self.project.generate_team_description()}),
+                ("PATCH", "/repos/giphouse/test-repo1", {"name": "test-repo1", "private": True}),
+                ("PUT", "/teams/1/memberships/newmember", {"role": "member"}),
+                ("DELETE", "/orgs/giphouse/members/leaver", None),
+            ],
+        )
+        self.assertEqual(sync.users_invited, 1)
+        self.assertEqual(sync.users_removed, 1)
+        self.assertFalse(sync.task.fail)
+        self.assertEqual(self.server.authorizations, ["token token1"] * 4)
+
+    def test_perform_sync__team_without_access(self):
+        """Test that a team is given admin access to a repository of the snapshot."""
+        self.team_repos = []
+        sync = githubsync.GitHubSync(Project.objects.all())
+        sync.github = self.talker
+        sync.logger = MagicMock()
+        sync.perform_sync()
+
+        self.assertIn(("PUT", "/teams/1/repos/giphouse/test-repo1", None), self.server.changes)
+        self.assertIn(("PUT", "/teams/1/repos/giphouse/test-repo1", {"permission": "admin"}), self.server.changes)
+        self.assertFalse(sync.task.fail)
+        sync.logger.error.assert_not_called()
+        sync.logger.exception.assert_not_called()
+
+    def test_execute_plan__renewed_token(self):
+        """Test that the changes planned with the objects of a snapshot are made with the renewed access token."""
+        sync = githubsync.GitHubSync(Project.objects.all())
+        sync.github = githubsync.GraphQLOrganizationSnapshot(self.talker, [1])
+        plan = sync.plan_sync()
+        self.talker._access_token.expires_at = datetime.now()
+        sync.execute_plan(plan)
+
+        self.assertEqual(len(self.server.changes), 4)
+        self.assertEqual(self.server.authorizations, ["token token2"] * 4)
+        self.assertFalse(sync.fail)
+
+
+class OrganizationSnapshotFakeGitHubTest(TransactionTestCase):
+    """Test the snapshot and the sync with workers, whose threads only see the data of committed transactions."""
+
+    serialized_rollback = True
+
+    def setUp(self):
+        self.semester = Semester.objects.create(year=2020, season=Semester.FALL)
+        self.project = Project.objects.create(name="test1", slug="test1", github_team_id=1, semester=self.semester)
+        Repository.objects.create(name="test-repo1", github_repo_id=201, project=self.project, private=True)
+        for github_id, username in ((101, "member1"), (102, "newmember")):
+            employee = Employee.objects.create(github_id=github_id, github_username=username)
+            registration = Registration.objects.create(
+                user=employee,
+                dev_experience=Registration.EXPERIENCE_BEGINNER,
+                course=Course.objects.se(),
+                preference1=self.project,
+                semester=self.semester,
+            )
+            registration.projects.add(self.project)
+
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        # A page size of one makes every list span multiple pages
+        self.server = FakeGitHubServer(page_size=1)
+        self.addCleanup(self.server.stop)
+        url = self.server.url
+
+        def user(login, github_id):
+            return {"login": login, "id": github_id, "url": f"{url}/users/{login}"}
+
+        repo = {
+            "id": 201,
+            "name": "test-repo1",
+            "full_name": "giphouse/test-repo1",
+            "private": False,
+            "archived": False,
+            "url": f"{url}/repos/giphouse/test-repo1",
+        }
+        team = {"id": 1, "name": "wrong name", "description": "", "url": f"{url}/teams/1"}
+        self.server.resources = {
+            "/orgs/giphouse": {"login": "giphouse", "url": f"{url}/orgs/giphouse"},
+            "/orgs/giphouse/members?role=admin": [user("owner", 1)],
+            "/orgs/giphouse/members?role=member": [user("member1", 101), user("leaver", 103)],
+            "/orgs/giphouse/repos": [repo],
+            "/orgs/giphouse/teams": [team, {"id": 2, "name": "other", "url": f"{url}/teams/2"}],
+            "/teams/1/members": [user("member1", 101), user("leaver", 103)],
+            "/teams/1/repos": [{**repo, "permissions": {"admin": True, "push": True, "pull": True}}],
+            "/user/102": user("newmember", 102),
+        }
+        self.talker = self.server.create_talker()
+
+    def test_snapshot(self):
+        snapshot = githubsync.OrganizationSnapshot(self.talker, [1, None], workers=4)
+        self.assertEqual(snapshot.roles, {1: "admin", 101: "member", 103: "member"})
+        self.assertEqual(set(snapshot.teams), {1, 2})
+        self.assertEqual([user.login for user in snapshot.team_members[1]], ["member1", "leaver"])
+        self.assertTrue(snapshot.team_repo_permissions[1][201].admin)
+        self.assertEqual(snapshot.get_repo(201).full_name, "giphouse/test-repo1")
+        self.assertEqual(list(snapshot.team_members), [1])
+
+    def test_snapshot__failed(self):
+        del self.server.resources["/orgs/giphouse/teams"]
+        with self.assertRaises(UnknownObjectException):
+            githubsync.OrganizationSnapshot(self.talker, [1], workers=4)
+
+    @patch.object(githubsync.GitHubSync, "snapshot_class", githubsync.OrganizationSnapshot)
+    def test_perform_sync__workers(self):
+        sync = githubsync.GitHubSync(Project.objects.all(), workers=4)
+        sync.github = self.talker
+        sync.logger = MagicMock()
+        sync.perform_sync()
+
+        self.assertEqual(
+            self.server.changes,
+            [
+                ("PATCH", "/teams/1", {"name": "test1", "description": self.project.generate_team_description()}),
+                ("PATCH", "/repos/giphouse/test-repo1", {"name": "test-repo1", "private": True}),
+                ("PUT", "/teams/1/memberships/newmember", {"role": "member"}),
+                ("DELETE", "/orgs/giphouse/members/leaver", None),
+            ],
+        )
+        # Everything is read before the first change, and the members of other teams are not listed
+        first_change = self.server.requests.index(("PATCH", "/teams/1"))
+        self.assertTrue(all(verb == "GET" for verb, _ in self.server.requests[:first_change]))
+        self.assertNotIn(("GET", "/teams/2/members"), self.server.requests)
+
+        self.assertEqual(sync.users_invited, 1)
+        self.assertEqual(sync.users_removed, 1)
+        self.assertEqual(sync.task.completed, sync.task.total)
+        self.assertFalse(sync.task.fail)
+        sync.logger.error.assert_not_called()
@@ -1,11 +1,13 @@
+from datetime import timedelta
 from unittest.mock import MagicMock
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from courses.models import Course, Semester
 
 from projects import githubsync
-from projects.models import Project, ProjectToBeDeleted, Repository, RepositoryToBeDeleted
+from projects.models import Project, ProjectSyncState, ProjectToBeDeleted, Repository, RepositoryToBeDeleted
 
 from registrations.models import Employee, Registration
 
@@ -112,3 +114,112 @@ class EmployeeQueryTest(TestCase):
         Repository.objects.create(name="testrepository1", project=project)
         Repository.objects.create(name="testrepository2", project=project)
         self.assertEqual(project.number_of_repos, 2)
+
+
+@override_settings(GITHUB_SYNC_RECONCILE_DAYS=7)
+class ProjectSyncStateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.create(year=2020, season=Semester.SPRING)
+        cls.project1 = Project.objects.create(name="test1", slug="test1", semester=cls.semester)
+        cls.project2 = Project.objects.create(name="test2", slug="test2", semester=cls.semester)
+        cls.repo1 = Repository.objects.create(name="testrepo1", project=cls.project1)
+        cls.employee = Employee.objects.create(github_id=0, github_username="user1")
+        cls.registration = Registration.objects.create(
+            user=cls.employee,
+            dev_experience=Registration.EXPERIENCE_BEGINNER,
+            course=Course.objects.se(),
+            preference1=cls.project1,
+            semester=cls.semester,
+        )
+
+    def setUp(self):
+        ProjectSyncState.mark_synced([self.project1, self.project2], timezone.now())
+
+    def assertChanged(self, *projects):
+        self.assertCountEqual(ProjectSyncState.projects_to_sync(), projects)
+
+    def test_projects_to_sync__never_synced(self):
+        project3 = Project.objects.create(name="test3", slug="test3", semester=self.semester)
+        ProjectSyncState.objects.filter(project=project3).delete()
+        self.assertChanged(project3)
+
+    def test_projects_to_sync__reconcile(self):
+        ProjectSyncState.mark_synced([self.project2], timezone.now() - timedelta(days=8))
+        self.assertChanged(self.project2)
+
+    def test_project_saved(self):
+        self.project1.save()
+        self.assertChanged(self.project1)
+
+    def test_project_saved_by_sync(self):
+        self.project1.github_team_id = 1234
+        self.project1.save(update_fields=["github_team_id"])
+        self.assertChanged()
+
+    def test_repository_saved(self):
+        self.repo1.private = False
+        self.repo1.save()
+        self.assertChanged(self.project1)
+
+    def test_repository_saved_by_sync(self):
+        self.repo1.is_archived = Repository.Archived.CONFIRMED
+        self.repo1.save(update_fields=["is_archived"])
+        self.assertChanged()
+
+    def test_repository_deleted(self):
+        self.repo1.delete()
+        self.assertChanged(self.project1)
+
+    def test_repository_without_project(self):
+        repo = Repository.objects.create(name="testrepo2")
+        repo.delete()
+        self.assertChanged()
+
+    def test_project_deleted(self):
+        self.project1.delete()
+        self.assertFalse(ProjectSyncState.objects.filter(project_id=self.repo1.project_id).exists())
+
+    def test_registration_projects_changed(self):
+        self.registration.projects.add(self.project2)
+        self.assertChanged(self.project2)
+
+        ProjectSyncState.mark_synced([self.project2], timezone.now())
+        self.registration.projects.remove(self.project2)
+        self.assertChanged(self.project2)
+
+    def test_registration_projects_cleared(self):
+        self.registration.projects.add(self.project2)
+        ProjectSyncState.mark_synced([self.project2], timezone.now())
+        self.registration.projects.clear()
+        self.assertChanged(self.project2)
+
+    def test_project_registrations_changed(self):
+        self.project2.registration_set.add(self.registration)
+        self.assertChanged(self.project2)
+
+        ProjectSyncState.mark_synced([self.project2], timezone.now())
+        self.project2.registration_set.clear()
+        self.assertChanged(self.project2)
+
+    def test_registration_deleted(self):
+        self.registration.projects.add(self.project2)
+        ProjectSyncState.mark_synced([self.project2], timezone.now())
+        self.registration.delete()
+        self.assertChanged(self.project2)
+
+    def test_employee_github_account_changed(self):
+        self.registration.projects.add(self.project2)
+        ProjectSyncState.mark_synced([self.project2], timezone.now())
+        self.employee.github_username = "user2"
+        self.employee.save()
+        self.assertChanged(self.project2)
+
+    def test_employee_saved_without_github_changes(self):
+        self.registration.projects.add(self.project2)
+        ProjectSyncState.mark_synced([self.project2], timezone.now())
+        self.employee.first_name = "Name"
+        self.employee.save()
+        self.employee.github_username = "user2"
+        self.employee.save(update_fields=["first_name"])
+        self.assertChanged()
@@ -0,0 +1,124 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import TestCase
+
+from projects.ratelimits import RequestMetrics, RequestScheduler
+
+
+@patch("projects.ratelimits.random.uniform", MagicMock(return_value=0.5))
+@patch("projects.ratelimits.time")
+class RequestSchedulerTest(TestCase):
+    def setUp(self):
+        self.scheduler = RequestScheduler()
+        self.scheduler._updated_at = 1000.0
+        self.request = MagicMock(return_value=(200, {}, "{}"))
+        self.scheduled = self.scheduler.schedule(self.request)
+
+    def test_install(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        requester = MagicMock()
+        request_json = requester.requestJson
+        request_json.return_value = (200, {}, "{}")
+        self.scheduler.install(requester)
+        self.assertEqual(requester.requestJson("GET", "/teams/1", headers={}), (200, {}, "{}"))
+        request_json.assert_called_once_with("GET", "/teams/1", headers={})
+        self.assertEqual(self.scheduler.metrics.calls, 1)
+
+    def test_schedule(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.request.return_value = (200, {"x-ratelimit-remaining": "10", "x-ratelimit-reset": "2000"}, "{}")
+        self.assertEqual(self.scheduled("GET", "/teams/1")[0], 200)
+        time_mock.sleep.assert_not_called()
+        self.assertEqual(self.scheduler.remaining, 10)
+        self.assertEqual(self.scheduler.reset_at, 2000.0)
+        self.assertEqual(self.scheduler.points, RequestScheduler.POINTS_PER_MINUTE - 1)
+
+        self.scheduled("GET", "/teams/1")
+        time_mock.sleep.assert_not_called()
+        self.assertEqual(self.scheduler.metrics.calls, 2)
+
+    def test_schedule__primary_limit_exhausted(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.scheduler.remaining = 0
+        self.scheduler.reset_at = 1030.0
+        self.scheduled("GET", "/teams/1")
+        time_mock.sleep.assert_called_once_with(30.0)
+        self.assertEqual(self.scheduler.metrics.throttled_seconds, 30.0)
+
+    def test_schedule__secondary_limit_bucket(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.scheduler.points = 0.0
+        self.scheduled("PATCH", "/teams/1")
+        time_mock.sleep.assert_called_once_with(RequestScheduler.WRITE_POINTS / 15)
+
+    def test_schedule__bucket_refills(self, time_mock):
+        time_mock.time.return_value = 1001.0
+        self.scheduler.points = 0.0
+        self.scheduled("GET", "/teams/1")
+        time_mock.sleep.assert_not_called()
+        self.assertEqual(self.scheduler.points, 14.0)
+
+    def test_schedule__retry_after(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.request.side_effect = [(429, {"retry-after": "10"}, ""), (200, {}, "{}")]
+        self.assertEqual(self.scheduled("POST", "/orgs/giphouse/teams")[0], 200)
+        time_mock.sleep.assert_called_once_with(10.5)
+        self.assertEqual(self.request.call_count, 2)
+        self.assertEqual(self.scheduler.metrics.retries, 1)
+        self.assertEqual(self.scheduler.metrics.calls, 2)
+
+    def test_schedule__primary_limit_refused(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.request.side_effect = [
+            (403, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1060"}, ""),
+            (200, {"x-ratelimit-remaining": "5000", "x-ratelimit-reset": "4600"}, "{}"),
+        ]
+        self.scheduled("GET", "/teams/1")
+        time_mock.sleep.assert_called_once_with(60.5)
+        self.assertEqual(self.scheduler.remaining, 5000)
+
+    def test_schedule__secondary_limit_refused(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        refused = (403, {}, '{"message": "You have exceeded a secondary rate limit."}')
+        self.request.side_effect = [refused, refused, (200, {}, "{}")]
+        self.scheduled("PUT", "/teams/1/memberships/user")
+        self.assertEqual(self.scheduler.blocked_until, 1000.0 + 120.5)
+        self.assertEqual(self.scheduler.metrics.retries, 2)
+
+    def test_schedule__too_many_retries(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.request.return_value = (429, {"retry-after": "1"}, "")
+        self.assertEqual(self.scheduled("GET", "/teams/1")[0], 429)
+        self.assertEqual(self.request.call_count, RequestScheduler.MAX_RETRIES + 1)
+        self.assertEqual(self.scheduler.metrics.retries, RequestScheduler.MAX_RETRIES)
+
+    def test_schedule__forbidden(self, time_mock):
+        time_mock.time.return_value = 1000.0
+        self.request.return_value = (403, {}, '{"message": "Must have admin rights to Repository."}')
+        self.assertEqual(self.scheduled("PATCH", "/repositories/1")[0], 403)
+        self.request.assert_called_once()
+        self.assertEqual(self.scheduler.blocked_until, 0.0)
+
+    @patch("projects.ratelimits.asyncio.sleep")
+    def test_schedule_async(self, sleep_mock, time_mock):
+        time_mock.time.return_value = 1000.0
+        request = AsyncMock(side_effect=[(429, {"retry-after": "10"}, ""), (200, {}, "{}")])
+        scheduled = self.scheduler.schedule_async(request)
+        self.assertEqual(asyncio.run(scheduled("GET", "/teams/1"))[0], 200)
+        sleep_mock.assert_awaited_once_with(10.5)
+        time_mock.sleep.assert_not_called()
+        self.assertEqual(request.await_count, 2)
+        self.assertEqual(self.scheduler.metrics.retries, 1)
+        self.assertEqual(self.scheduler.metrics.throttled_seconds, 10.5)
+
+
+class RequestMetricsTest(TestCase):
+    def test_metrics(self):
+        metrics = RequestMetrics(10, 2, 3.0)
+        before = metrics.copy()
+        metrics.calls += 5
+        metrics.throttled_seconds += 1.5
+        difference = metrics - before
+        self.assertEqual((difference.calls, difference.retries, difference.throttled_seconds), (5, 0, 1.5))
+        self.assertEqual(str(difference), "5 requests to GitHub, of which 0 retries, throttled for 1.5 seconds")
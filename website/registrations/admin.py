@@ -4,7 +4,9 @@ from io import StringIO
 from admin_auto_filters.filters import AutocompleteFilter
 
 from django import forms
+from django.conf import settings
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth import get_user_model
 from django.http import HttpResponse
 from django.shortcuts import redirect, render
@@ -15,7 +17,9 @@ from courses.models import Semester
 
 from projects.models import Project
 
-from registrations.models import Employee, Registration
+from registrations.incremental_assignment import IncrementalTeamAssignment
+from registrations.models import Employee, Registration, SolverProfile
+from registrations.snapshot import RegistrationSnapshot
 from registrations.team_assignment import CSV_STRUCTURE, TeamAssignmentGenerator
 
 User: Employee = get_user_model()
@@ -68,6 +72,8 @@ class UserAdmin(admin.ModelAdmin):
         "export_student_numbers",
         "export_registrations",
         "generate_project_assignment_proposal",
+        "generate_project_assignment_proposal_with_parameters",
+        "assign_late_registrations",
     )
 
     fieldsets = (
@@ -166,18 +172,26 @@ class UserAdmin(admin.ModelAdmin):
                 "Registration Comments",
             ]
         )
-        for user in queryset:
-            registration = user.registration_set.first()
+        # Take a snapshot of the registrations of all selected users at once, the most recent one comes first
+        snapshot = RegistrationSnapshot(Registration.objects.filter(user__in=queryset))
+        registration_for_user = {}
+        for registration in snapshot:
+            registration_for_user.setdefault(registration.user_id, registration)
+
+        for user in queryset.values_list("pk", flat=True):
+            registration = registration_for_user.get(user)
+            if registration is None:
+                continue
             writer.writerow(
                 [
-                    user.first_name,
-                    user.last_name,
-                    user.student_number,
-                    user.github_username,
-                    registration.course,
-                    registration.preference1,
-                    registration.preference2,
-                    registration.preference3,
+                    registration.first_name,
+                    registration.last_name,
+                    registration.student_number,
+                    registration.github_username,
+                    registration.course_name,
+                    snapshot.preferred_projects.get(registration.preference1_id),
+                    snapshot.preferred_projects.get(registration.preference2_id),
+                    snapshot.preferred_projects.get(registration.preference3_id),
                     registration.partner_preference1,
                     registration.partner_preference2,
                     registration.partner_preference3,
@@ -212,21 +226,119 @@ class UserAdmin(admin.ModelAdmin):
             f"Succesfully unassigned {num_unassigned} registrations.",
         )
 
-    def generate_project_assignment_proposal(self, request, queryset):
-        """Create task to compute project assignment."""
+    @staticmethod
+    def _get_registrations_in_one_semester(request, queryset):
+        """Get the registrations of the selected users, or None with a warning if they are not in one semester."""
         registrations = [user.registration_set.first() for user in queryset]
 
         if None in registrations:
             messages.warning(request, "All users should have a registration.")
-            return
+            return None
 
         if len(set(registration.semester for registration in registrations)) > 1:
             messages.warning(request, "All users should have a registration in the same semester.")
+            return None
+
+        return registrations
+
+    def generate_project_assignment_proposal(self, request, queryset, **generator_options):
+        """Create task to compute project assignment."""
+        registrations = self._get_registrations_in_one_semester(request, queryset)
+        if registrations is None:
             return
 
-        task = TeamAssignmentGenerator(registrations).start_solve_task()
+        task = TeamAssignmentGenerator.start_solve_job(registrations, **generator_options)
         return redirect("admin:progress_bar", task=task.id)
 
+    def generate_project_assignment_proposal_with_parameters(self, request, queryset):
+        """Ask for the solver parameters and then create a task to compute the project assignment."""
+        if "apply" in request.POST:
+            form = SolverParametersForm(request.POST, request.FILES)
+            if form.is_valid():
+                return self.generate_project_assignment_proposal(request, queryset, **form.get_generator_options())
+        else:
+            form = SolverParametersForm(initial=settings.TEAM_ASSIGNMENT_SOLVER_PARAMETERS)
+
+        return render(
+            request,
+            "admin/registrations/solver-parameters.html",
+            {
+                "form": form,
+                "queryset": queryset,
+                "action": "generate_project_assignment_proposal_with_parameters",
+                "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+                "title": "Solver parameters",
+            },
+        )
+
+    generate_project_assignment_proposal_with_parameters.short_description = (
+        "Generate project assignment proposal with custom solver parameters"
+    )
+
+    def assign_late_registrations(self, request, queryset):
+        """
+        Propose a project for the selected users without a project, without moving anyone who already has one.
+
+        The proposal is shown to be confirmed, and is only assigned once it is.
+        """
+        registrations = self._get_registrations_in_one_semester(request, queryset)
+        if registrations is None:
+            return
+
+        if "apply" in request.POST:
+            return self._assign_proposed_projects(request, registrations)
+
+        incremental_assignment = IncrementalTeamAssignment(registrations)
+        if not incremental_assignment.late:
+            messages.warning(request, "All selected users already have a project.")
+            return
+
+        assignment = incremental_assignment.generate()
+        if not assignment:
+            messages.error(request, "No project assignment was found for the selected users without a project.")
+            return
+
+        return render(
+            request,
+            "admin/registrations/late-assignment.html",
+            {
+                "proposal": [
+                    (registration, assignment[registration.pk]) for registration in incremental_assignment.late
+                ],
+                "queryset": queryset,
+                "action": "assign_late_registrations",
+                "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+                "title": "Project assignment proposal",
+            },
+        )
+
+    @staticmethod
+    def _assign_proposed_projects(request, registrations):
+        """Assign a confirmed proposal, to the registrations that still have no project."""
+        proposal = {registration: request.POST.get(f"project_{registration.pk}", "") for registration in registrations}
+        projects = Project.objects.filter(semester=registrations[0].semester).in_bulk(
+            [pk for pk in proposal.values() if pk.isdigit()]
+        )
+
+        assigned = ignored = 0
+        for registration, pk in proposal.items():
+            project = projects.get(int(pk)) if pk.isdigit() else None
+            if project is None:
+                continue
+            if registration.project is not None:
+                ignored += 1
+                continue
+            registration.project = project
+            assigned += 1
+
+        messages.success(request, f"Successfully assigned {assigned} registrations to a project.")
+        if ignored:
+            messages.warning(
+                request, f"{ignored} registrations were assigned a project in the meantime and were ignored."
+            )
+
+    assign_late_registrations.short_description = "Propose a project for selected users without a project"
+
     def get_urls(self):
         """Get admin urls."""
         urls = super().get_urls()
@@ -330,6 +442,86 @@ class ImportAssignmentAdminView(View):
         return redirect("..")
 
 
+@admin.register(SolverProfile)
+class SolverProfileAdmin(admin.ModelAdmin):
+    """Custom admin for solver profiles."""
+
+    list_display = (
+        "name",
+        "project_preference_weight",
+        "partner_preference_weight",
+        "mixed_programming_experience_weight",
+        "max_time_in_seconds",
+        "num_search_workers",
+        "not_international_manager_constraint",
+    )
+
+
+class SolverParametersForm(forms.Form):
+    """Form used to set the solver parameters of a team assignment run."""
+
+    num_search_workers = forms.IntegerField(min_value=1, max_value=64)
+    max_time_in_seconds = forms.FloatField(min_value=1, help_text="In deterministic mode, this is deterministic time.")
+    relative_gap_limit = forms.FloatField(
+        min_value=0, max_value=1, help_text="Stop when the objective is within this fraction of the best bound."
+    )
+    random_seed = forms.IntegerField(min_value=0)
+    deterministic = forms.BooleanField(required=False)
+    log_search_progress = forms.BooleanField(required=False)
+
+    warm_start = forms.BooleanField(
+        required=False, help_text="Start the search from the current project memberships and the previous assignment."
+    )
+    previous_assignment = forms.FileField(
+        required=False, help_text="The CSV file with the project assignment proposal of a previous run."
+    )
+    fix_assigned = forms.BooleanField(
+        required=False, help_text="Keep users that are already in a project in that project."
+    )
+    symmetry_breaking = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="Exclude equivalent assignments of interchangeable projects and users from the search.",
+    )
+    heuristic_hints = forms.BooleanField(
+        required=False, help_text="Start the search from the assignment of the fast heuristic."
+    )
+    portfolio_size = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=10,
+        initial=1,
+        help_text="The number of distinct proposals to generate and compare. More proposals take extra solving time.",
+    )
+    profile = forms.ModelChoiceField(
+        queryset=SolverProfile.objects.all(),
+        required=False,
+        help_text="Use the objective weights, time limit, workers and constraints of a stored solver profile.",
+    )
+    strategy = forms.ChoiceField(
+        choices=TeamAssignmentGenerator.STRATEGY_CHOICES,
+        initial=TeamAssignmentGenerator.STRATEGY_MONOLITHIC,
+        help_text="Assigning managers and engineers separately is faster for large semesters, but can be worse.",
+    )
+
+    def get_generator_options(self):
+        """Get the keyword arguments for the TeamAssignmentGenerator from the cleaned data."""
+        previous_assignment = self.cleaned_data["previous_assignment"]
+        return {
+            "solver_parameters": {
+                name: self.cleaned_data[name] for name in settings.TEAM_ASSIGNMENT_SOLVER_PARAMETERS.keys()
+            },
+            "warm_start": self.cleaned_data["warm_start"],
+            "previous_assignment": previous_assignment.read().decode("utf-8") if previous_assignment else None,
+            "fix_assigned": self.cleaned_data["fix_assigned"],
+            "symmetry_breaking": self.cleaned_data["symmetry_breaking"],
+            "strategy": self.cleaned_data["strategy"],
+            "heuristic_hints": self.cleaned_data["heuristic_hints"],
+            "profile": self.cleaned_data["profile"],
+            "portfolio_size": self.cleaned_data["portfolio_size"] or 1,
+        }
+
+
 class DownloadAssignmentForm(forms.Form):
     """Form used when generating and downloading a team assignment."""
 
@@ -0,0 +1,181 @@
+import random
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from courses.models import Course, Semester
+
+from giphousewebsite.fake_data import fake, generate_fake_github_username
+
+from projects.models import Project
+
+from registrations.models import Employee, Registration
+from registrations.team_assignment import TeamAssignmentGenerator
+
+User: Employee = get_user_model()
+
+
+class SyntheticCohort:
+    """
+    A synthetic semester of registrations, to benchmark the team assignment on.
+
+    The cohort is created in its own semester when entering the context, within a transaction that is rolled back
+    when leaving it, so no synthetic data is left behind, even if creating or benchmarking it fails. Names, project
+    names and comments come from the same Faker setup as the createfixtures command.
+    """
+
+    # The cohort gets a semester far in the future, so it never mixes with real registrations
+    YEAR = 9999
+
+    def __init__(
+        self,
+        students,
+        students_per_project=8,
+        manager_ratio=0.2,
+        preference_density=0.7,
+        international_ratio=0.3,
+        experience_distribution=(1, 1, 1),
+        seed=0,
+    ):
+        """
+        Set up the shape of the cohort.
+
+        :param students: The number of registrations
+        :param students_per_project: The average number of registrations per project
+        :param manager_ratio: The fraction of registrations that follow the management course
+        :param preference_density: The probability that each project and partner preference is filled in
+        :param international_ratio: The fraction of international registrations
+        :param experience_distribution: The relative frequency of the beginner, intermediate and advanced programming
+        experience levels
+        :param seed: The seed for the random generators, so the same parameters give the same cohort
+        """
+        self.students = students
+        self.students_per_project = students_per_project
+        self.manager_ratio = manager_ratio
+        self.preference_density = preference_density
+        self.international_ratio = international_ratio
+        self.experience_distribution = experience_distribution
+        self.seed = seed
+
+    def parameters(self):
+        """Get the parameters of the cohort, to report along with the benchmark results."""
+        return {
+            "students": self.students,
+            "students_per_project": self.students_per_project,
+            "manager_ratio": self.manager_ratio,
+            "preference_density": self.preference_density,
+            "international_ratio": self.international_ratio,
+            "experience_distribution": list(self.experience_distribution),
+            "seed": self.seed,
+        }
+
+    def __enter__(self):
+        """Create the cohort in a new transaction and return its registrations."""
+        self._atomic = transaction.atomic()
+        self._atomic.__enter__()
+        try:
+            return self._create()
+        except BaseException:
+            self.__exit__(*sys.exc_info())
+            raise
+
+    def _create(self):
+        """Create the semester, projects, users and registrations of the cohort."""
+        rng = random.Random(self.seed)
+        fake.seed_instance(self.seed)
+
+        self.semester = Semester.objects.create(year=self.YEAR, season=Semester.SPRING)
+        projects = [
+            Project.objects.create(
+                name=f"{fake.word().capitalize()} {p}", slug=f"benchmark-{p}", semester=self.semester
+            )
+            for p in range(max(1, round(self.students / self.students_per_project)))
+        ]
+        # Negative GitHub ids cannot clash with real users
+        self.users = User.objects.bulk_create(
+            User(
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                github_id=-1 - i,
+                github_username=generate_fake_github_username(rng),
+            )
+            for i in range(self.students)
+        )
+
+        def maybe(value):
+            return value if rng.random() < self.preference_density else None
+
+        managers = round(self.students * self.manager_ratio)
+        sdm, se = Course.objects.sdm(), Course.objects.se()
+        levels = [level for level, _ in Registration.EXPERIENCE_CHOICES]
+        Registration.objects.bulk_create(
+            Registration(
+                user=user,
+                semester=self.semester,
+                course=sdm if i < managers else se,
+                is_international=rng.random() < self.international_ratio,
+                dev_experience=rng.choices(levels, weights=self.experience_distribution)[0],
+                preference1=maybe(rng.choice(projects)),
+                preference2=maybe(rng.choice(projects)),
+                preference3=maybe(rng.choice(projects)),
+                partner_preference1=maybe(rng.choice(self.users).get_full_name()),
+                partner_preference2=maybe(rng.choice(self.users).get_full_name()),
+                partner_preference3=maybe(rng.choice(self.users).get_full_name()),
+                comments=fake.sentence(),
+            )
+            for i, user in enumerate(self.users)
+        )
+        return list(Registration.objects.filter(semester=self.semester).order_by("pk"))
+
+    def __exit__(self, *exc_info):
+        """Roll back the transaction that created the cohort."""
+        transaction.set_rollback(True)
+        self._atomic.__exit__(*exc_info)
+
+
+def benchmark_team_assignment(registrations, profiles=(), **generator_options):
+    """
+    Build and solve the team assignment for some registrations, and measure it.
+
+    The build time covers setting up the generator, which builds the model for the monolithic strategy. The other
+    strategies build their models while solving, so that time is part of the solve time. The profiles are evaluated
+    after the first solve, on the same generator.
+
+    :param registrations: The registrations to assign
+    :param profiles: SolverProfiles to also generate an assignment with
+    :param generator_options: Keyword arguments for the TeamAssignmentGenerator
+    :return: A JSON serializable dict with the measurements, and those of every profile
+    """
+    start = time.perf_counter()
+    generator = TeamAssignmentGenerator(registrations, **generator_options)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assignment = generator.generate_team_assignment()
+    solve_time = time.perf_counter() - start
+    result = {
+        "managers": len(generator.managers),
+        "engineers": len(generator.engineers),
+        "projects": len(generator.projects),
+        "build_time": build_time,
+        "solve_time": solve_time,
+        **generator.model_statistics(),
+        **{name: generator.run_statistics[name] for name in ("status", "objective", "objectives")},
+        "objective_weights": dict(generator.objective_weights),
+        "assigned": len(assignment),
+    }
+
+    result["profiles"] = [
+        {
+            "profile": profile.name,
+            "objective_weights": profile.objective_weights(),
+            "assigned": len(profile_assignment),
+            **statistics,
+        }
+        for profile, profile_assignment, statistics in generator.evaluate_profiles(profiles)
+    ]
+    result["solves"] = generator.solve_statistics
+    generator.task.delete()
+    return result
@@ -0,0 +1,217 @@
+import random
+import time
+
+import numpy as np
+
+from registrations.models import Registration
+
+
+class HeuristicTeamAssignment:
+    """
+    Assign registrations to projects with a greedy heuristic, followed by swap-based local search.
+
+    The heuristic has the same constraints and objectives as the model of the TeamAssignmentGenerator, but it runs in
+    plain Python, so it finds a reasonable (but not necessarily optimal) assignment within a second, even for
+    hundreds of registrations.
+    """
+
+    TIME_LIMIT = 1.0
+
+    def __init__(self, generator, fixed_assignment=None, random_seed=0):
+        """
+        Get the registrations, projects and objective weights from a team assignment generator.
+
+        :param generator: The TeamAssignmentGenerator, with its objective weights computed for all registrations, and
+        the weights of its partial objectives
+        :param fixed_assignment: A dict from registration pk to the project that registration must stay in
+        :param random_seed: The seed for the order in which the local search tries swaps
+        """
+        self.projects = generator.projects
+        self.registrations = generator.registrations
+        weights = generator.objective_weights
+        self.project_preference_weights = weights["project_preference"] * generator.project_preference_weights
+        self.pair_weights = weights["partner_preference"] * (
+            generator.partner_preference_weights + generator.partner_preference_weights.T
+        )
+        self.experience_weight = weights["mixed_programming_experience"]
+        self.random = random.Random(random_seed)
+
+        # Only registrations in the same group can be swapped, as each project needs a fixed number of each group
+        managers = range(len(generator.managers))
+        engineers = range(len(generator.managers), len(self.registrations))
+        self.groups = [(managers, generator.managers_per_project), (engineers, generator.engineers_per_project)]
+        self.group_of = [0] * len(managers) + [1] * len(engineers)
+
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        fixed_assignment = fixed_assignment or {}
+        self.fixed = {
+            i: project_index[fixed_assignment[registration.pk].pk]
+            for i, registration in enumerate(self.registrations)
+            if registration.pk in fixed_assignment
+        }
+
+        self.not_international = [not manager.is_international for manager in generator.managers]
+        self.not_international += [False] * len(engineers)
+        self.not_international_required = generator.not_international_manager_constraint and sum(
+            self.not_international
+        ) >= len(self.projects)
+
+        levels = [level for level, _ in Registration.EXPERIENCE_CHOICES]
+        self.experience = [None] * len(managers) + [
+            engineer.dev_experience if engineer.dev_experience in levels else None for engineer in generator.engineers
+        ]
+        self.experience_targets = {level: self.experience.count(level) for level in levels}
+
+    def generate(self):
+        """
+        Generate an assignment.
+
+        :return: A dict from registration pk to project, or an empty dict if no assignment was found
+        """
+        deadline = time.perf_counter() + self.TIME_LIMIT
+        if not self.projects or not self._seed():
+            return {}
+        self._local_search(deadline)
+        return {
+            registration.pk: self.projects[self.project_of[i]] for i, registration in enumerate(self.registrations)
+        }
+
+    def objective(self):
+        """Get the objective value of the current assignment, as the model of the generator would compute it."""
+        project_preferences = sum(self.project_preference_weights[i, p] for i, p in enumerate(self.project_of))
+        partner_preferences = sum(self.together_weights[i, p] for i, p in enumerate(self.project_of)) // 2
+        experience_penalty = sum(
+            abs(count * len(self.projects) - self.experience_targets[level])
+            for level, counts in self.experience_count.items()
+            for count in counts
+        )
+        return int(project_preferences + partner_preferences - self.experience_weight * experience_penalty)
+
+    def _seed(self):
+        """
+        Greedily assign all registrations.
+
+        First the fixed registrations are placed, then a not-international manager in every project (if there are
+        enough of them), and then the other registrations, those with the strongest project preferences first.
+
+        :return: Whether all registrations could be assigned
+        """
+        self.project_of = [None] * len(self.registrations)
+        self.remaining = [list(counts) for _, counts in self.groups]
+        # The sum of the pair weights of every registration with the members of every project
+        self.together_weights = np.zeros((len(self.registrations), len(self.projects)), dtype=self.pair_weights.dtype)
+        self.experience_count = {level: [0] * len(self.projects) for level in self.experience_targets}
+        self.not_international_count = [0] * len(self.projects)
+
+        for i, p in self.fixed.items():
+            if not self.remaining[self.group_of[i]][p]:
+                return False
+            self._place(i, p)
+
+        if self.not_international_required:
+            managers, _ = self.groups[0]
+            for p in range(len(self.projects)):
+                if self.not_international_count[p]:
+                    continue
+                candidates = [i for i in managers if self.project_of[i] is None and self.not_international[i]]
+                if not candidates or not self.remaining[0][p]:
+                    return False
+                self._place(max(candidates, key=lambda i: self._gain(i, p)), p)
+
+        unassigned = sorted(
+            (i for i in range(len(self.registrations)) if self.project_of[i] is None),
+            key=lambda i: -self.project_preference_weights[i].max(),
+        )
+        for i in unassigned:
+            remaining = self.remaining[self.group_of[i]]
+            available = [p for p in range(len(self.projects)) if remaining[p]]
+            self._place(i, max(available, key=lambda p: (self._gain(i, p), remaining[p])))
+        return True
+
+    def _local_search(self, deadline):
+        """Apply improving swaps until no swap improves the assignment or the deadline has passed."""
+        improved = True
+        while improved:
+            improved = False
+            for members, _ in self.groups:
+                movable = [i for i in members if i not in self.fixed]
+                self.random.shuffle(movable)
+                for x, a in enumerate(movable):
+                    if time.perf_counter() > deadline:
+                        return
+                    for b in movable[x + 1 :]:
+                        if self._can_swap(a, b) and self._swap_gain(a, b) > 0:
+                            self._swap(a, b)
+                            improved = True
+
+    def _experience_penalty_change(self, changes):
+        """Get the change of the experience penalty for a list of (level, project, change in count) triples."""
+        penalty = 0
+        for level, p, change in changes:
+            if level is not None:
+                count, target = self.experience_count[level][p] * len(self.projects), self.experience_targets[level]
+                penalty += abs(count + change * len(self.projects) - target) - abs(count - target)
+        return penalty
+
+    def _gain(self, i, p):
+        """Get the change of the objective when adding registration i to project p."""
+        return (
+            self.project_preference_weights[i, p]
+            + self.together_weights[i, p]
+            - self.experience_weight * self._experience_penalty_change([(self.experience[i], p, 1)])
+        )
+
+    def _place(self, i, p):
+        """Add registration i to project p."""
+        self.project_of[i] = p
+        self.remaining[self.group_of[i]][p] -= 1
+        self.together_weights[:, p] += self.pair_weights[:, i]
+        if self.experience[i] is not None:
+            self.experience_count[self.experience[i]][p] += 1
+        self.not_international_count[p] += self.not_international[i]
+
+    def _can_swap(self, a, b):
+        """Check whether registrations a and b can swap projects without violating a constraint."""
+        p, q = self.project_of[a], self.project_of[b]
+        if p == q:
+            return False
+        if self.not_international_required and self.not_international[a] != self.not_international[b]:
+            # The project that loses its not-international manager must keep another one
+            return self.not_international_count[p if self.not_international[a] else q] > 1
+        return True
+
+    def _swap_gain(self, a, b):
+        """Get the change of the objective when registrations a and b swap projects."""
+        p, q = self.project_of[a], self.project_of[b]
+        level_a, level_b = self.experience[a], self.experience[b]
+        return (
+            self.project_preference_weights[a, q]
+            + self.project_preference_weights[b, p]
+            - self.project_preference_weights[a, p]
+            - self.project_preference_weights[b, q]
+            # a and b are not together before or after the swap
+            + self.together_weights[a, q]
+            + self.together_weights[b, p]
+            - 2 * self.pair_weights[a, b]
+            - self.together_weights[a, p]
+            - self.together_weights[b, q]
+            - self.experience_weight
+            * (
+                self._experience_penalty_change([(level_a, p, -1), (level_a, q, 1), (level_b, p, 1), (level_b, q, -1)])
+                if level_a != level_b
+                else 0
+            )
+        )
+
+    def _swap(self, a, b):
+        """Swap the projects of registrations a and b."""
+        p, q = self.project_of[a], self.project_of[b]
+        self.project_of[a], self.project_of[b] = q, p
+        self.together_weights[:, p] += self.pair_weights[:, b] - self.pair_weights[:, a]
+        self.together_weights[:, q] += self.pair_weights[:, a] - self.pair_weights[:, b]
+        for level, old, new in [(self.experience[a], p, q), (self.experience[b], q, p)]:
+            if level is not None:
+                self.experience_count[level][old] -= 1
+                self.experience_count[level][new] += 1
+        self.not_international_count[p] += self.not_international[b] - self.not_international[a]
+        self.not_international_count[q] += self.not_international[a] - self.not_international[b]
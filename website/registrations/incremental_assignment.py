@@ -0,0 +1,237 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from courses.models import Course
+
+from projects.models import Project
+
+from registrations.models import Employee, Registration
+from registrations.partner_matching import PartnerNameResolver
+from registrations.team_assignment import (
+    partner_preference_slot_weights,
+    preference_weight_matrix,
+    project_preference_slot_weights,
+)
+
+User: Employee = get_user_model()
+
+
+class IncrementalTeamAssignment:
+    """
+    Assign late registrations to projects, without moving anyone who already has a project.
+
+    Only the registrations without a project get assignment variables, so the model stays small and is solved well
+    within a second. The project and partner preferences are weighted the same as in the TeamAssignmentGenerator.
+    Partner preferences between a late registration and a current member only depend on the project the late
+    registration is assigned to, so they are added to the weight of that assignment instead of needing extra
+    variables. The projects are topped up evenly: for every course, the projects with the fewest members get the late
+    registrations, up to the lowest level at which all late registrations of that course fit.
+    """
+
+    TIME_LIMIT = 0.5
+
+    def __init__(self, registrations, solver_parameters=None):
+        """
+        Get the current project members and the late registrations of a semester.
+
+        :param registrations: The registrations to consider, those that already have a project are left in place
+        :param solver_parameters: Solver parameters overriding settings.TEAM_ASSIGNMENT_SOLVER_PARAMETERS
+        """
+        self.semester = registrations[0].semester
+        self.solver_parameters = {**settings.TEAM_ASSIGNMENT_SOLVER_PARAMETERS, **(solver_parameters or {})}
+        self.logger = logging.getLogger("automaticteams")
+
+        sdm, se = Course.objects.sdm(), Course.objects.se()
+        self.courses = [sdm.pk, se.pk]
+        self.projects = list(Project.objects.filter(semester=self.semester).order_by("pk"))
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+
+        memberships = dict(
+            Registration.projects.through.objects.filter(
+                project__in=self.projects, registration__course__in=self.courses
+            )
+            .order_by("project_id")
+            .values_list("registration_id", "project_id")
+        )
+        self.members = list(Registration.objects.filter(pk__in=memberships).order_by("pk"))
+        self.member_projects = [project_index[memberships[member.pk]] for member in self.members]
+        self.late = [
+            registration
+            for registration in registrations
+            if registration.course_id in self.courses and registration.pk not in memberships
+        ]
+
+        self.partner_preferences = PartnerNameResolver(
+            User.objects.filter(registration__semester=self.semester)
+        ).resolve(self.late + self.members)
+
+    def capacities(self):
+        """
+        Get the number of late registrations of every course that every project can take.
+
+        :return: A dict from course pk to a list with the capacity of every project
+        """
+        capacities = {}
+        for course in self.courses:
+            current = [0] * len(self.projects)
+            for member, p in zip(self.members, self.member_projects):
+                current[p] += member.course_id == course
+            late = len([registration for registration in self.late if registration.course_id == course])
+
+            level = min(current, default=0)
+            while self.projects and sum(max(0, level - count) for count in current) < late:
+                level += 1
+            capacities[course] = [max(0, level - count) for count in current]
+        return capacities
+
+    def _compute_objective_weights(self):
+        """
+        Compute the weight of assigning every late registration to every project.
+
+        The project preference weights are the same as in the TeamAssignmentGenerator. The partner preference
+        weights with current members are summed per project, and the partner preference weights between late
+        registrations are kept as pair weights.
+        """
+        people = self.late + self.members
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        person_index = {registration.user_id: i for i, registration in enumerate(people)}
+
+        preferred_projects = np.array(
+            [
+                [registration.preference1_id, registration.preference2_id, registration.preference3_id]
+                for registration in self.late
+            ],
+            dtype=object,
+        ).reshape(len(self.late), 3)
+        preferred_partners = np.array(
+            [
+                [user.pk if user is not None else None for user in self.partner_preferences[registration.pk]]
+                for registration in people
+            ],
+            dtype=object,
+        ).reshape(len(people), 3)
+
+        self.project_preference_weights = preference_weight_matrix(
+            preferred_projects,
+            project_index,
+            len(self.projects),
+            project_preference_slot_weights,
+        )
+        partner_preference_weights = preference_weight_matrix(
+            preferred_partners,
+            person_index,
+            len(people),
+            partner_preference_slot_weights,
+        )
+        np.fill_diagonal(partner_preference_weights, 0)
+        pair_weights = partner_preference_weights + partner_preference_weights.T
+
+        membership = np.zeros((len(self.members), len(self.projects)), dtype=int)
+        membership[np.arange(len(self.members)), self.member_projects] = 1
+        self.member_partner_weights = pair_weights[: len(self.late), len(self.late) :] @ membership
+        self.pair_weights = np.triu(pair_weights[: len(self.late), : len(self.late)], k=1)
+
+    def _set_up_model(self):
+        """Set up the model with the assignment variables of the late registrations, the constraints and objective."""
+        self.model = cp_model.CpModel()
+        self.assigned = [
+            [self.model.NewBoolVar(f"assigned_registration{r}_to_project{p}") for p in range(len(self.projects))]
+            for r in range(len(self.late))
+        ]
+
+        for variables in self.assigned:
+            self.model.AddExactlyOne(variables)
+
+        for course, capacity in self.capacities().items():
+            rows = [r for r, registration in enumerate(self.late) if registration.course_id == course]
+            for p in range(len(self.projects)):
+                self.model.Add(sum(self.assigned[r][p] for r in rows) <= capacity[p])
+
+        self._1_not_international_per_project_constraint()
+
+        self._compute_objective_weights()
+        self.objectives = {
+            "project_preference": self._linear_objective(self.project_preference_weights),
+            "partner_preference": self._linear_objective(self.member_partner_weights)
+            + self._late_partner_preference_objective(),
+        }
+        self.model.Maximize(sum(self.objectives.values()))
+
+    def _1_not_international_per_project_constraint(self):
+        """
+        Add the constraint that each project without a not-international manager gets one, if that is possible.
+
+        Like in the TeamAssignmentGenerator, the constraint is left out if there are too few late not-international
+        managers, or too little room for managers in the projects that need one.
+        """
+        manager_course = self.courses[0]
+        capacity = self.capacities()[manager_course]
+        covered = {
+            p
+            for member, p in zip(self.members, self.member_projects)
+            if member.course_id == manager_course and not member.is_international
+        }
+        missing = [p for p in range(len(self.projects)) if p not in covered]
+        candidates = [
+            r
+            for r, registration in enumerate(self.late)
+            if registration.course_id == manager_course and not registration.is_international
+        ]
+
+        if len(candidates) >= len(missing) and all(capacity[p] for p in missing):
+            for p in missing:
+                self.model.Add(sum(self.assigned[r][p] for r in candidates) >= 1)
+
+    def _linear_objective(self, weights):
+        """Create a partial objective from a matrix with a weight for every late registration and project."""
+        rows, columns = np.nonzero(weights)
+        return sum(int(weights[r, p]) * self.assigned[r][p] for r, p in zip(rows.tolist(), columns.tolist()))
+
+    def _late_partner_preference_objective(self):
+        """Create the partial objective for partner preferences between late registrations, as the generator does."""
+        rows, columns = np.nonzero(self.pair_weights)
+        objective = []
+        for i, j in zip(rows.tolist(), columns.tolist()):
+            for p in range(len(self.projects)):
+                assigned1, assigned2 = self.assigned[i][p], self.assigned[j][p]
+                together = self.model.NewBoolVar(f"registration_{i}_together_in_project_{p}_with_registration_{j}")
+                self.model.AddBoolAnd([assigned1, assigned2]).OnlyEnforceIf(together)
+                self.model.AddBoolOr([assigned1.Not(), assigned2.Not(), together])
+                objective.append(int(self.pair_weights[i, j]) * together)
+        return sum(objective)
+
+    def generate(self):
+        """
+        Assign the late registrations to projects.
+
+        :return: A dict from registration pk to project, or an empty dict if there are no late registrations or no
+        assignment was found
+        """
+        if not self.late or not self.projects:
+            return {}
+
+        self._set_up_model()
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = self.solver_parameters["num_search_workers"]
+        solver.parameters.random_seed = self.solver_parameters["random_seed"]
+        solver.parameters.max_time_in_seconds = self.TIME_LIMIT
+        status = solver.Solve(self.model)
+        self.logger.info(
+            f"Incremental assignment of {len(self.late)} registrations finished with status "
+            f"{solver.StatusName(status)} after {solver.WallTime():.2f} seconds"
+        )
+
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return {}
+        return {
+            registration.pk: self.projects[p]
+            for r, registration in enumerate(self.late)
+            for p in range(len(self.projects))
+            if solver.BooleanValue(self.assigned[r][p])
+        }
@@ -0,0 +1,94 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registrations.benchmark import SyntheticCohort, benchmark_team_assignment
+from registrations.models import SolverProfile
+from registrations.team_assignment import TeamAssignmentGenerator
+
+
+class Command(BaseCommand):
+    """Command to benchmark the team assignment on synthetic cohorts."""
+
+    help = "Benchmark the automatic team assignment on synthetic cohorts and print the measurements as JSON"
+
+    def add_arguments(self, parser):
+        """Add the cohort and solver arguments."""
+        parser.add_argument(
+            "--students", type=int, nargs="+", default=[50, 100, 150], help="The cohort sizes to benchmark"
+        )
+        parser.add_argument("--students-per-project", type=int, default=8)
+        parser.add_argument("--manager-ratio", type=float, default=0.2)
+        parser.add_argument("--preference-density", type=float, default=0.7)
+        parser.add_argument("--international-ratio", type=float, default=0.3)
+        parser.add_argument(
+            "--experience-distribution",
+            type=float,
+            nargs=3,
+            default=[1, 1, 1],
+            help="The relative frequency of beginners, intermediates and advanced programmers",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--max-time", type=float, default=60.0, help="The solver time limit in seconds")
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--strategy",
+            choices=[strategy for strategy, _ in TeamAssignmentGenerator.STRATEGY_CHOICES],
+            default=TeamAssignmentGenerator.STRATEGY_MONOLITHIC,
+        )
+        parser.add_argument("--no-symmetry-breaking", action="store_true")
+        parser.add_argument(
+            "--profiles", nargs="+", default=[], help="The names of solver profiles to also evaluate on every cohort"
+        )
+        parser.add_argument("--output", help="Write the JSON to this file instead of to the standard output")
+
+    def handle(self, *args, **options):
+        """Create every cohort, benchmark the team assignment on it and write all results."""
+        logging.getLogger("automaticteams").setLevel(logging.WARNING)
+
+        profiles = list(SolverProfile.objects.filter(name__in=options["profiles"]))
+        missing = set(options["profiles"]) - {profile.name for profile in profiles}
+        if missing:
+            raise CommandError(f"Unknown solver profiles: {', '.join(sorted(missing))}")
+
+        results = []
+        for students in options["students"]:
+            cohort = SyntheticCohort(
+                students,
+                students_per_project=options["students_per_project"],
+                manager_ratio=options["manager_ratio"],
+                preference_density=options["preference_density"],
+                international_ratio=options["international_ratio"],
+                experience_distribution=options["experience_distribution"],
+                seed=options["seed"],
+            )
+            with cohort as registrations:
+                result = benchmark_team_assignment(
+                    registrations,
+                    profiles=profiles,
+                    solver_parameters={
+                        "max_time_in_seconds": options["max_time"],
+                        "num_search_workers": options["workers"],
+                        "random_seed": options["seed"],
+                    },
+                    strategy=options["strategy"],
+                    symmetry_breaking=not options["no_symmetry_breaking"],
+                )
+            results.append({"cohort": cohort.parameters(), "strategy": options["strategy"], **result})
+            self.stderr.write(
+                f"{students} students: {result['status']} with objective {result['objective']} after "
+                f"{result['build_time']:.2f}s build and {result['solve_time']:.2f}s solve"
+            )
+            for profile_result in result["profiles"]:
+                self.stderr.write(
+                    f"  profile {profile_result['profile']}: {profile_result['status']} with objective "
+                    f"{profile_result['objective']} after {profile_result['wall_time']:.2f}s solve"
+                )
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
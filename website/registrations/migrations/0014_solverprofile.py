@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("registrations", "0013_alter_registration_projects"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SolverProfile",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("project_preference_weight", models.PositiveIntegerField(default=1)),
+                ("partner_preference_weight", models.PositiveIntegerField(default=1)),
+                (
+                    "mixed_programming_experience_weight",
+                    models.PositiveIntegerField(
+                        default=10,
+                        help_text="The weight of the penalty for unbalanced programming experience within projects.",
+                    ),
+                ),
+                ("max_time_in_seconds", models.FloatField(default=180.0)),
+                ("num_search_workers", models.PositiveSmallIntegerField(default=8)),
+                (
+                    "not_international_manager_constraint",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Require at least one not-international manager in every project, if there are enough.",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+    ]
@@ -1,2 +1,3 @@
 from registrations.models.employee import Employee
 from registrations.models.registration import Registration
+from registrations.models.solver_profile import SolverProfile
@@ -1,5 +1,3 @@
-from difflib import SequenceMatcher
-
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils.functional import cached_property
@@ -9,6 +7,7 @@ from courses.models import Course, Semester
 from projects.models import Project
 
 from registrations.models import Employee
+from registrations.partner_matching import PartnerNameResolver
 
 User: Employee = get_user_model()
 
@@ -76,7 +75,7 @@ class Registration(models.Model):
     @property
     def is_director(self):
         """Check if a registration is a director."""
-        return self.project is None and self.course == Course.objects.sdm()
+        return self.project is None and self.course_id == Course.objects.sdm().pk
 
     def _match_partner_name_to_user(self, name):
         """
@@ -87,15 +86,7 @@ class Registration(models.Model):
         if name is None:
             return None
 
-        ratios = {}
-        for user in User.objects.filter(registration__semester=self.semester).all():
-            ratio = SequenceMatcher(None, name, user.get_full_name()).ratio()
-            if ratio > 0.5:
-                ratios[user] = ratio
-
-        if ratios:
-            return max(ratios, key=lambda k: ratios[k])
-        return None
+        return PartnerNameResolver(User.objects.filter(registration__semester=self.semester)).match(name)
 
     @cached_property
     def partner_preference1_user(self):
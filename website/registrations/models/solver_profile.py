@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class SolverProfile(models.Model):
+    """Objective weights, solver limits and constraints to run the automatic team assignment with."""
+
+    class Meta:
+        """Meta class for SolverProfile."""
+
+        ordering = ["name"]
+
+    name = models.CharField(max_length=50, unique=True)
+
+    project_preference_weight = models.PositiveIntegerField(default=1)
+    partner_preference_weight = models.PositiveIntegerField(default=1)
+    mixed_programming_experience_weight = models.PositiveIntegerField(
+        default=10, help_text="The weight of the penalty for unbalanced programming experience within projects."
+    )
+
+    max_time_in_seconds = models.FloatField(default=180.0)
+    num_search_workers = models.PositiveSmallIntegerField(default=8)
+
+    not_international_manager_constraint = models.BooleanField(
+        default=True, help_text="Require at least one not-international manager in every project, if there are enough."
+    )
+
+    def __str__(self):
+        """Return the name of the profile."""
+        return self.name
+
+    def objective_weights(self):
+        """Get the weight of every partial objective, by the names used by the TeamAssignmentGenerator."""
+        return {
+            "project_preference": self.project_preference_weight,
+            "partner_preference": self.partner_preference_weight,
+            "mixed_programming_experience": self.mixed_programming_experience_weight,
+        }
+
+    def solver_parameters(self):
+        """Get the solver parameters that the profile overrides."""
+        return {"max_time_in_seconds": self.max_time_in_seconds, "num_search_workers": self.num_search_workers}
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+
+class PartnerNameResolver:
+    """
+    Match partner preference names to users.
+
+    All candidate names are loaded once and indexed on their character n-grams. When matching a name, only the
+    candidates that share at least one n-gram with it are scored with a SequenceMatcher, instead of every user.
+    """
+
+    NGRAM_SIZE = 3
+    MINIMAL_RATIO = 0.5
+
+    def __init__(self, users):
+        """
+        Build the n-gram index for the given users.
+
+        :param users: An iterable of the users that partner preferences can refer to
+        """
+        self.users = list(users)
+        self.names = [user.get_full_name() for user in self.users]
+
+        self._index = defaultdict(set)
+        for i, name in enumerate(self.names):
+            for ngram in self._ngrams(name):
+                self._index[ngram].add(i)
+
+        self._matches = {}
+
+    @classmethod
+    def _ngrams(cls, name):
+        """Get the set of lowercase character n-grams of a name, padded to also index the start and end."""
+        padded = " " * (cls.NGRAM_SIZE - 1) + name.lower() + " "
+        return {padded[i : i + cls.NGRAM_SIZE] for i in range(len(padded) - cls.NGRAM_SIZE + 1)}
+
+    def match(self, name):
+        """
+        Match a string to a user.
+
+        Find the most similar user name to the given name, or None if no name is similar enough.
+        """
+        if name is None:
+            return None
+
+        if name not in self._matches:
+            candidates = set().union(*(self._index.get(ngram, ()) for ngram in self._ngrams(name)))
+
+            best_match = None
+            best_ratio = self.MINIMAL_RATIO
+            for i in sorted(candidates):
+                matcher = SequenceMatcher(None, name, self.names[i])
+                if matcher.real_quick_ratio() <= best_ratio or matcher.quick_ratio() <= best_ratio:
+                    continue
+                ratio = matcher.ratio()
+                if ratio > best_ratio:
+                    best_match, best_ratio = self.users[i], ratio
+
+            self._matches[name] = best_match
+
+        return self._matches[name]
+
+    def resolve(self, registrations):
+        """
+        Match the partner preferences of all registrations.
+
+        :param registrations: An iterable of registrations
+        :return: A dict from registration pk to a list of the three preferred users (or None)
+        """
+        return {
+            registration.pk: [
+                self.match(registration.partner_preference1),
+                self.match(registration.partner_preference2),
+                self.match(registration.partner_preference3),
+            ]
+            for registration in registrations
+        }
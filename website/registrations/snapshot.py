@@ -0,0 +1,115 @@
+from functools import cached_property
+
+from projects.models import Project
+
+from registrations.models import Registration
+
+# The attributes of a RegistrationRecord, and the lookups they are loaded from
+FIELDS = {
+    "pk": "pk",
+    "user_id": "user_id",
+    "semester_id": "semester_id",
+    "course_id": "course_id",
+    "preference1_id": "preference1_id",
+    "preference2_id": "preference2_id",
+    "preference3_id": "preference3_id",
+    "partner_preference1": "partner_preference1",
+    "partner_preference2": "partner_preference2",
+    "partner_preference3": "partner_preference3",
+    "dev_experience": "dev_experience",
+    "git_experience": "git_experience",
+    "scrum_experience": "scrum_experience",
+    "management_interest": "management_interest",
+    "is_international": "is_international",
+    "available_during_scheduled_timeslot_1": "available_during_scheduled_timeslot_1",
+    "available_during_scheduled_timeslot_2": "available_during_scheduled_timeslot_2",
+    "available_during_scheduled_timeslot_3": "available_during_scheduled_timeslot_3",
+    "has_problems_with_signing_an_nda": "has_problems_with_signing_an_nda",
+    "comments": "comments",
+    "first_name": "user__first_name",
+    "last_name": "user__last_name",
+    "student_number": "user__student_number",
+    "github_username": "user__github_username",
+    "course_name": "course__name",
+}
+
+
+class RegistrationRecord:
+    """
+    A read-only copy of the fields of a registration, and of its user and course, that are used by the exports.
+
+    The fields have the same names as the fields and foreign key columns of a Registration, so a record can be used
+    instead of a registration wherever no related objects are accessed.
+    """
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, values):
+        """Create a record from the values of all fields, in the order of FIELDS."""
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        """Prevent changing a record, as it would not be saved."""
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        """Show the registration pk and the name of the user."""
+        return f"<{type(self).__name__} {self.pk}: {self.get_full_name()}>"
+
+    def get_full_name(self):
+        """Get the full name of the user, like User.get_full_name."""
+        return f"{self.first_name} {self.last_name}".strip()
+
+
+class RegistrationSnapshot:
+    """
+    A read-only snapshot of registrations, loaded with a single query.
+
+    The solver and the exports read many fields of every registration and of its user and course. Loading them with
+    values_list into records with slots, instead of loading model instances with lazy foreign keys, keeps the memory
+    use small and avoids a query for every related object that is accessed.
+    """
+
+    def __init__(self, queryset):
+        """
+        Load the records of all registrations in a queryset, in the order of the queryset.
+
+        :param queryset: A queryset of registrations
+        """
+        self.records = [RegistrationRecord(values) for values in queryset.values_list(*FIELDS.values())]
+
+    @classmethod
+    def from_registrations(cls, registrations):
+        """
+        Take a snapshot of a list of registrations, in the same order.
+
+        :param registrations: The registrations or their pks
+        """
+        pks = [getattr(registration, "pk", registration) for registration in registrations]
+        snapshot = cls(Registration.objects.filter(pk__in=pks))
+        position = {pk: i for i, pk in enumerate(pks)}
+        snapshot.records.sort(key=lambda record: position[record.pk])
+        return snapshot
+
+    def __len__(self):
+        """Get the number of registrations."""
+        return len(self.records)
+
+    def __iter__(self):
+        """Iterate over the records."""
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        """Get a record by its position."""
+        return self.records[index]
+
+    def column(self, name):
+        """Get the values of a field of all registrations, as a tuple in the order of the records."""
+        return tuple(getattr(record, name) for record in self.records)
+
+    @cached_property
+    def preferred_projects(self):
+        """Get the projects that are preferred by any of the registrations, by pk, with their semester."""
+        pks = {pk for name in ("preference1_id", "preference2_id", "preference3_id") for pk in self.column(name)}
+        return Project.objects.select_related("semester").in_bulk(pks - {None})
@@ -1,19 +1,33 @@
 import csv
 import logging
+import math
+import random
 import threading
+from contextlib import contextmanager
 from io import StringIO
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
 from django.urls import reverse
 
+import numpy as np
+
 from ortools.sat.python import cp_model
 
 from courses.models import Course
 
 from projects.models import Project
 
-from registrations.models import Registration
+from registrations.heuristic_assignment import HeuristicTeamAssignment
+from registrations.models import Employee, Registration, SolverProfile
+from registrations.partner_matching import PartnerNameResolver
+from registrations.snapshot import RegistrationSnapshot
+
+from tasks.jobs import enqueue
+from tasks.models import Task, TaskResult
 
-from tasks.models import Task
+User: Employee = get_user_model()
 
 CSV_STRUCTURE = [
     "First name",
@@ -21,6 +35,7 @@ CSV_STRUCTURE = [
     "Student number",
     "Course",
     "Project name",
+    "Assignment engine",
     "Non Dutch",
     "Available during scheduled timeslot 1",
     "Available during scheduled timeslot 2",
@@ -42,16 +57,199 @@ CSV_STRUCTURE = [
 ]
 
 
+def project_preference_slot_weights(has_preference):
+    """
+    Get the weight of the first, second and third project preference of every registration.
+
+    This value is calculated by in such a way that it is prefered to give 2 people their third preference instead
+    of 1 person their first preference. The total value per person is 12, as this is divisible by all possible
+    numbers needed.
+    """
+    base = 12 // np.maximum(has_preference.sum(axis=1), 1)
+    return np.stack(
+        [
+            base + has_preference[:, 1:].any(axis=1),
+            base + has_preference[:, 0] - has_preference[:, 2],
+            base - has_preference[:, :2].any(axis=1),
+        ],
+        axis=1,
+    )
+
+
+def partner_preference_slot_weights(has_preference):
+    """Get the weight of every partner preference: 12 divided by the number of partner preferences."""
+    base = 12 // np.maximum(has_preference.sum(axis=1), 1)
+    return np.repeat(base[:, np.newaxis], 3, axis=1)
+
+
+def preference_weight_matrix(preferences, index, columns, slot_weights):
+    """
+    Create a weight matrix from the three preferences of every registration.
+
+    :param preferences: An array with the three preferred keys (or None) of every registration
+    :param index: A dict from preferred key to column in the matrix, preferences not in it are ignored
+    :param columns: The number of columns of the matrix
+    :param slot_weights: A function giving the weight of each of the three preferences of every registration
+    :return: A matrix with for every registration and column the weight of that preference
+    """
+    weights = slot_weights(np.not_equal(preferences, None))
+    columns_of_preferences = np.vectorize(lambda key: index.get(key, -1), otypes=[int])(preferences)
+
+    matrix = np.zeros((len(preferences), columns), dtype=int)
+    # Fill the third preference first, so earlier preferences take precedence over duplicates
+    for slot in reversed(range(3)):
+        rows = np.nonzero(columns_of_preferences[:, slot] >= 0)[0]
+        matrix[rows, columns_of_preferences[rows, slot]] = weights[rows, slot]
+    return matrix
+
+
+# The solve statistics of a run that failed before solving, because the constraints cannot be satisfied
+NOT_SOLVED = {"status": "INFEASIBLE", "wall_time": 0.0, "objective": None, "best_bound": None, "objectives": None}
+
+
+class SolveProgressCallback(cp_model.CpSolverSolutionCallback):
+    """Solution callback that reports the objective of the incumbent solution to a task, and can collect solutions."""
+
+    def __init__(self, task, interval=1.0, assigned=None, objectives=None):
+        """
+        Create a callback reporting to a task.
+
+        :param task: The task to store the progress in
+        :param interval: The minimal number of seconds between two progress reports
+        :param assigned: The assignment variables per registration and project, to collect every solution found
+        :param objectives: The partial objectives by name, to score the collected solutions on
+        """
+        super().__init__()
+        self.task = task
+        self.interval = interval
+        self.assigned = assigned
+        self.objectives = objectives or {}
+        self.solutions = 0
+        self.found = []
+        # The first solution is always reported, however early it is found
+        self._last_report = -math.inf
+        self._logger = logging.getLogger("automaticteams")
+        self._thread = threading.get_ident()  # the thread that creates the callback, and solves the model
+
+    def on_solution_callback(self):
+        """Store the objective of a newly found solution in the task, at most once per interval."""
+        self.solutions += 1
+        if self.assigned is not None:
+            self.found.append(
+                {
+                    "assignment": tuple(
+                        next(p for p, variable in enumerate(variables) if self.BooleanValue(variable))
+                        for variables in self.assigned
+                    ),
+                    "objective": self.ObjectiveValue(),
+                    "objectives": {name: self.Value(objective) for name, objective in self.objectives.items()},
+                }
+            )
+        if self.WallTime() - self._last_report < self.interval:
+            return
+        self._last_report = self.WallTime()
+
+        # With more than one search worker, the solver calls this from its own worker threads, so only update the
+        # progress column of the task
+        try:
+            message = (
+                f"Found {self.solutions} solutions, the best has objective {self.ObjectiveValue():.0f} "
+                f"(bound {self.BestObjectiveBound():.0f}) after {self.WallTime():.0f} seconds"
+            )
+            Task.objects.filter(pk=self.task.pk).update(progress_message=message)
+        except DatabaseError:
+            self._logger.warning("Could not store solver progress", exc_info=True)
+        finally:
+            # With one search worker, this is called from the thread that solves, which still uses its connection
+            if threading.get_ident() != self._thread:
+                connection.close()
+
+
 class TeamAssignmentGenerator:
     """Team assignment generator to solve the team assignment as a CSP."""
 
-    def __init__(self, registrations):
-        """Get all required data to create a team assignment for a certain semester."""
-        self.semester = registrations[0].semester
-
-        self.managers = [registration for registration in registrations if registration.course == Course.objects.sdm()]
-        self.engineers = [registration for registration in registrations if registration.course == Course.objects.se()]
-        self.projects = list(Project.objects.filter(semester=self.semester).order_by("?").all())
+    STRATEGY_MONOLITHIC = "monolithic"
+    STRATEGY_TWO_PHASE = "two_phase"
+    STRATEGY_TWO_PHASE_LNS = "two_phase_lns"
+
+    STRATEGY_CHOICES = (
+        (STRATEGY_MONOLITHIC, "Assign everyone at once"),
+        (STRATEGY_TWO_PHASE, "Assign managers first, then engineers"),
+        (STRATEGY_TWO_PHASE_LNS, "Assign managers first, then engineers, then improve with neighbourhood search"),
+    )
+
+    # The share of the time limit for each phase of the two-phase strategies, without and with neighbourhood search
+    MANAGERS_PHASE_TIME = 0.2
+    ENGINEERS_PHASE_TIME = 0.8
+    ENGINEERS_PHASE_TIME_WITH_LNS = 0.5
+
+    LNS_NEIGHBOURHOOD_SIZE = 2
+    LNS_ITERATION_TIME = 5.0
+
+    # The share of the time limit for every extra solve that looks for another solution for the portfolio
+    PORTFOLIO_SOLVE_TIME = 0.2
+
+    ENGINE_SOLVER = "CP-SAT"
+    ENGINE_HEURISTIC = "Heuristic"
+
+    DEFAULT_OBJECTIVE_WEIGHTS = {"project_preference": 1, "partner_preference": 1, "mixed_programming_experience": 10}
+
+    # The time limit in seconds for checking whether the constraints can be satisfied before solving
+    DIAGNOSTICS_TIME_LIMIT = 10.0
+
+    def __init__(
+        self,
+        registrations,
+        solver_parameters=None,
+        warm_start=False,
+        previous_assignment=None,
+        fix_assigned=False,
+        symmetry_breaking=True,
+        strategy=STRATEGY_MONOLITHIC,
+        heuristic_hints=False,
+        profile=None,
+        portfolio_size=1,
+        task=None,
+    ):
+        """
+        Get all required data to create a team assignment for a certain semester.
+
+        :param registrations: The registrations (or their pks) to assign to the projects of their semester
+        :param solver_parameters: Solver parameters overriding settings.TEAM_ASSIGNMENT_SOLVER_PARAMETERS
+        :param warm_start: Whether to use the current project memberships and previous assignment as solution hints
+        :param previous_assignment: The CSV output of a previous run, used as solution hints when warm starting
+        :param fix_assigned: Whether registrations that already have a project must stay in that project
+        :param symmetry_breaking: Whether to add constraints that break symmetries between interchangeable projects
+        and between interchangeable registrations
+        :param strategy: One of STRATEGY_CHOICES. The two-phase strategies first assign the managers and then the
+        engineers around them, which keeps the models small for large semesters
+        :param heuristic_hints: Whether to use the assignment of the heuristic engine as solution hints
+        :param profile: The SolverProfile with the objective weights, enabled constraints and the solver parameters
+        that override solver_parameters, or None for the defaults
+        :param portfolio_size: The number of distinct assignments to propose, to compare them
+        :param task: The task to report the progress in, a new task is created if it is not given
+        """
+        # The model is built from a snapshot of the registrations, so no related objects are loaded while building it
+        self.snapshot = RegistrationSnapshot.from_registrations(registrations)
+        self.semester_id = self.snapshot[0].semester_id
+        self.solver_parameters = {**settings.TEAM_ASSIGNMENT_SOLVER_PARAMETERS, **(solver_parameters or {})}
+        self.warm_start = warm_start
+        self.previous_assignment = previous_assignment
+        self.fix_assigned = fix_assigned
+        self.symmetry_breaking = symmetry_breaking
+        self.strategy = strategy
+        self.heuristic_hints = heuristic_hints
+        self.portfolio_size = portfolio_size
+        self.objective_weights = dict(self.DEFAULT_OBJECTIVE_WEIGHTS)
+        self.not_international_manager_constraint = True
+        if profile is not None:
+            self._apply_profile(profile)
+
+        sdm, se = Course.objects.sdm(), Course.objects.se()
+        self.managers = [registration for registration in self.snapshot if registration.course_id == sdm.pk]
+        self.engineers = [registration for registration in self.snapshot if registration.course_id == se.pk]
+        self.registrations = self.managers + self.engineers
+        self.projects = list(Project.objects.filter(semester_id=self.semester_id).order_by("?").all())
 
         self.engineers_per_project = list(
             len(range(len(self.engineers))[i :: len(self.projects)]) for i in range(len(self.projects))
@@ -59,16 +257,78 @@ class TeamAssignmentGenerator:
         self.managers_per_project = list(
             len(range(len(self.managers))[i :: len(self.projects)]) for i in range(len(self.projects))
         )
-        self.task = Task.objects.create(
+        self.partner_preferences = PartnerNameResolver(
+            User.objects.filter(registration__semester_id=self.semester_id)
+        ).resolve(self.registrations)
+
+        self.task = task or self.create_task()
+
+        self.logger = logging.getLogger("automaticteams")
+
+        self._heuristic_assignment = None
+        # The assumption literals and descriptions of the guarded constraints, only while diagnosing infeasibility
+        self._assumptions = None
+        # The descriptions of the constraints that conflict, if the feasibility check before solving failed
+        self.infeasibility = []
+        # The status, time and objective values of every solve, as some strategies solve more than one model
+        self.solve_statistics = []
+        self.run_statistics = None
+        if self.heuristic_hints:
+            self.heuristic_assignment()
+
+        # The two-phase strategies set up their models while generating the assignment
+        if self.strategy == self.STRATEGY_MONOLITHIC:
+            self._set_up_model()
+
+    @staticmethod
+    def create_task():
+        """Create a task to report the progress of a team assignment in."""
+        return Task.objects.create(
             total=1, completed=0, redirect_url=reverse("admin:registrations_employee_changelist")
         )
 
-        self.logger = logging.getLogger("automaticteams")
+    def _apply_profile(self, profile):
+        """Use the objective weights, enabled constraints and solver parameters of a SolverProfile."""
+        self.objective_weights = {**self.DEFAULT_OBJECTIVE_WEIGHTS, **profile.objective_weights()}
+        self.not_international_manager_constraint = profile.not_international_manager_constraint
+        self.solver_parameters.update(profile.solver_parameters())
 
-        self._set_up_model()
+    def _set_up_model(self, fixed_assignment=None, symmetry_breaking=None):
+        """
+        Set up all boolean variables for a model to solve.
+
+        :param fixed_assignment: A dict from registration pk to the project that registration must be assigned to
+        :param symmetry_breaking: Whether to add symmetry breaking constraints, defaults to self.symmetry_breaking
+        """
+        self._set_up_constraints(fixed_assignment)
+        if self.warm_start or self.heuristic_hints:
+            self.logger.info("Adding warm start")
+            self._add_warm_start()
+
+        self.logger.info("Computing objective weights")
+        self._compute_objective_weights()
 
-    def _set_up_model(self):
-        """Set up all boolean variables for a model to solve."""
+        if symmetry_breaking is None:
+            symmetry_breaking = self.symmetry_breaking
+        if symmetry_breaking:
+            self.logger.info("Adding symmetry breaking constraints")
+            self._add_symmetry_breaking()
+
+        self.logger.info("Maximizing objectives")
+        self.objectives = self._get_objectives()
+        self.set_objective_weights(self.objective_weights)
+
+        statistics = self.model_statistics()
+        self.logger.info(
+            f"Created model with {statistics['variables']} variables and {statistics['constraints']} constraints"
+        )
+
+    def _set_up_constraints(self, fixed_assignment=None):
+        """
+        Set up a new model with the assignment variables, the constraints and the fixed assignment, without objective.
+
+        :param fixed_assignment: A dict from registration pk to the project that registration must be assigned to
+        """
         self.logger.info("Create team constraints")
         self.model = cp_model.CpModel()
 
@@ -82,25 +342,432 @@ class TeamAssignmentGenerator:
             for p in range(len(self.projects)):
                 self.assigned_engineers[(r, p)] = self.model.NewBoolVar(f"assigned_engineer{r}_to_project{p}")
 
+        # The assignment variables of all registrations, in the same order as self.registrations
+        self.assigned = [
+            [assigned[(r, p)] for p in range(len(self.projects))]
+            for registrations, assigned in [
+                (self.managers, self.assigned_managers),
+                (self.engineers, self.assigned_engineers),
+            ]
+            for r in range(len(registrations))
+        ]
+
         self.logger.info("Adding constraints")
         self._add_constraints()
 
-        self.logger.info("Maximizing objectives")
-        self.model.Maximize(sum(self._get_objectives()))
+        self.fixed_assignment = dict(fixed_assignment or {})
+        if self.fix_assigned:
+            self.fixed_assignment.update(self.current_assignment())
+        if self.fixed_assignment:
+            self._add_fixed_assignment()
 
-    def generate_team_assignment(self):
-        """Try to solve the CSP and return the generated assignment if feasible."""
+    def set_objective_weights(self, weights):
+        """
+        Replace the objective of the model by a new weighting of the partial objectives.
+
+        Only the objective is replaced, so the variables, constraints and partial objectives are reused.
+
+        :param weights: A dict from partial objective name to weight, missing names get their default weight
+        """
+        self.objective_weights = {**self.DEFAULT_OBJECTIVE_WEIGHTS, **weights}
+        self.model.Maximize(
+            sum(self.objective_weights[name] * objective for name, objective in self.objectives.items())
+        )
+
+    def _assignment_variables(self):
+        """Get, for every registration pk, the registration and its assignment variables per project."""
+        return {registration.pk: (registration, self.assigned[i]) for i, registration in enumerate(self.registrations)}
+
+    def current_assignment(self):
+        """Get the current project memberships of the registrations in this semester."""
+        project_for_pk = {project.pk: project for project in self.projects}
+        memberships = Registration.projects.through.objects.filter(
+            registration__in=[registration.pk for registration in self.registrations],
+            project__in=self.projects,
+        ).values_list("registration_id", "project_id")
+
+        current = {}
+        for registration_id, project_id in memberships:
+            current.setdefault(registration_id, project_for_pk[project_id])
+        return current
+
+    def assignment_from_csv(self, csv_data):
+        """
+        Read an assignment from the CSV output of a previous run.
+
+        Rows are matched on name, student number and course, rows that cannot be matched to a registration or project
+        are ignored.
+        """
+        registration_for_row = {
+            (
+                registration.first_name,
+                registration.last_name,
+                registration.student_number or "",
+                registration.course_name,
+            ): registration
+            for registration in self.registrations
+        }
+        project_for_name = {project.name: project for project in self.projects}
+
+        assignment = {}
+        for row in list(csv.reader(StringIO(csv_data)))[1:]:
+            registration = registration_for_row.get(tuple(row[:4]))
+            project = project_for_name.get(row[4])
+            if registration is not None and project is not None:
+                assignment[registration.pk] = project
+        return assignment
+
+    def _add_warm_start(self):
+        """
+        Add the heuristic assignment, the previous assignment and the current project memberships as hints.
+
+        Current memberships take precedence over the previous assignment, which takes precedence over the heuristic
+        assignment.
+        """
+        hints = {}
+        if self.heuristic_hints:
+            hints.update(self.heuristic_assignment())
+        if self.warm_start:
+            if self.previous_assignment:
+                hints.update(self.assignment_from_csv(self.previous_assignment))
+            hints.update(self.current_assignment())
+
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        for pk, (_, variables) in self._assignment_variables().items():
+            if pk in hints:
+                for p, variable in enumerate(variables):
+                    self.model.AddHint(variable, p == project_index[hints[pk].pk])
+
+        self.logger.info(f"Added hints for {len(hints)} registrations")
+
+    def _add_fixed_assignment(self):
+        """Constrain the registrations in the fixed assignment to stay in their project."""
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        fixed = 0
+        for pk, (registration, variables) in self._assignment_variables().items():
+            if pk in self.fixed_assignment:
+                project = self.fixed_assignment[pk]
+                self._guard(
+                    self.model.Add(variables[project_index[project.pk]] == 1),
+                    f"{registration.get_full_name()} must stay in {project.name}",
+                )
+                fixed += 1
+
+        self.logger.info(f"Fixed {fixed} registrations")
+
+    def heuristic_assignment(self):
+        """
+        Get the assignment of the heuristic engine, or an empty dict if it did not find one.
+
+        The heuristic runs at most once per generator, and always on all registrations.
+        """
+        if self._heuristic_assignment is None:
+            self._compute_objective_weights()
+            self._heuristic_assignment = HeuristicTeamAssignment(
+                self,
+                fixed_assignment=self.current_assignment() if self.fix_assigned else None,
+                random_seed=self.solver_parameters["random_seed"],
+            ).generate()
+        return self._heuristic_assignment
+
+    def model_statistics(self):
+        """Return the number of variables and constraints in the model."""
+        proto = self.model.Proto()
+        return {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+
+    def _configure_solver(self, solver):
+        """
+        Apply the solver parameters to a solver.
+
+        In deterministic mode, the workers interleave their search and the time limit is interpreted as deterministic
+        time, so repeated runs with the same parameters return the same assignment.
+        """
+        solver.parameters.num_workers = self.solver_parameters["num_search_workers"]
+        solver.parameters.relative_gap_limit = self.solver_parameters["relative_gap_limit"]
+        solver.parameters.random_seed = self.solver_parameters["random_seed"]
+        if self.solver_parameters["deterministic"]:
+            solver.parameters.interleave_search = True
+            solver.parameters.max_deterministic_time = self.solver_parameters["max_time_in_seconds"]
+        else:
+            solver.parameters.max_time_in_seconds = self.solver_parameters["max_time_in_seconds"]
+        if self.solver_parameters["log_search_progress"]:
+            solver.parameters.log_search_progress = True
+            solver.log_callback = self.logger.debug
+
+    def _solve(self, model, time_limit=1.0, callback=None):
+        """
+        Solve a model with the solver parameters.
+
+        :param model: The model to solve
+        :param time_limit: The share of the configured time limit to use
+        :param callback: The SolveProgressCallback to use, a new one that only reports progress if it is not given
+        :return: The solver and whether it found a solution
+        """
         solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 180.0
-        self.logger.info("Solve team constraints")
-        status = solver.Solve(self.model)
+        self._configure_solver(solver)
+        solver.parameters.max_time_in_seconds *= time_limit
+        solver.parameters.max_deterministic_time *= time_limit
+        self.logger.info(f"Solve team constraints with parameters {self.solver_parameters}")
+        status = solver.Solve(model, callback or SolveProgressCallback(self.task))
         self.logger.debug(f"{solver.ResponseStats()}")
+        self.task.progress_message = (
+            f"Solver finished with status {solver.StatusName(status)} after {solver.WallTime():.0f} seconds"
+        )
 
-        return (
-            self._get_project_assignment_from_solved_model(solver)
-            if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
-            else []
+        solved = status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
+        self.solve_statistics.append(
+            {
+                "status": solver.StatusName(status),
+                "wall_time": solver.WallTime(),
+                "objective": solver.ObjectiveValue() if solved else None,
+                "best_bound": solver.BestObjectiveBound() if solved else None,
+                "objectives": {name: solver.Value(objective) for name, objective in self.objectives.items()}
+                if solved
+                else None,
+            }
         )
+        return solver, solved
+
+    @contextmanager
+    def _diagnostic_model(self):
+        """Set up models with assumption literals within this context, and restore the current model afterwards."""
+        names = ["model", "assigned_managers", "assigned_engineers", "assigned", "fixed_assignment"]
+        # The two-phase strategies only set up their models when generating the assignment
+        current = {name: getattr(self, name, None) for name in names}
+        self._assumptions = {}
+        try:
+            yield
+        finally:
+            self._assumptions = None
+            for name, value in current.items():
+                setattr(self, name, value)
+
+    def diagnose_infeasibility(self):
+        """
+        Check whether the constraints can be satisfied before solving, and explain why not.
+
+        The constraints and the fixed assignment are set up in a model without objective, in which every constraint
+        is only enforced if its assumption literal holds. Finding any assignment is much faster than finding a good
+        one, and if there is none, the solver returns a set of assumptions that cannot hold together. The set need
+        not be minimal, but it is usually small.
+
+        :return: The descriptions of the constraints that conflict, or an empty list if the constraints can be
+        satisfied or no answer was found within the time limit
+        """
+        if not self.projects:
+            return ["There are no projects in the semester"]
+
+        with self._diagnostic_model():
+            self._set_up_constraints()
+            solver = cp_model.CpSolver()
+            # The assumptions are only reported with a single worker
+            solver.parameters.num_workers = 1
+            solver.parameters.max_time_in_seconds = self.DIAGNOSTICS_TIME_LIMIT
+            solver.parameters.random_seed = self.solver_parameters["random_seed"]
+            self.model.AddAssumptions([literal for literal, _ in self._assumptions.values()])
+            status = solver.Solve(self.model)
+            self.logger.info(f"Feasibility check finished with status {solver.StatusName(status)}")
+            if status != cp_model.INFEASIBLE:
+                return []
+            return [self._assumptions[index][1] for index in solver.SufficientAssumptionsForInfeasibility()]
+
+    def generate_team_assignment(self):
+        """
+        Try to solve the CSP and return the generated assignment if feasible.
+
+        The constraints are checked before solving, so an infeasible model fails fast, with the conflicting
+        constraints in self.infeasibility. The statistics of the run are stored in self.run_statistics: those of its
+        last solve, or an INFEASIBLE result if it failed before solving.
+        """
+        solves = len(self.solve_statistics)
+        assignment = []
+        self.infeasibility = self.diagnose_infeasibility()
+        if self.infeasibility:
+            self.logger.error(f"The constraints cannot be satisfied: {'; '.join(self.infeasibility)}")
+        elif self.strategy != self.STRATEGY_MONOLITHIC:
+            assignment = self._generate_two_phase_assignment()
+        else:
+            solver, solved = self._solve(self.model)
+            assignment = self._get_project_assignment_from_solved_model(solver) if solved else []
+
+        self.run_statistics = self.solve_statistics[-1] if len(self.solve_statistics) > solves else NOT_SOLVED
+        return assignment
+
+    def generate_portfolio(self):
+        """
+        Generate up to portfolio_size distinct assignments, the best first.
+
+        After the assignment is generated, the model is solved again with a no-good cut for every solution found so
+        far, which forces the solver to find a different one. The solution callback collects all intermediate
+        solutions of those solves as well, so the portfolio is chosen from more candidates than there are solves. With
+        symmetry breaking, assignments that only differ in interchangeable projects or registrations are not
+        proposed twice. The other assignments are found with the last model that was solved. With the two-phase
+        strategy, the managers stay where the first phase put them. After neighbourhood search, that model is the full
+        model without symmetry breaking, so the managers can move as well.
+
+        :return: A list of (assignment, scores) pairs, where scores has the objective and the partial objectives
+        """
+        assignment = self.generate_team_assignment()
+        if not assignment:
+            return []
+
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        first = tuple(project_index[assignment[registration.pk].pk] for registration in self.registrations)
+        candidates = {first: self._score(first)}
+        cut = set()
+
+        model = self.model.Clone()
+        for _ in range(self.portfolio_size - 1):
+            for solution in set(candidates) - cut:
+                model.AddBoolOr([self.assigned[r][p].Not() for r, p in enumerate(solution)])
+                cut.add(solution)
+
+            callback = SolveProgressCallback(self.task, assigned=self.assigned, objectives=self.objectives)
+            _, solved = self._solve(model, self.PORTFOLIO_SOLVE_TIME, callback)
+            for found in callback.found:
+                candidates.setdefault(found["assignment"], found)
+            if not solved:
+                break
+
+        best = sorted(candidates, key=lambda solution: -candidates[solution]["objective"])[: self.portfolio_size]
+        self.logger.info(f"Found {len(candidates)} distinct solutions for the portfolio of {len(best)}")
+        return [
+            (
+                {registration.pk: self.projects[p] for registration, p in zip(self.registrations, solution)},
+                {"objective": candidates[solution]["objective"], "objectives": candidates[solution]["objectives"]},
+            )
+            for solution in best
+        ]
+
+    def _score(self, solution):
+        """Get the objective and partial objectives of a solution, given as the project index of every registration."""
+        model = self.model.Clone()
+        for variables, p in zip(self.assigned, solution):
+            model.Add(variables[p] == 1)
+        solver = cp_model.CpSolver()
+        solver.Solve(model)
+        return {
+            "objective": solver.ObjectiveValue(),
+            "objectives": {name: solver.Value(objective) for name, objective in self.objectives.items()},
+        }
+
+    def evaluate_profiles(self, profiles):
+        """
+        Generate an assignment for every profile in a single run.
+
+        With the monolithic strategy, the model is only rebuilt when a profile enables other constraints than the
+        current model has. Otherwise only the objective is re-weighted. The two-phase strategies always build their
+        models while generating the assignment.
+
+        :param profiles: An iterable of SolverProfiles
+        :return: A list with, for every profile, the profile, its assignment and the statistics of its run, which are
+        INFEASIBLE when the constraints of the profile cannot be satisfied
+        """
+        results = []
+        for profile in profiles:
+            constraints = self.not_international_manager_constraint
+            self._apply_profile(profile)
+            if self.strategy == self.STRATEGY_MONOLITHIC:
+                if self.not_international_manager_constraint != constraints:
+                    self._set_up_model()
+                else:
+                    self.set_objective_weights(self.objective_weights)
+
+            self.logger.info(f"Generating assignment with profile {profile}")
+            assignment = self.generate_team_assignment()
+            results.append((profile, assignment, self.run_statistics))
+        return results
+
+    @contextmanager
+    def _managers_only(self):
+        """Leave the engineers out of the models set up within this context."""
+        engineers, engineers_per_project = self.engineers, self.engineers_per_project
+        self.engineers, self.engineers_per_project = [], [0] * len(self.projects)
+        self.registrations = self.managers
+        try:
+            yield
+        finally:
+            self.engineers, self.engineers_per_project = engineers, engineers_per_project
+            self.registrations = self.managers + self.engineers
+
+    def _generate_two_phase_assignment(self):
+        """
+        Assign the managers first and then the engineers, and optionally improve the result with neighbourhood search.
+
+        The first phase only has to spread the managers over the projects, with at least one not-international
+        manager per project. The second phase fixes the managers and assigns the engineers. Both models are much
+        smaller than the monolithic model, but the result can be worse, as the managers cannot move to accommodate
+        the engineers. The neighbourhood search recovers part of that by re-optimizing a few projects at a time.
+        """
+        lns = self.strategy == self.STRATEGY_TWO_PHASE_LNS
+
+        self.logger.info("Assigning managers")
+        with self._managers_only():
+            self._set_up_model()
+            solver, solved = self._solve(self.model, self.MANAGERS_PHASE_TIME)
+            if not solved:
+                return []
+            manager_assignment = self._get_project_assignment_from_solved_model(solver)
+
+        self.logger.info("Assigning engineers")
+        self._set_up_model(fixed_assignment=manager_assignment)
+        solver, solved = self._solve(
+            self.model, self.ENGINEERS_PHASE_TIME_WITH_LNS if lns else self.ENGINEERS_PHASE_TIME
+        )
+        if not solved:
+            return []
+        assignment = self._get_project_assignment_from_solved_model(solver)
+
+        if lns:
+            assignment = self._improve_with_neighbourhood_search(
+                assignment,
+                solver.ObjectiveValue(),
+                1.0 - self.MANAGERS_PHASE_TIME - self.ENGINEERS_PHASE_TIME_WITH_LNS,
+            )
+        return assignment
+
+    def _improve_with_neighbourhood_search(self, assignment, objective, time_limit):
+        """
+        Improve an assignment with large neighbourhood search.
+
+        Every iteration frees the registrations of a few random projects, keeps everyone else in their project, and
+        re-optimizes the full model from the current assignment. Improvements are kept for the next iteration.
+
+        :param assignment: A dict from registration pk to project, as returned by generate_team_assignment
+        :param objective: The objective value of the assignment
+        :param time_limit: The share of the configured time limit to use for all iterations together
+        :return: The improved assignment
+        """
+        if len(self.projects) <= self.LNS_NEIGHBOURHOOD_SIZE:
+            return assignment
+
+        # The current assignment need not be the representative of its symmetry class, so do not break symmetries
+        self._set_up_model(symmetry_breaking=False)
+        total_time = self.solver_parameters["max_time_in_seconds"] * time_limit
+        iteration_time = min(self.LNS_ITERATION_TIME, total_time)
+        iterations = max(1, int(total_time / iteration_time))
+        rng = random.Random(self.solver_parameters["random_seed"])
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+
+        for iteration in range(iterations):
+            neighbourhood = set(rng.sample(range(len(self.projects)), self.LNS_NEIGHBOURHOOD_SIZE))
+            # Replace the warm start hints with the current assignment, as hinting a variable twice is invalid
+            model = self.model.Clone()
+            model.ClearHints()
+            for pk, (_, variables) in self._assignment_variables().items():
+                current = project_index[assignment[pk].pk]
+                for p, variable in enumerate(variables):
+                    model.AddHint(variable, p == current)
+                if current not in neighbourhood:
+                    model.Add(variables[current] == 1)
+
+            solver, solved = self._solve(model, iteration_time / self.solver_parameters["max_time_in_seconds"])
+            if solved and solver.ObjectiveValue() > objective:
+                assignment = self._get_project_assignment_from_solved_model(solver)
+                objective = solver.ObjectiveValue()
+                self.logger.info(f"Neighbourhood search iteration {iteration} improved objective to {objective:.0f}")
+
+        return assignment
 
     def _get_project_assignment_from_solved_model(self, solver):
         """Convert a solved model to a dict for registrations to assigned projects."""
@@ -109,46 +776,57 @@ class TeamAssignmentGenerator:
             for r in range(len(self.managers)):
                 if solver.BooleanValue(self.assigned_managers[(r, p)]):
                     project_for_registrations[self.managers[r].pk] = self.projects[p]
-                    self.logger.debug(f"Assigned manager \t {self.managers[r].user} \t to \t {self.projects[p]}")
+                    self.logger.debug(
+                        f"Assigned manager \t {self.managers[r].get_full_name()} \t to \t {self.projects[p]}"
+                    )
             for r in range(len(self.engineers)):
                 if solver.BooleanValue(self.assigned_engineers[(r, p)]):
                     project_for_registrations[self.engineers[r].pk] = self.projects[p]
-                    self.logger.debug(f"Assigned engineer \t {self.engineers[r].user} \t to \t {self.projects[p]}")
+                    self.logger.debug(
+                        f"Assigned engineer \t {self.engineers[r].get_full_name()} \t to \t {self.projects[p]}"
+                    )
 
         return project_for_registrations
 
-    def write_csv(self, output, project_for_registrations):
-        """Write the result of the team creation to a csv file."""
+    def write_csv(self, output, project_for_registrations, engine=ENGINE_SOLVER):
+        """Write the result of the team creation, and the engine that produced it, to a csv file."""
         writer = csv.writer(output, delimiter=",", quotechar='"', quoting=csv.QUOTE_ALL)
         writer.writerow(CSV_STRUCTURE)
 
+        # The snapshot has the fields of every registration, group the users in each project
+        members = {}
+        for registration in self.registrations:
+            if registration.pk in project_for_registrations:
+                members.setdefault(project_for_registrations[registration.pk].pk, set()).add(registration.user_id)
+
         registrations = sorted(
-            self.managers + self.engineers,
+            self.registrations,
             key=lambda r: (
                 project_for_registrations[r.pk].name if r.pk in project_for_registrations else "",
-                r.course.name,
-                r.user.get_full_name(),
+                r.course_name,
+                r.get_full_name(),
             ),
         )
 
+        preferred_projects = self.snapshot.preferred_projects
         for registration in registrations:
             project = project_for_registrations.get(registration.pk, None)
-            partners = [
-                Registration.objects.get(pk=reg).user for reg, p in project_for_registrations.items() if p == project
+            partners = members.get(project.pk, set()) if project else set()
+            project_prefs = [
+                preferred_projects.get(registration.preference1_id),
+                preferred_projects.get(registration.preference2_id),
+                preferred_projects.get(registration.preference3_id),
             ]
-            project_prefs = [registration.preference1, registration.preference2, registration.preference3]
-            student_prefs = {
-                registration.partner_preference1_user,
-                registration.partner_preference2_user,
-                registration.partner_preference3_user,
-            }
+            partner_prefs = self.partner_preferences[registration.pk]
+            student_prefs = {user.pk for user in partner_prefs if user is not None}
             writer.writerow(
                 [
-                    registration.user.first_name,
-                    registration.user.last_name,
-                    registration.user.student_number,
-                    registration.course.name,
+                    registration.first_name,
+                    registration.last_name,
+                    registration.student_number,
+                    registration.course_name,
                     project.name if project else "",
+                    engine if project else "",
                     "x" if registration.is_international else "",
                     "x" if registration.available_during_scheduled_timeslot_1 else "",
                     "x" if registration.available_during_scheduled_timeslot_2 else "",
@@ -157,37 +835,91 @@ class TeamAssignmentGenerator:
                     registration.dev_experience,
                     "x" if project in project_prefs or student_prefs.intersection(partners) else "",
                     project_prefs.index(project) + 1 if project in project_prefs else "",
-                    registration.preference1,
-                    registration.preference2,
-                    registration.preference3,
+                    *project_prefs,
                     len(student_prefs.intersection(partners)),
-                    registration.partner_preference1_user,
-                    registration.partner_preference2_user,
-                    registration.partner_preference3_user,
+                    *partner_prefs,
                 ]
             )
 
     def execute_solve_task(self):
-        """Assign each user to a project and store the output in a task."""
-        project_for_registrations = self.generate_team_assignment()
-        if not project_for_registrations:
+        """
+        Assign each user to a project and store the output in a task.
+
+        With a portfolio, every proposal is also stored as a result of the task, with its scores, to compare them.
+        """
+        if self.portfolio_size > 1:
+            portfolio = self.generate_portfolio()
+        else:
+            project_for_registrations = self.generate_team_assignment()
+            portfolio = [(project_for_registrations, None)] if project_for_registrations else []
+        engine = self.ENGINE_SOLVER
+        if self.infeasibility:
+            # The heuristic cannot satisfy the constraints either, so report the conflicting constraints instead
+            self.task.fail = True
+            self.task.fail_message = f"The constraints cannot be satisfied: {'; '.join(self.infeasibility)}."
+            self.task.completed = 1
+            self.task.save()
+            return
+        if not portfolio:
+            self.logger.warning("No solution found by the solver, falling back to the heuristic")
+            project_for_registrations = self.heuristic_assignment()
+            portfolio = [(project_for_registrations, None)] if project_for_registrations else []
+            engine = self.ENGINE_HEURISTIC
+
+        if not portfolio:
             self.logger.error("No solution found")
             self.task.fail = True
         else:
             self.logger.info("Create csv output")
-            output = StringIO()
-            self.write_csv(output, project_for_registrations)
-            self.task.data = output.getvalue()
-            self.task.success_message = "Successfully assigned all users to a project"
+            outputs = []
+            for project_for_registrations, _ in portfolio:
+                output = StringIO()
+                self.write_csv(output, project_for_registrations, engine)
+                outputs.append(output.getvalue())
+            self.task.data = outputs[0]
+            self.task.success_message = f"Successfully assigned all users to a project with the {engine} engine"
+            if len(portfolio) > 1:
+                TaskResult.objects.bulk_create(
+                    TaskResult(
+                        task=self.task,
+                        name=f"Proposal {i}",
+                        data=data,
+                        scores={"objective": scores["objective"], **scores["objectives"]},
+                    )
+                    for i, (data, (_, scores)) in enumerate(zip(outputs, portfolio), start=1)
+                )
         self.task.completed = 1
         self.task.save()
 
     def start_solve_task(self):
-        """Start the automatic creation of teams in a background task."""
+        """Start the automatic creation of teams in a background thread."""
         thread = threading.Thread(target=self.execute_solve_task)
         thread.start()
         return self.task
 
+    @classmethod
+    def start_solve_job(cls, registrations, **generator_options):
+        """
+        Start the automatic creation of teams, in the task worker if it is enabled or else in a background thread.
+
+        With the task worker, the model is built and solved in the worker process instead of the web server process.
+
+        :param registrations: The registrations to assign to the projects of their semester
+        :param generator_options: Keyword arguments for the TeamAssignmentGenerator, which must be JSON serializable
+        apart from the profile
+        :return: The task that reports the progress
+        """
+        if not settings.TASK_WORKER_ENABLED:
+            return cls(registrations, **generator_options).start_solve_task()
+        if generator_options.get("profile") is not None:
+            generator_options["profile"] = generator_options["profile"].pk
+        return enqueue(
+            cls.create_task(),
+            "registrations.team_assignment.run_team_assignment_job",
+            registrations=[registration.pk for registration in registrations],
+            **generator_options,
+        )
+
     # ----------------------- #
     # MODEL CONSTRAINTS
     # ----------------------- #
@@ -198,23 +930,48 @@ class TeamAssignmentGenerator:
         self._engineers_managers_per_project_constraint()
         self._1_not_international_per_project_constraint()
 
+    def _guard(self, constraint, reason):
+        """
+        Make a constraint conditional on an assumption literal, while diagnosing infeasibility.
+
+        :param constraint: The constraint that was added to the model
+        :param reason: A description of the constraint, to explain why the model is infeasible
+        """
+        if self._assumptions is not None:
+            literal = self.model.NewBoolVar(f"assumption_{len(self._assumptions)}")
+            constraint.OnlyEnforceIf(literal)
+            self._assumptions[literal.Index()] = (literal, reason)
+
     def _unique_project_per_registration_constraint(self):
         """Add the constraint that each registration is assigned at least 1 project."""
         for r in range(len(self.managers)):
-            self.model.Add(sum(self.assigned_managers[(r, p)] for p in range(len(self.projects))) == 1)
+            self._guard(
+                self.model.Add(sum(self.assigned_managers[(r, p)] for p in range(len(self.projects))) == 1),
+                f"{self.managers[r].get_full_name()} must be in exactly one project",
+            )
         for r in range(len(self.engineers)):
-            self.model.Add(sum(self.assigned_engineers[(r, p)] for p in range(len(self.projects))) == 1)
+            self._guard(
+                self.model.Add(sum(self.assigned_engineers[(r, p)] for p in range(len(self.projects))) == 1),
+                f"{self.engineers[r].get_full_name()} must be in exactly one project",
+            )
 
     def _engineers_managers_per_project_constraint(self):
         """Add the constraint that each project has the determined amount of engineers and managers."""
         for p in range(len(self.projects)):
-            self.model.Add(
-                sum(self.assigned_managers[(r, p)] for r in range(len(self.managers))) == self.managers_per_project[p]
+            self._guard(
+                self.model.Add(
+                    sum(self.assigned_managers[(r, p)] for r in range(len(self.managers)))
+                    == self.managers_per_project[p]
+                ),
+                f"{self.projects[p].name} must have {self.managers_per_project[p]} managers",
             )
         for p in range(len(self.projects)):
-            self.model.Add(
-                sum(self.assigned_engineers[(r, p)] for r in range(len(self.engineers)))
-                == self.engineers_per_project[p]
+            self._guard(
+                self.model.Add(
+                    sum(self.assigned_engineers[(r, p)] for r in range(len(self.engineers)))
+                    == self.engineers_per_project[p]
+                ),
+                f"{self.projects[p].name} must have {self.engineers_per_project[p]} engineers",
             )
 
     def _1_not_international_per_project_constraint(self):
@@ -226,90 +983,189 @@ class TeamAssignmentGenerator:
             if self.managers[r].is_international:
                 num_internationals += 1
 
+        if not self.not_international_manager_constraint:
+            return
+
         # Do not add the check if it cannot be fulfilled (if the number of not-internationals is too low to put one
         # in each project)
         if len(self.managers) - num_internationals >= len(self.projects):
             for p in range(len(self.projects)):
-                self.model.Add(
-                    sum(
-                        (self.assigned_managers[(r, p)] * (not is_international[r])) for r in range(len(self.managers))
-                    )
-                    >= 1
+                self._guard(
+                    self.model.Add(
+                        sum(
+                            (self.assigned_managers[(r, p)] * (not is_international[r]))
+                            for r in range(len(self.managers))
+                        )
+                        >= 1
+                    ),
+                    f"{self.projects[p].name} must have a not-international manager",
                 )
 
     # ----------------------- #
     # MAXIMIZATION OBJECTIVES
     # ----------------------- #
 
-    def _get_objectives(self):
-        """Get all weighted partial objective functions that are used."""
-        return [
-            (1 * self._project_preference_objective()),
-            (1 * self._partner_preference_objective()),
-            (1 * self._mixed_programming_experience_objective()),
-        ]
+    def _compute_objective_weights(self):
+        """
+        Compute the project and partner preference weights as matrices.
 
-    def _project_preference_objective(self):
+        All weights are computed at once with NumPy from a flat snapshot of the preferences of all registrations, so
+        the objectives only have to visit the nonzero entries:
+        - project_preference_weights[r, p] is the weight of registration r being assigned to project p
+        - partner_preference_weights[r1, r2] is the weight registration r1 gives to being in a project with r2
+        Registrations are indexed in the order of self.registrations.
         """
-        Create partial objective function for project preference in project assignment.
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        registration_index = {registration.user_id: i for i, registration in enumerate(self.registrations)}
+
+        preferred_projects = np.array(
+            [
+                [registration.preference1_id, registration.preference2_id, registration.preference3_id]
+                for registration in self.registrations
+            ],
+            dtype=object,
+        ).reshape(len(self.registrations), 3)
+        preferred_partners = np.array(
+            [self.partner_preferences[registration.pk] for registration in self.registrations], dtype=object
+        ).reshape(len(self.registrations), 3)
+
+        self.project_preference_weights = preference_weight_matrix(
+            preferred_projects, project_index, len(self.projects), project_preference_slot_weights
+        )
+        self.partner_preference_weights = preference_weight_matrix(
+            np.vectorize(lambda user: user.pk if user is not None else None, otypes=[object])(preferred_partners),
+            registration_index,
+            len(self.registrations),
+            partner_preference_slot_weights,
+        )
+        # Preferring yourself does not influence the objective
+        np.fill_diagonal(self.partner_preference_weights, 0)
 
-        We create a dict that contains for each engineer and manager and project, the value of whether that combination
-        is preferred. We then calculate the sum of all fact that are true.
+    # ----------------------- #
+    # SYMMETRY BREAKING
+    # ----------------------- #
 
-        This value is calculated by in such a way that it is prefered to give 2 people their third preference instead
-        of 1 person their first preference. The total value per person is 12, as this is divisible by all possible
-        numbers needed.
+    def _interchangeable_registrations(self):
         """
-        self.logger.info("Creating project preference objective")
+        Get the classes of registrations that can be swapped without changing the constraints or objectives.
 
-        manager_preferred_projects = {}
-        for r in range(len(self.managers)):
-            pref_is_none = [
-                self.managers[r].preference1 is not None,
-                self.managers[r].preference2 is not None,
-                self.managers[r].preference3 is not None,
-            ]
-            num_of_pref = sum(pref_is_none)
-            for p in range(len(self.projects)):
-                if self.managers[r].preference1 == self.projects[p]:
-                    manager_preferred_projects[(r, p)] = (12 // num_of_pref) + any(pref_is_none[1:])
-                elif self.managers[r].preference2 == self.projects[p]:
-                    manager_preferred_projects[(r, p)] = (12 // num_of_pref) + pref_is_none[0] - pref_is_none[2]
-                elif self.managers[r].preference3 == self.projects[p]:
-                    manager_preferred_projects[(r, p)] = (12 // num_of_pref) - any(pref_is_none[:2])
+        Registrations are interchangeable if they follow the same course, have the same internationality, programming
+        experience and project preferences, are not fixed to a project and have no incoming or outgoing partner
+        preferences.
+
+        :return: A list of classes with at least two registrations, as lists of indices in self.registrations
+        """
+        has_partner_preferences = self.partner_preference_weights.any(axis=0) | self.partner_preference_weights.any(
+            axis=1
+        )
+
+        classes = {}
+        for i, registration in enumerate(self.registrations):
+            if has_partner_preferences[i] or registration.pk in self.fixed_assignment:
+                continue
+            key = (
+                registration.course_id,
+                registration.is_international,
+                registration.dev_experience,
+                self.project_preference_weights[i].tobytes(),
+            )
+            classes.setdefault(key, []).append(i)
+        return [members for members in classes.values() if len(members) > 1]
+
+    def _interchangeable_projects(self):
+        """
+        Get the classes of projects that can be swapped without changing the constraints or objectives.
+
+        Projects are interchangeable if nobody listed them as a preference, nobody is fixed to them and they need the
+        same number of managers and engineers.
+
+        :return: A list of classes with at least two projects, as lists of indices in self.projects
+        """
+        preferred = self.project_preference_weights.any(axis=0)
+        fixed_projects = {project.pk for project in self.fixed_assignment.values()}
+
+        classes = {}
+        for p, project in enumerate(self.projects):
+            if preferred[p] or project.pk in fixed_projects:
+                continue
+            classes.setdefault((self.managers_per_project[p], self.engineers_per_project[p]), []).append(p)
+        return [members for members in classes.values() if len(members) > 1]
+
+    def _add_symmetry_breaking(self):
+        """
+        Add lexicographic ordering constraints on the assignment matrix for interchangeable registrations and projects.
+
+        For interchangeable registrations, the assignment vector (row) of an earlier registration must be
+        lexicographically larger, so it is assigned to a project with a lower or equal index. For interchangeable
+        projects, the assignment vector (column) of an earlier project must be lexicographically larger, so its first
+        member comes before the first member of the later project. Both orderings follow the same row-wise order of
+        the matrix, so they can be combined without excluding all optimal solutions.
+        """
+        registration_classes = self._interchangeable_registrations()
+        for members in registration_classes:
+            for i, j in zip(members, members[1:]):
+                self.model.Add(
+                    sum(p * assigned for p, assigned in enumerate(self.assigned[i]))
+                    <= sum(p * assigned for p, assigned in enumerate(self.assigned[j]))
+                )
+
+        project_classes = self._interchangeable_projects()
+        for projects in project_classes:
+            self._add_project_precedence(projects)
+
+        self.logger.info(
+            f"Added symmetry breaking for {len(registration_classes)} classes of registrations and "
+            f"{len(project_classes)} classes of projects"
+        )
+
+    def _add_project_precedence(self, projects):
+        """
+        Order a class of interchangeable projects on their first member.
+
+        A registration can only be assigned to a project of the class if an earlier registration is assigned to the
+        previous project of the class. The 'seen' variables keep track of whether any registration up to the current
+        one is assigned to a project.
+        """
+        seen = {p: None for p in projects}
+        for i, assigned in enumerate(self.assigned):
+            for previous, p in zip(projects, projects[1:]):
+                if seen[previous] is None:
+                    self.model.Add(assigned[p] == 0)
                 else:
-                    manager_preferred_projects[(r, p)] = 0
+                    self.model.AddImplication(assigned[p], seen[previous])
 
-        # Create the objective: engineers must be assigned to the project they prefer
-        engineer_preferred_projects = {}
-        for r in range(len(self.engineers)):
-            pref_is_none = [
-                self.engineers[r].preference1 is not None,
-                self.engineers[r].preference2 is not None,
-                self.engineers[r].preference3 is not None,
-            ]
-            num_of_pref = sum(pref_is_none)
-            for p in range(len(self.projects)):
-                if self.engineers[r].preference1 == self.projects[p]:
-                    engineer_preferred_projects[(r, p)] = (12 // num_of_pref) + any(pref_is_none[1:])
-                elif self.engineers[r].preference2 == self.projects[p]:
-                    engineer_preferred_projects[(r, p)] = (12 // num_of_pref) + pref_is_none[0] - pref_is_none[2]
-                elif self.engineers[r].preference3 == self.projects[p]:
-                    engineer_preferred_projects[(r, p)] = (12 // num_of_pref) - any(pref_is_none[:2])
+            for p in projects:
+                if seen[p] is None:
+                    seen[p] = assigned[p]
                 else:
-                    engineer_preferred_projects[(r, p)] = 0
-
-        objective = sum(
-            manager_preferred_projects[(r, p)] * self.assigned_managers[(r, p)]
-            for p in range(len(self.projects))
-            for r in range(len(self.managers))
-        ) + sum(
-            engineer_preferred_projects[(r, p)] * self.assigned_engineers[(r, p)]
-            for p in range(len(self.projects))
-            for r in range(len(self.engineers))
-        )
+                    now_seen = self.model.NewBoolVar(f"project_{p}_seen_up_to_registration_{i}")
+                    self.model.AddBoolOr([seen[p], assigned[p], now_seen.Not()])
+                    self.model.AddImplication(seen[p], now_seen)
+                    self.model.AddImplication(assigned[p], now_seen)
+                    seen[p] = now_seen
 
-        return objective
+    def _get_objectives(self):
+        """Get all partial objective functions that are used, by name, before they are weighted."""
+        return {
+            "project_preference": self._project_preference_objective(),
+            "partner_preference": self._partner_preference_objective(),
+            "mixed_programming_experience": self._mixed_programming_experience_objective(),
+        }
+
+    def _project_preference_objective(self):
+        """
+        Create partial objective function for project preference in project assignment.
+
+        The objective is the sum of the preference weights of all assignments that are true. Only the nonzero weights
+        of the project preference matrix are added to the objective.
+        """
+        self.logger.info("Creating project preference objective")
+
+        rows, columns = np.nonzero(self.project_preference_weights)
+        return sum(
+            int(self.project_preference_weights[r, p]) * self.assigned[r][p]
+            for r, p in zip(rows.tolist(), columns.tolist())
+        )
 
     def _mixed_programming_experience_objective(self):
         """
@@ -325,9 +1181,9 @@ class TeamAssignmentGenerator:
         - As objective, the negative sum of all the absolute differences is used. This should be considered as
         penalty points: every 'misplaced' person according to the programming-experience-ideal-distribution results
         in a penalty point for the total objective.
-        - To maintain a good balance with other objective functions, we multiply with a weight of 10. This way, the
-        results are normalized to the same range as other objective functions. Of course, the general weight of all
-        objectives can be customized in `_get_objectives()`
+        - To maintain a good balance with other objective functions, the default weight of this objective is 10. This
+        way, the results are normalized to the same range as other objective functions. The weights of all objectives
+        can be customized with a SolverProfile.
         """
         self.logger.info("Creating programming experience objective")
 
@@ -350,15 +1206,7 @@ class TeamAssignmentGenerator:
                 count = self.model.NewIntVar(
                     0, self.engineers_per_project[p], f"experience_{exp}_count_in_project_{p}"
                 )
-                self.model.Add(
-                    count
-                    == sum(
-                        [
-                            self.assigned_engineers[(r, p)] * (programming_experience_for_engineer[r] == exp)
-                            for r in range(len(self.engineers))
-                        ]
-                    )
-                )
+                self.model.Add(count == sum(self.assigned_engineers[(r, p)] for r in engineers_with_exp))
 
                 diff = self.model.NewIntVar(
                     -1 * len(self.projects) * self.engineers_per_project[p],
@@ -373,207 +1221,54 @@ class TeamAssignmentGenerator:
 
             objectives.append(sum([-abs_diff[p] for p in range(len(self.projects))]))
 
-        return 10 * sum(objectives)
+        return sum(objectives)
 
     def _partner_preference_objective(self):
         """
         Create partial objective function for partner preference in project assignment.
 
-        Because we are limited to linear expressions for our  objective functions, we introduce new variables for each
-        pair of registrations, that define the fact whether these two people are assigned to the same project. By
-        adding constraints to the model, we assure the correct boolean value of those 2 variables.
+        Because we are limited to linear expressions for our objective functions, we introduce new variables for
+        pairs of registrations, that define the fact whether these two people are assigned to the same project.
+
+        Only pairs in which at least one of the two people listed the other as a preferred partner can contribute to
+        the objective, so 'together' variables are only created for those pairs. This keeps the model linear in the
+        number of partner preferences, instead of quadratic in the number of registrations.
 
-        Since engineers and managers are assigned and indexed separately, we need to consider 3 separate cases:
-        - an engineer being in the same project as another engineer
-        - a manager being in the same project as another manager
-        - an engineer being in the same project as a manager
+        The 'together' variables are defined with a linear AND encoding on the assignment variables:
+        - together implies that both registrations are assigned to the project
+        - both registrations being assigned to the project implies together
 
-        Then, we define a dict that contains for each of these facts, whether it is preferred by a user or not and we
-        acknowledge a certain weight to that fact. This weight is calculated by dividing the total amount of weight a
-        person gets (12) and dividing it by the amount of preferences it has. Since the 'preferred partner relation'
-        is not symmetric, we consider 4 cases here:
-        - an engineer being in the same project as a preferred fellow engineer
-        - a manager being in the same project as a preferred fellow manager
-        - an engineer being in the same project as a preferred manager
-        - a manager being in the same project as a preferred engineer
+        Every preferred partner that is in the same project is worth a certain weight. This weight is calculated by
+        dividing the total amount of weight a person gets (12) by the amount of preferences it has. Since the
+        'preferred partner relation' is not symmetric, the weight of a pair is the sum of the weights both people
+        give to each other.
 
-        The objective is then formed by the sum of the 'preferredness' of all the true facts for all assigned managers
-        and engineers over the different projects that can be assigned.
+        Managers and engineers are treated alike here, as both can list both managers and engineers as partners.
         """
         self.logger.info("Creating partner preference objective")
 
-        # Set up extra boolean variables for the case: engineer - engineer
-        engineer_together_in_project_with_engineer = {}
-        for e1 in range(len(self.engineers)):
-            for e2 in range(e1, len(self.engineers)):
-                for p in range(len(self.projects)):
-                    engineer_together_in_project_with_engineer[(e1, e2, p)] = self.model.NewBoolVar(
-                        f"engineer_{e1}_together_in_project_{p}_with_engineer_{e2}"
-                    )
-                    engineer_together_in_project_with_engineer[
-                        (e2, e1, p)
-                    ] = engineer_together_in_project_with_engineer[(e1, e2, p)]
-                    self.model.AddMultiplicationEquality(
-                        engineer_together_in_project_with_engineer[(e1, e2, p)],
-                        [self.assigned_engineers[(e1, p)], self.assigned_engineers[(e2, p)]],
-                    )
+        # Calculate the weight of each pair of registrations where at least one side prefers the other
+        pair_weights = np.triu(self.partner_preference_weights + self.partner_preference_weights.T, k=1)
+        rows, columns = np.nonzero(pair_weights)
 
-        # Set up extra boolean variables for the case: manager - manager
-        manager_together_in_project_with_manager = {}
-        for m1 in range(len(self.managers)):
-            for m2 in range(m1, len(self.managers)):
-                for p in range(len(self.projects)):
-                    manager_together_in_project_with_manager[(m1, m2, p)] = self.model.NewBoolVar(
-                        f"manager_{m1}_together_in_project_{p}_with_manager_{m2}"
-                    )
-                    manager_together_in_project_with_manager[(m2, m1, p)] = manager_together_in_project_with_manager[
-                        (m1, m2, p)
-                    ]
-                    self.model.AddMultiplicationEquality(
-                        manager_together_in_project_with_manager[(m1, m2, p)],
-                        [self.assigned_managers[(m1, p)], self.assigned_managers[(m2, p)]],
-                    )
-
-        # Set up extra boolean variables for the case: engineer - manager
-        engineer_together_in_project_with_manager = {}
-        for e in range(len(self.engineers)):
-            for m in range(len(self.managers)):
-                for p in range(len(self.projects)):
-                    engineer_together_in_project_with_manager[(e, m, p)] = self.model.NewBoolVar(
-                        f"engineer_{e}_together_in_project_{p}_with_manager_{m}"
-                    )
-                    self.model.AddMultiplicationEquality(
-                        engineer_together_in_project_with_manager[(e, m, p)],
-                        [self.assigned_engineers[(e, p)], self.assigned_managers[(m, p)]],
-                    )
-
-        # Calculate the preferred partners for the case: engineer - engineer
-        engineer_preferred_partner_engineers = {}
-        for reg in range(len(self.engineers)):
-            for partner in range(len(self.engineers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.engineers[reg].partner_preference1_user,
-                        self.engineers[reg].partner_preference2_user,
-                        self.engineers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    engineer_preferred_partner_engineers[(reg, partner)] = 0
-                else:
-                    engineer_preferred_partner_engineers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.engineers[reg].partner_preference1_user == self.engineers[partner].user
-                            or self.engineers[reg].partner_preference2_user == self.engineers[partner].user
-                            or self.engineers[reg].partner_preference3_user == self.engineers[partner].user
-                        )
-                    )
-
-        # Calculate the preferred partners for the case: manager - manager
-        manager_preferred_partner_managers = {}
-        for reg in range(len(self.managers)):
-            for partner in range(len(self.managers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.managers[reg].partner_preference1_user,
-                        self.managers[reg].partner_preference2_user,
-                        self.managers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    manager_preferred_partner_managers[(reg, partner)] = 0
-                else:
-                    manager_preferred_partner_managers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.managers[reg].partner_preference1_user == self.managers[partner].user
-                            or self.managers[reg].partner_preference2_user == self.managers[partner].user
-                            or self.managers[reg].partner_preference3_user == self.managers[partner].user
-                        )
-                    )
+        # Set up the 'together' variables for the preferred pairs only
+        objective = []
+        for i, j in zip(rows.tolist(), columns.tolist()):
+            for p in range(len(self.projects)):
+                assigned1 = self.assigned[i][p]
+                assigned2 = self.assigned[j][p]
+                together = self.model.NewBoolVar(f"registration_{i}_together_in_project_{p}_with_registration_{j}")
+                self.model.AddBoolAnd([assigned1, assigned2]).OnlyEnforceIf(together)
+                self.model.AddBoolOr([assigned1.Not(), assigned2.Not(), together])
+                objective.append(int(pair_weights[i, j]) * together)
 
-        # Calculate the preferred partners for the case: engineer - manager
-        engineer_preferred_partner_managers = {}
-        for reg in range(len(self.engineers)):
-            for partner in range(len(self.managers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.engineers[reg].partner_preference1_user,
-                        self.engineers[reg].partner_preference2_user,
-                        self.engineers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    engineer_preferred_partner_managers[(reg, partner)] = 0
-                else:
-                    engineer_preferred_partner_managers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.engineers[reg].partner_preference1_user == self.managers[partner].user
-                            or self.engineers[reg].partner_preference2_user == self.managers[partner].user
-                            or self.engineers[reg].partner_preference3_user == self.managers[partner].user
-                        )
-                    )
+        self.logger.info(f"Created partner preference objective for {len(rows)} preferred pairs")
 
-        # Calculate the preferred partners for the case: manager - engineer
-        manager_preferred_partner_engineers = {}
-        for reg in range(len(self.managers)):
-            for partner in range(len(self.engineers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.managers[reg].partner_preference1_user,
-                        self.managers[reg].partner_preference2_user,
-                        self.managers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    manager_preferred_partner_engineers[(reg, partner)] = 0
-                else:
-                    manager_preferred_partner_engineers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.managers[reg].partner_preference1_user == self.engineers[partner].user
-                            or self.managers[reg].partner_preference2_user == self.engineers[partner].user
-                            or self.managers[reg].partner_preference3_user == self.engineers[partner].user
-                        )
-                    )
+        return sum(objective)
 
-        # Calculate the objective
-        objective = (
-            sum(
-                engineer_preferred_partner_engineers[(e1, e2)]
-                * engineer_together_in_project_with_engineer[(e1, e2, p)]
-                for e1 in range(len(self.engineers))
-                for e2 in range(len(self.engineers))
-                for p in range(len(self.projects))
-            )
-            + sum(
-                manager_preferred_partner_managers[(m1, m2)] * manager_together_in_project_with_manager[(m1, m2, p)]
-                for m1 in range(len(self.managers))
-                for m2 in range(len(self.managers))
-                for p in range(len(self.projects))
-            )
-            + sum(
-                engineer_preferred_partner_managers[(e, m)] * engineer_together_in_project_with_manager[(e, m, p)]
-                for e in range(len(self.engineers))
-                for m in range(len(self.managers))
-                for p in range(len(self.projects))
-            )
-            + sum(
-                manager_preferred_partner_engineers[(m, e)] * engineer_together_in_project_with_manager[(e, m, p)]
-                for m in range(len(self.managers))
-                for e in range(len(self.engineers))
-                for p in range(len(self.projects))
-            )
-        )
 
-        return objective
+def run_team_assignment_job(task, registrations, **generator_options):
+    """Create a team assignment in the task worker, for a task queued by TeamAssignmentGenerator.start_solve_job."""
+    if generator_options.get("profile") is not None:
+        generator_options["profile"] = SolverProfile.objects.get(pk=generator_options["profile"])
+    TeamAssignmentGenerator(sorted(registrations), task=task, **generator_options).execute_solve_task()
@@ -14,7 +14,8 @@ from courses.models import Course, Semester
 from projects.models import Project
 
 from registrations.admin import UserAdminProjectFilter, UserAdminSemesterFilter
-from registrations.models import Employee, Registration
+from registrations.models import Employee, Registration, SolverProfile
+from registrations.team_assignment import TeamAssignmentGenerator
 
 User: Employee = get_user_model()
 
@@ -149,6 +150,15 @@ class RegistrationAdminTest(TestCase):
         self.assertContains(response, f'"{self.user.first_name}","{self.user.last_name}","{self.user.student_number}"')
         self.assertEqual(response.status_code, 200)
 
+    def test_registration_csv_export__without_registration(self):
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {ACTION_CHECKBOX_NAME: [self.admin.pk, self.manager.pk], "action": "export_registrations", "index": 0},
+        )
+        lines = response.content.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'"{self.manager.first_name}"'))
+
     def test_registration_csv_export(self):
         response = self.client.post(
             reverse("admin:registrations_employee_changelist"),
@@ -442,6 +452,99 @@ class RegistrationAdminTest(TestCase):
         self.assertEqual(response.status_code, 200)
         mock_thread.assert_called_once()
 
+    def test_download_csv_with_parameters__form(self):
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {
+                ACTION_CHECKBOX_NAME: [self.manager.id, self.user.id],
+                "action": "generate_project_assignment_proposal_with_parameters",
+                "index": 0,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "admin/registrations/solver-parameters.html")
+        self.assertEqual(response.context["form"].initial["max_time_in_seconds"], 180.0)
+
+    @patch("threading.Thread")
+    def test_download_csv_with_parameters__apply(self, mock_thread):
+        logging.disable(logging.CRITICAL)
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {
+                ACTION_CHECKBOX_NAME: [self.manager.id, self.user.id],
+                "action": "generate_project_assignment_proposal_with_parameters",
+                "apply": "1",
+                "num_search_workers": 2,
+                "max_time_in_seconds": 10,
+                "relative_gap_limit": 0.05,
+                "random_seed": 42,
+                "deterministic": "on",
+                "warm_start": "on",
+                "previous_assignment": SimpleUploadedFile("proposal.csv", b"First name", content_type="text/csv"),
+                "strategy": "two_phase",
+                "heuristic_hints": "on",
+            },
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        mock_thread.assert_called_once()
+        generator = mock_thread.call_args.kwargs["target"].__self__
+        self.assertEqual(generator.solver_parameters["num_search_workers"], 2)
+        self.assertTrue(generator.solver_parameters["deterministic"])
+        self.assertTrue(generator.warm_start)
+        self.assertEqual(generator.previous_assignment, "First name")
+        self.assertFalse(generator.fix_assigned)
+        self.assertFalse(generator.symmetry_breaking)
+        self.assertEqual(generator.strategy, TeamAssignmentGenerator.STRATEGY_TWO_PHASE)
+        self.assertTrue(generator.heuristic_hints)
+        self.assertEqual(generator.objective_weights, TeamAssignmentGenerator.DEFAULT_OBJECTIVE_WEIGHTS)
+        self.assertEqual(generator.portfolio_size, 1)
+
+    @patch("threading.Thread")
+    def test_download_csv_with_parameters__apply_profile(self, mock_thread):
+        logging.disable(logging.CRITICAL)
+        profile = SolverProfile.objects.create(name="Partners", partner_preference_weight=4, num_search_workers=3)
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {
+                ACTION_CHECKBOX_NAME: [self.manager.id, self.user.id],
+                "action": "generate_project_assignment_proposal_with_parameters",
+                "apply": "1",
+                "num_search_workers": 2,
+                "max_time_in_seconds": 10,
+                "relative_gap_limit": 0,
+                "random_seed": 0,
+                "strategy": "monolithic",
+                "profile": profile.pk,
+                "portfolio_size": 3,
+            },
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        generator = mock_thread.call_args.kwargs["target"].__self__
+        self.assertEqual(generator.objective_weights["partner_preference"], 4)
+        self.assertEqual(generator.solver_parameters["num_search_workers"], 3)
+        self.assertEqual(generator.solver_parameters["max_time_in_seconds"], 180.0)
+        self.assertEqual(generator.portfolio_size, 3)
+
+    def test_solver_profile_changelist(self):
+        SolverProfile.objects.create(name="Default")
+        response = self.client.get(reverse("admin:registrations_solverprofile_changelist"))
+        self.assertContains(response, "Default")
+
+    def test_download_csv_with_parameters__invalid(self):
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {
+                ACTION_CHECKBOX_NAME: [self.manager.id, self.user.id],
+                "action": "generate_project_assignment_proposal_with_parameters",
+                "apply": "1",
+                "num_search_workers": 0,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors)
+
     def test_download_csv__post_no_registration(self):
         user_without_registration = User.objects.create(
             github_id=1001, github_username="noreg", first_name="No", last_name="Reg", student_number="s1231001"
@@ -488,3 +591,83 @@ class RegistrationAdminTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "All users should have a registration in the same semester.")
+
+    def test_assign_late_registrations(self):
+        logging.disable(logging.CRITICAL)
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {ACTION_CHECKBOX_NAME: [self.manager.pk, self.user.pk], "action": "assign_late_registrations", "index": 0},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "admin/registrations/late-assignment.html")
+        self.assertEqual(response.context["proposal"], [(self.registration2, self.project2)])
+        # Nothing is assigned before the proposal is confirmed
+        self.assertIsNone(self.registration2.project)
+
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {
+                ACTION_CHECKBOX_NAME: [self.manager.pk, self.user.pk],
+                "action": "assign_late_registrations",
+                f"project_{self.registration2.pk}": self.project2.pk,
+                "apply": 1,
+            },
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Successfully assigned 1 registrations to a project.")
+        self.assertEqual(self.registration.project, self.project)
+        self.assertEqual(self.registration2.project, self.project2)
+
+    def test_assign_late_registrations__apply_assigned_in_the_meantime(self):
+        other_semester = Semester.objects.create(year=2000, season=Semester.SPRING)
+        other_project = Project.objects.create(name="Other", slug="other", semester=other_semester)
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {
+                ACTION_CHECKBOX_NAME: [self.manager.pk, self.user.pk],
+                "action": "assign_late_registrations",
+                f"project_{self.registration.pk}": self.project2.pk,
+                f"project_{self.registration2.pk}": other_project.pk,
+                "apply": 1,
+            },
+            follow=True,
+        )
+        self.assertContains(response, "Successfully assigned 0 registrations to a project.")
+        self.assertContains(response, "1 registrations were assigned a project in the meantime and were ignored.")
+        self.assertEqual(self.registration.project, self.project)
+        self.assertIsNone(self.registration2.project)
+
+    def test_assign_late_registrations__all_assigned(self):
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {ACTION_CHECKBOX_NAME: [self.manager.pk], "action": "assign_late_registrations", "index": 0},
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "All selected users already have a project.")
+
+    @patch("registrations.admin.IncrementalTeamAssignment.generate", return_value={})
+    def test_assign_late_registrations__no_assignment(self, mock_generate):
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {ACTION_CHECKBOX_NAME: [self.user.pk], "action": "assign_late_registrations", "index": 0},
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "No project assignment was found for the selected users without a project.")
+        self.registration2.refresh_from_db()
+        self.assertIsNone(self.registration2.project)
+
+    def test_assign_late_registrations__no_registration(self):
+        user_without_registration = User.objects.create(
+            github_id=1001, github_username="noreg", first_name="No", last_name="Reg", student_number="s1231001"
+        )
+
+        response = self.client.post(
+            reverse("admin:registrations_employee_changelist"),
+            {ACTION_CHECKBOX_NAME: [user_without_registration.id], "action": "assign_late_registrations", "index": 0},
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "All users should have a registration.")
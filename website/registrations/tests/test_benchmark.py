@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase
+
+from courses.models import Course, Semester
+
+from registrations.benchmark import SyntheticCohort, benchmark_team_assignment
+from registrations.models import Employee, Registration, SolverProfile
+from registrations.team_assignment import TeamAssignmentGenerator
+
+from tasks.models import Task
+
+User: Employee = get_user_model()
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def test_synthetic_cohort(self):
+        cohort = SyntheticCohort(20, students_per_project=5, manager_ratio=0.25, preference_density=1.0, seed=1)
+        with cohort as registrations:
+            self.assertEqual(len(registrations), 20)
+            self.assertEqual(len([r for r in registrations if r.course == Course.objects.sdm()]), 5)
+            self.assertEqual(cohort.semester.project_set.count(), 4)
+            self.assertTrue(all(r.preference1 and r.partner_preference3 for r in registrations))
+            names = [registration.user.get_full_name() for registration in registrations]
+            usernames = [registration.user.github_username for registration in registrations]
+
+        self.assertFalse(Semester.objects.filter(year=SyntheticCohort.YEAR).exists())
+        self.assertFalse(Registration.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+        with SyntheticCohort(20, students_per_project=5, manager_ratio=0.25, preference_density=1.0, seed=1) as again:
+            self.assertEqual([registration.user.get_full_name() for registration in again], names)
+            self.assertEqual([registration.user.github_username for registration in again], usernames)
+
+    def test_synthetic_cohort__rolled_back_on_error(self):
+        with patch.object(Registration.objects, "bulk_create", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                with SyntheticCohort(10):
+                    pass  # pragma: no cover
+        self.assertFalse(Semester.objects.filter(year=SyntheticCohort.YEAR).exists())
+        self.assertFalse(User.objects.exists())
+
+        with self.assertRaises(ValueError):
+            with SyntheticCohort(10):
+                raise ValueError
+        self.assertFalse(Semester.objects.filter(year=SyntheticCohort.YEAR).exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_synthetic_cohort__parameters(self):
+        cohort = SyntheticCohort(10, experience_distribution=(1, 0, 0))
+        with cohort as registrations:
+            self.assertEqual({registration.dev_experience for registration in registrations}, {1})
+        self.assertEqual(cohort.parameters()["experience_distribution"], [1, 0, 0])
+        self.assertEqual(json.loads(json.dumps(cohort.parameters())), cohort.parameters())
+
+    def test_benchmark_team_assignment(self):
+        with SyntheticCohort(16, students_per_project=4, manager_ratio=0.25) as registrations:
+            result = benchmark_team_assignment(registrations, solver_parameters={"max_time_in_seconds": 5.0})
+
+        self.assertEqual((result["managers"], result["engineers"], result["projects"]), (4, 12, 4))
+        self.assertEqual(result["assigned"], 16)
+        self.assertIn(result["status"], ["OPTIMAL", "FEASIBLE"])
+        self.assertEqual(
+            result["objective"],
+            sum(result["objective_weights"][name] * value for name, value in result["objectives"].items()),
+        )
+        self.assertEqual(len(result["solves"]), 1)
+        self.assertEqual(result["profiles"], [])
+        self.assertGreater(result["variables"], 0)
+        self.assertFalse(Task.objects.exists())
+        json.dumps(result)
+
+    def test_benchmark_team_assignment__infeasible(self):
+        with SyntheticCohort(8, students_per_project=4) as registrations, patch.object(
+            TeamAssignmentGenerator, "diagnose_infeasibility", return_value=["Too few managers"]
+        ):
+            result = benchmark_team_assignment(registrations, profiles=[SolverProfile.objects.create(name="Profile")])
+
+        self.assertEqual((result["status"], result["objective"], result["assigned"]), ("INFEASIBLE", None, 0))
+        self.assertEqual(result["solves"], [])
+        self.assertEqual(result["profiles"][0]["status"], "INFEASIBLE")
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_team_assignment",
+            students=[8, 12],
+            students_per_project=4,
+            max_time=2.0,
+            strategy="two_phase",
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+        results = json.loads(stdout.getvalue())
+        self.assertEqual([result["cohort"]["students"] for result in results], [8, 12])
+        self.assertEqual({result["strategy"] for result in results}, {"two_phase"})
+        self.assertEqual([len(result["solves"]) for result in results], [2, 2])
+
+    def test_command__output_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "benchmark.json")
+            call_command(
+                "benchmark_team_assignment",
+                students=[8],
+                max_time=2.0,
+                no_symmetry_breaking=True,
+                output=output,
+                stderr=StringIO(),
+            )
+            with open(output) as file:
+                self.assertEqual(len(json.load(file)), 1)
+
+    def test_benchmark_team_assignment__profiles(self):
+        profiles = [
+            SolverProfile.objects.create(name="Projects", project_preference_weight=5, max_time_in_seconds=2.0),
+            SolverProfile.objects.create(name="Loose", not_international_manager_constraint=False),
+        ]
+        with SyntheticCohort(16, students_per_project=4, manager_ratio=0.25) as registrations:
+            result = benchmark_team_assignment(
+                registrations, profiles=profiles, solver_parameters={"max_time_in_seconds": 2.0}
+            )
+
+        self.assertEqual([profile["profile"] for profile in result["profiles"]], ["Projects", "Loose"])
+        self.assertEqual(len(result["solves"]), 3)
+        for profile in result["profiles"]:
+            self.assertEqual(profile["assigned"], 16)
+            self.assertEqual(
+                profile["objective"],
+                sum(profile["objective_weights"][name] * value for name, value in profile["objectives"].items()),
+            )
+        json.dumps(result)
+
+    def test_command__profiles(self):
+        SolverProfile.objects.create(name="Experience", mixed_programming_experience_weight=20)
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "benchmark_team_assignment",
+            students=[8],
+            max_time=1.0,
+            profiles=["Experience"],
+            stdout=stdout,
+            stderr=stderr,
+        )
+        self.assertEqual(json.loads(stdout.getvalue())[0]["profiles"][0]["profile"], "Experience")
+        self.assertIn("profile Experience", stderr.getvalue())
+
+    def test_command__unknown_profile(self):
+        with self.assertRaisesMessage(CommandError, "Unknown solver profiles: Missing"):
+            call_command("benchmark_team_assignment", students=[8], profiles=["Missing"], stdout=StringIO())
@@ -0,0 +1,194 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ortools.sat.python import cp_model
+
+from courses.models import Course, Semester
+
+from projects.models import Project
+
+from registrations.heuristic_assignment import HeuristicTeamAssignment
+from registrations.models import Employee, Registration, SolverProfile
+from registrations.team_assignment import TeamAssignmentGenerator
+
+User: Employee = get_user_model()
+
+
+class HeuristicTeamAssignmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.get_or_create_current_semester()
+        cls.projects = [
+            Project.objects.create(name=f"Project {i}", slug=f"project{i}", semester=cls.semester) for i in range(3)
+        ]
+
+        cls.registrations = []
+        for i in range(12):
+            user = User.objects.create_user(
+                first_name=f"User{i}", last_name=f"Test{i}", github_id=i, github_username=f"user{i}"
+            )
+            cls.registrations.append(
+                Registration.objects.create(
+                    user=user,
+                    semester=cls.semester,
+                    course=Course.objects.sdm() if i < 3 else Course.objects.se(),
+                    dev_experience=i % 3 + 1,
+                    is_international=False,
+                )
+            )
+        cls.managers = cls.registrations[:3]
+        cls.engineers = cls.registrations[3:]
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def _generator(self, **kwargs):
+        return TeamAssignmentGenerator(Registration.objects.all(), symmetry_breaking=False, **kwargs)
+
+    def _heuristic(self, generator, **kwargs):
+        generator._compute_objective_weights()
+        return HeuristicTeamAssignment(generator, **kwargs)
+
+    def _assert_valid_assignment(self, assignment):
+        self.assertEqual(len(assignment), 12)
+        for project in self.projects:
+            members = [registration for registration in self.registrations if assignment[registration.pk] == project]
+            self.assertEqual(len([registration for registration in members if registration in self.managers]), 1)
+            self.assertEqual(len([registration for registration in members if registration in self.engineers]), 3)
+
+    def test_generate(self):
+        self._assert_valid_assignment(self._heuristic(self._generator()).generate())
+
+    def test_generate__preferences(self):
+        self.engineers[0].preference1 = self.projects[2]
+        self.engineers[0].save()
+        self.engineers[1].partner_preference1 = str(self.engineers[2].user)
+        self.engineers[1].save()
+
+        assignment = self._heuristic(self._generator()).generate()
+        self._assert_valid_assignment(assignment)
+        self.assertEqual(assignment[self.engineers[0].pk], self.projects[2])
+        self.assertEqual(assignment[self.engineers[1].pk], assignment[self.engineers[2].pk])
+
+    def test_generate__not_international_managers(self):
+        heuristic = self._heuristic(self._generator())
+        self.assertTrue(heuristic.not_international_required)
+        heuristic.generate()
+        self.assertEqual(heuristic.not_international_count, [1, 1, 1])
+
+    def test_generate__too_many_international_managers(self):
+        Registration.objects.filter(pk=self.managers[0].pk).update(is_international=True)
+        heuristic = self._heuristic(self._generator())
+        self.assertFalse(heuristic.not_international_required)
+        self._assert_valid_assignment(heuristic.generate())
+
+    def test_generate__keeps_not_international_manager(self):
+        user = User.objects.create_user(
+            first_name="User12", last_name="Test12", github_id=12, github_username="user12"
+        )
+        Registration.objects.create(
+            user=user, semester=self.semester, course=Course.objects.sdm(), dev_experience=1, is_international=True
+        )
+        heuristic = self._heuristic(self._generator())
+        self.assertTrue(heuristic.not_international_required)
+        heuristic.generate()
+        self.assertTrue(all(heuristic.not_international_count))
+
+        international = heuristic.not_international.index(False)
+        alone = [
+            i
+            for i in range(4)
+            if heuristic.not_international[i]
+            and heuristic.not_international_count[heuristic.project_of[i]] == 1
+            and heuristic.project_of[i] != heuristic.project_of[international]
+        ][0]
+        self.assertFalse(heuristic._can_swap(international, alone))
+        self.assertFalse(heuristic._can_swap(alone, international))
+
+        projects = heuristic.project_of[international], heuristic.project_of[alone]
+        heuristic._swap(international, alone)
+        self.assertEqual((heuristic.project_of[alone], heuristic.project_of[international]), projects)
+
+    def test_generate__fixed_assignment(self):
+        fixed_assignment = {self.engineers[0].pk: self.projects[1], self.managers[0].pk: self.projects[1]}
+        assignment = self._heuristic(self._generator(), fixed_assignment=fixed_assignment).generate()
+        self._assert_valid_assignment(assignment)
+        self.assertEqual(assignment[self.engineers[0].pk], self.projects[1])
+        self.assertEqual(assignment[self.managers[0].pk], self.projects[1])
+
+    def test_generate__fixed_assignment_does_not_fit(self):
+        fixed_assignment = {manager.pk: self.projects[0] for manager in self.managers}
+        self.assertEqual(self._heuristic(self._generator(), fixed_assignment=fixed_assignment).generate(), {})
+
+    def test_generate__no_not_international_manager_left(self):
+        generator = self._generator()
+        generator.managers_per_project = [1, 0, 2]
+        self.assertEqual(self._heuristic(generator).generate(), {})
+
+    def test_generate__no_projects(self):
+        generator = self._generator()
+        generator.projects = []
+        self.assertEqual(self._heuristic(generator).generate(), {})
+
+    def test_local_search__improves_and_tracks_objective(self):
+        for i, engineer in enumerate(self.engineers):
+            engineer.preference1 = self.projects[i % 2]
+            engineer.partner_preference1 = str(self.engineers[-i - 1].user)
+            engineer.save()
+        generator = self._generator()
+
+        heuristic = self._heuristic(generator)
+        heuristic._seed()
+        greedy_objective = heuristic.objective()
+        heuristic._local_search(0)
+        self.assertEqual(heuristic.objective(), greedy_objective)
+        heuristic._local_search(float("inf"))
+        self.assertGreaterEqual(heuristic.objective(), greedy_objective)
+
+        # The incrementally updated objective equals the objective of the same assignment seeded from scratch
+        assignment = {
+            registration.pk: generator.projects[p]
+            for registration, p in zip(generator.registrations, heuristic.project_of)
+        }
+        recomputed = self._heuristic(generator, fixed_assignment=assignment)
+        recomputed._seed()
+        self.assertEqual(heuristic.objective(), recomputed.objective())
+
+    def test_generate__not_international_manager_constraint_disabled(self):
+        profile = SolverProfile.objects.create(name="Loose", not_international_manager_constraint=False)
+        heuristic = self._heuristic(self._generator(profile=profile))
+        self.assertFalse(heuristic.not_international_required)
+        self._assert_valid_assignment(heuristic.generate())
+
+    def test_objective__matches_model(self):
+        self._assert_objective_matches_model()
+
+    def test_objective__matches_model_with_profile(self):
+        profile = SolverProfile.objects.create(
+            name="Profile",
+            project_preference_weight=3,
+            partner_preference_weight=2,
+            mixed_programming_experience_weight=1,
+        )
+        self._assert_objective_matches_model(profile=profile)
+
+    def _assert_objective_matches_model(self, **generator_options):
+        self.engineers[0].preference1 = self.projects[0]
+        self.engineers[0].preference2 = self.projects[1]
+        self.engineers[0].save()
+        self.engineers[3].partner_preference1 = str(self.engineers[4].user)
+        self.engineers[3].partner_preference2 = str(self.managers[1].user)
+        self.engineers[3].save()
+        generator = self._generator(**generator_options)
+
+        heuristic = self._heuristic(generator)
+        assignment = heuristic.generate()
+
+        variables = generator._assignment_variables()
+        for pk, project in assignment.items():
+            generator.model.Add(variables[pk][1][generator.projects.index(project)] == 1)
+        solver = cp_model.CpSolver()
+        self.assertEqual(solver.Solve(generator.model), cp_model.OPTIMAL)
+        self.assertEqual(solver.ObjectiveValue(), heuristic.objective())
@@ -0,0 +1,118 @@
+import logging
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from courses.models import Course, Semester
+
+from projects.models import Project
+
+from registrations.incremental_assignment import IncrementalTeamAssignment
+from registrations.models import Employee, Registration
+
+User: Employee = get_user_model()
+
+
+class IncrementalTeamAssignmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.get_or_create_current_semester()
+        cls.projects = [
+            Project.objects.create(name=f"Project {i}", slug=f"project{i}", semester=cls.semester) for i in range(3)
+        ]
+
+        # One manager and two engineers in every project
+        cls.members = []
+        for i in range(9):
+            registration = cls._registration(i, Course.objects.sdm() if i < 3 else Course.objects.se())
+            registration.project = cls.projects[i % 3]
+            cls.members.append(registration)
+
+        cls.late_manager = cls._registration(9, Course.objects.sdm())
+        cls.late_engineers = [cls._registration(i, Course.objects.se()) for i in range(10, 12)]
+        cls.late = [cls.late_manager, *cls.late_engineers]
+
+    @classmethod
+    def _registration(cls, i, course):
+        user = User.objects.create_user(
+            first_name=f"User{i}", last_name=f"Test{i}", github_id=i, github_username=f"user{i}"
+        )
+        return Registration.objects.create(
+            user=user, semester=cls.semester, course=course, dev_experience=1, is_international=False
+        )
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def _generate(self, registrations=None):
+        return IncrementalTeamAssignment(registrations or self.members + self.late).generate()
+
+    def test_generate(self):
+        assignment = self._generate()
+        self.assertEqual(set(assignment), {registration.pk for registration in self.late})
+        # The projects are topped up evenly, and the current members stay where they are
+        self.assertNotEqual(assignment[self.late_engineers[0].pk], assignment[self.late_engineers[1].pk])
+        for i, member in enumerate(self.members):
+            self.assertEqual(member.project, self.projects[i % 3])
+
+    def test_generate__project_preference(self):
+        self.late_engineers[0].preference1 = self.projects[2]
+        self.late_engineers[0].save()
+        self.assertEqual(self._generate()[self.late_engineers[0].pk], self.projects[2])
+
+    def test_generate__partner_preference_with_member(self):
+        self.late_engineers[0].partner_preference1 = str(self.members[4].user)
+        self.late_engineers[0].save()
+        self.assertEqual(self._generate()[self.late_engineers[0].pk], self.projects[1])
+
+    def test_generate__partner_preference_of_member(self):
+        self.members[5].partner_preference1 = str(self.late_manager.user)
+        self.members[5].save()
+        self.assertEqual(self._generate()[self.late_manager.pk], self.projects[2])
+
+    def test_generate__partner_preference_between_late_registrations(self):
+        self.members[3].project = None
+        self.late_engineers[0].partner_preference1 = str(self.late_engineers[1].user)
+        self.late_engineers[0].save()
+
+        incremental_assignment = IncrementalTeamAssignment(self.members + self.late)
+        self.assertEqual(incremental_assignment.capacities()[Course.objects.se().pk], [2, 1, 1])
+        assignment = incremental_assignment.generate()
+        self.assertEqual(assignment[self.late_engineers[0].pk], self.projects[0])
+        self.assertEqual(assignment[self.late_engineers[1].pk], self.projects[0])
+
+    def test_generate__not_international_manager(self):
+        Registration.objects.filter(pk=self.members[0].pk).update(is_international=True)
+        self.late_manager.preference1 = self.projects[1]
+        self.late_manager.save()
+        late_international_manager = self._registration(12, Course.objects.sdm())
+        late_international_manager.is_international = True
+        late_international_manager.save()
+
+        assignment = self._generate(self.late + [late_international_manager])
+        self.assertEqual(assignment[self.late_manager.pk], self.projects[0])
+
+    def test_generate__too_few_not_international_managers(self):
+        Registration.objects.filter(pk=self.members[0].pk).update(is_international=True)
+        self.late_manager.preference1 = self.projects[1]
+        self.late_manager.is_international = True
+        self.late_manager.save()
+        self.assertEqual(self._generate()[self.late_manager.pk], self.projects[1])
+
+    def test_generate__only_late_registrations_of_the_selection(self):
+        assignment = self._generate([self.members[0], self.late_engineers[0]])
+        self.assertEqual(set(assignment), {self.late_engineers[0].pk})
+
+    def test_generate__no_late_registrations(self):
+        self.assertEqual(self._generate(self.members), {})
+
+    def test_generate__no_projects(self):
+        Project.objects.all().delete()
+        incremental_assignment = IncrementalTeamAssignment(self.late)
+        self.assertEqual(incremental_assignment.capacities()[Course.objects.se().pk], [])
+        self.assertEqual(incremental_assignment.generate(), {})
+
+    @patch.object(IncrementalTeamAssignment, "TIME_LIMIT", 0.0)
+    def test_generate__no_solution(self):
+        self.assertEqual(self._generate(), {})
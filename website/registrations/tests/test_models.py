@@ -156,6 +156,9 @@ class ModelsTest(TestCase):
 
         self.assertIsNone(registration._match_partner_name_to_user("Abcdefg"))
 
+    def test__match_partner_name_to_user__none(self):
+        self.assertIsNone(self.test_registration._match_partner_name_to_user(None))
+
     def test_partner_preference1_user(self):
         self.test_registration._match_partner_name_to_user = MagicMock(return_value=self.test_user)
         self.assertEqual(self.test_registration.partner_preference1_user, self.test_user)
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from courses.models import Course, Semester
+
+from registrations.models import Employee, Registration
+from registrations.partner_matching import PartnerNameResolver
+
+User: Employee = get_user_model()
+
+
+class PartnerNameResolverTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.get_or_create_current_semester()
+        cls.user1 = User.objects.create_user(
+            github_id=1, github_username="user1", first_name="Jan", last_name="Jansen"
+        )
+        cls.user2 = User.objects.create_user(
+            github_id=2, github_username="user2", first_name="Piet", last_name="Pietersen"
+        )
+        cls.user3 = User.objects.create_user(
+            github_id=3, github_username="user3", first_name="Klaas", last_name="Klaassen"
+        )
+        cls.registration = Registration.objects.create(
+            user=cls.user1,
+            course=Course.objects.se(),
+            semester=cls.semester,
+            dev_experience=Registration.EXPERIENCE_BEGINNER,
+            partner_preference1="Piet Pietersen",
+            partner_preference2="klaas klaasen",
+            partner_preference3=None,
+        )
+
+    def setUp(self):
+        self.resolver = PartnerNameResolver(User.objects.all())
+
+    def test_match__exact(self):
+        self.assertEqual(self.resolver.match("Jan Jansen"), self.user1)
+
+    def test_match__typo(self):
+        self.assertEqual(self.resolver.match("Piet Peitersen"), self.user2)
+
+    def test_match__none(self):
+        self.assertIsNone(self.resolver.match(None))
+
+    def test_match__no_match(self):
+        self.assertIsNone(self.resolver.match("Xyzzy"))
+
+    def test_match__cached(self):
+        self.resolver.match("Jan Jansen")
+        self.resolver.users[0] = None
+        self.assertEqual(self.resolver.match("Jan Jansen"), self.user1)
+
+    def test_resolve(self):
+        self.assertDictEqual(
+            self.resolver.resolve([self.registration]), {self.registration.pk: [self.user2, self.user3, None]}
+        )
+
+    def test_resolve__single_query(self):
+        with self.assertNumQueries(1):
+            PartnerNameResolver(User.objects.all()).resolve([self.registration])
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from courses.models import Course, Semester
+
+from projects.models import Project
+
+from registrations.models import Employee, Registration
+from registrations.snapshot import RegistrationSnapshot
+
+User: Employee = get_user_model()
+
+
+class RegistrationSnapshotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.get_or_create_current_semester()
+        cls.project = Project.objects.create(name="Project", slug="project", semester=cls.semester)
+        cls.registrations = []
+        for i in range(3):
+            user = User.objects.create_user(
+                first_name=f"User{i}", last_name=f"Test{i}", github_id=i, github_username=f"user{i}"
+            )
+            cls.registrations.append(
+                Registration.objects.create(
+                    user=user,
+                    semester=cls.semester,
+                    course=Course.objects.se(),
+                    dev_experience=Registration.EXPERIENCE_INTERMEDIATE,
+                    preference2=cls.project if i == 0 else None,
+                    partner_preference1="User2 Test2",
+                )
+            )
+
+    def test_from_registrations(self):
+        registrations = [self.registrations[2], self.registrations[0]]
+        with self.assertNumQueries(1):
+            snapshot = RegistrationSnapshot.from_registrations(registrations)
+        self.assertEqual([record.pk for record in snapshot], [registration.pk for registration in registrations])
+
+        record = snapshot[1]
+        self.assertEqual(record.user_id, self.registrations[0].user_id)
+        self.assertEqual(record.course_name, Course.objects.se().name)
+        self.assertEqual(record.preference2_id, self.project.pk)
+        self.assertEqual(record.partner_preference1, "User2 Test2")
+        self.assertEqual(record.dev_experience, Registration.EXPERIENCE_INTERMEDIATE)
+        self.assertEqual(record.get_full_name(), "User0 Test0")
+        self.assertEqual(repr(record), f"<RegistrationRecord {record.pk}: User0 Test0>")
+
+    def test_from_registrations__pks(self):
+        snapshot = RegistrationSnapshot.from_registrations([self.registrations[1].pk])
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot.column("github_username"), ("user1",))
+
+    def test_read_only(self):
+        record = RegistrationSnapshot.from_registrations(self.registrations)[0]
+        with self.assertRaises(AttributeError):
+            record.dev_experience = Registration.EXPERIENCE_ADVANCED
+        with self.assertRaises(AttributeError):
+            record.__dict__
+
+    def test_preferred_projects(self):
+        snapshot = RegistrationSnapshot(Registration.objects.all())
+        with self.assertNumQueries(1):
+            self.assertEqual(snapshot.preferred_projects, {self.project.pk: self.project})
+            self.assertEqual(str(snapshot.preferred_projects[self.project.pk]), str(self.project))
@@ -1,15 +1,24 @@
+import csv
 import logging
-from unittest.mock import patch
+import threading
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from ortools.sat.python import cp_model
 
 from courses.models import Course, Semester
 
 from projects.models import Project
 
-from registrations.models import Employee, Registration
-from registrations.team_assignment import TeamAssignmentGenerator
+from registrations.models import Employee, Registration, SolverProfile
+from registrations.team_assignment import SolveProgressCallback, TeamAssignmentGenerator
+
+from tasks.jobs import claim_next_task, run_task
+from tasks.models import Task, TaskResult
 
 User: Employee = get_user_model()
 
@@ -271,7 +280,7 @@ class TeamAssignmentTest(TestCase):
                 return_value=0,
             ) as _:
                 with patch("ortools.sat.python.cp_model.CpModel.Add") as mock_add:
-                    assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+                    assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), symmetry_breaking=False)
                     assignment_generator._1_not_international_per_project_constraint()
                     self.assertIsNotNone(assignment_generator.generate_team_assignment())
                     mock_add.assert_not_called()
@@ -286,8 +295,9 @@ class TeamAssignmentTest(TestCase):
                 self.assertIsNotNone(assignment_generator.generate_team_assignment())
                 mock_add.assert_called()
 
+    @patch("registrations.team_assignment.TeamAssignmentGenerator.heuristic_assignment", return_value={})
     @patch("registrations.team_assignment.TeamAssignmentGenerator.generate_team_assignment", return_value=[])
-    def test_solve_task_no_solution(self, generate_mock):
+    def test_solve_task_no_solution(self, generate_mock, heuristic_mock):
         logging.disable(logging.CRITICAL)
         assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
         assignment_generator.execute_solve_task()
@@ -302,28 +312,731 @@ class TeamAssignmentTest(TestCase):
         assignment_generator.execute_solve_task()
         generate_mock.assert_called_once()
         result = (
-            '"First name","Last name","Student number","Course","Project name","Non Dutch",'
+            '"First name","Last name","Student number","Course","Project name","Assignment engine","Non Dutch",'
             '"Available during scheduled timeslot 1","Available during scheduled timeslot 2",'
             '"Available during scheduled timeslot 3","Remarks","Programming experience",'
             '"Git experience","Scrum experience","Management Interest",'
             '"At least one preference fulfilled","Has preferred project","Project preference 1",'
             '"Project preference 2","Project preference 3","In project with preferred students",'
             '"Student preference 1","Student preference 2","Student preference 3"\r\n'
-            '"User2","Test2","","Software Engineering","","","x","x","x","","1","x","1","","","","0","","",""\r\n'
-            '"User4","Test4","","Software Engineering","","","x","x","x","","1","x","1","","","","0","","",""\r\n'
-            '"User5","Test5","","Software Engineering","","","x","x","x","","1","x","1","","","","0","","",""\r\n'
-            '"User7","Test7","","Software Engineering","","","x","x","x","","1","x","1","","","","0","","",""\r\n'
-            '"User8","Test8","","Software Engineering","","","x","x","x","","1","x","1","","","","0","","",""\r\n'
-            '"User3","Test3","","System Development Management","","","x","x","x","","1","x","1","","","","0","","",""'
-            "\r\n"
-            '"User6","Test6","","System Development Management","","","x","x","x","","1","x","1","","","","0","","",""'
-            "\r\n"
-            '"User9","Test9","","System Development Management","","","x","x","x","","1","x","1","","","","0","","",""'
-            "\r\n"
-            '"User1","Test1","","Software Engineering","Project 1","","x","x","x","","1","","","","","","0","","",""'
-            "\r\n"
+            '"User2","Test2","","Software Engineering","","","","x","x","x","","1","x","1","","","","0","",'
+            '"",""\r\n'
+            '"User4","Test4","","Software Engineering","","","","x","x","x","","1","x","1","","","","0","",'
+            '"",""\r\n'
+            '"User5","Test5","","Software Engineering","","","","x","x","x","","1","x","1","","","","0","",'
+            '"",""\r\n'
+            '"User7","Test7","","Software Engineering","","","","x","x","x","","1","x","1","","","","0","",'
+            '"",""\r\n'
+            '"User8","Test8","","Software Engineering","","","","x","x","x","","1","x","1","","","","0","",'
+            '"",""\r\n'
+            '"User3","Test3","","System Development Management","","","","x","x","x","","1","x","1","","","",'
+            '"0","","",""\r\n'
+            '"User6","Test6","","System Development Management","","","","x","x","x","","1","x","1","","","",'
+            '"0","","",""\r\n'
+            '"User9","Test9","","System Development Management","","","","x","x","x","","1","x","1","","","",'
+            '"0","","",""\r\n'
+            '"User1","Test1","","Software Engineering","Project 1","CP-SAT","","x","x","x","","1","","","","","","0",'
+            '"","",""\r\n'
         )
 
         self.assertEqual(assignment_generator.task.data, result)
         self.assertEqual(assignment_generator.task.completed, 1)
         self.assertFalse(assignment_generator.task.fail)
+
+    def test_partner_preference_objective__no_preferences_no_extra_variables(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        statistics = assignment_generator.model_statistics()
+        self.assertFalse(any("together" in variable.name for variable in assignment_generator.model.Proto().variables))
+        self.assertGreater(statistics["variables"], 0)
+        self.assertGreater(statistics["constraints"], 0)
+
+    def test_partner_preference_objective__only_preferred_pairs(self):
+        self.reg1.partner_preference1 = str(self.user2)
+        self.reg1.save()
+        self.reg2.partner_preference1 = str(self.user1)
+        self.reg2.save()
+        self.reg3.partner_preference1 = str(self.user4)
+        self.reg3.save()
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        together = [
+            variable.name for variable in assignment_generator.model.Proto().variables if "together" in variable.name
+        ]
+
+        # Two preferred pairs (reg1/reg2 is counted once), one variable per project
+        self.assertEqual(len(together), 2 * len(assignment_generator.projects))
+
+    def test_solver_parameters(self):
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(),
+            solver_parameters={"num_search_workers": 2, "max_time_in_seconds": 5.0, "log_search_progress": True},
+        )
+        solver = MagicMock()
+        assignment_generator._configure_solver(solver)
+        self.assertEqual(solver.parameters.num_workers, 2)
+        self.assertEqual(solver.parameters.max_time_in_seconds, 5.0)
+        self.assertTrue(solver.parameters.log_search_progress)
+
+    def test_solver_parameters__deterministic(self):
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), solver_parameters={"deterministic": True, "max_time_in_seconds": 5.0}
+        )
+        solver = MagicMock()
+        assignment_generator._configure_solver(solver)
+        self.assertTrue(solver.parameters.interleave_search)
+        self.assertEqual(solver.parameters.max_deterministic_time, 5.0)
+
+    def test_solve_progress_callback(self):
+        task = Task.objects.create(total=1, completed=0)
+        callback = SolveProgressCallback(task)
+        with patch.object(SolveProgressCallback, "WallTime", return_value=0.0), patch.object(
+            SolveProgressCallback, "ObjectiveValue", return_value=5
+        ), patch.object(SolveProgressCallback, "BestObjectiveBound", return_value=20):
+            callback.on_solution_callback()
+            task.refresh_from_db()
+            self.assertEqual(
+                task.progress_message, "Found 1 solutions, the best has objective 5 (bound 20) after 0 seconds"
+            )
+
+        with patch.object(SolveProgressCallback, "WallTime", return_value=0.5), patch.object(
+            SolveProgressCallback, "ObjectiveValue", return_value=8
+        ), patch.object(SolveProgressCallback, "BestObjectiveBound", return_value=20):
+            callback.on_solution_callback()
+            task.refresh_from_db()
+            self.assertEqual(
+                task.progress_message, "Found 1 solutions, the best has objective 5 (bound 20) after 0 seconds"
+            )
+
+        with patch.object(SolveProgressCallback, "WallTime", return_value=2.0), patch.object(
+            SolveProgressCallback, "ObjectiveValue", return_value=10
+        ), patch.object(SolveProgressCallback, "BestObjectiveBound", return_value=20):
+            callback.on_solution_callback()
+            task.refresh_from_db()
+            self.assertEqual(
+                task.progress_message, "Found 3 solutions, the best has objective 10 (bound 20) after 2 seconds"
+            )
+
+    def test_solve_progress_callback__collect_solutions(self):
+        model = cp_model.CpModel()
+        assigned = [[model.NewBoolVar(f"assigned_{r}_{p}") for p in range(2)] for r in range(2)]
+        callback = SolveProgressCallback(
+            Task.objects.create(total=1, completed=0), assigned=assigned, objectives={"project_preference": 3}
+        )
+        with patch.object(SolveProgressCallback, "WallTime", return_value=0.0), patch.object(
+            SolveProgressCallback, "ObjectiveValue", return_value=3.0
+        ), patch.object(SolveProgressCallback, "BestObjectiveBound", return_value=3.0), patch.object(
+            SolveProgressCallback, "Value", side_effect=lambda objective: objective
+        ), patch.object(
+            SolveProgressCallback,
+            "BooleanValue",
+            side_effect=lambda variable: variable.Name() in ["assigned_0_1", "assigned_1_0"],
+        ):
+            callback.on_solution_callback()
+        self.assertEqual(
+            callback.found, [{"assignment": (1, 0), "objective": 3.0, "objectives": {"project_preference": 3}}]
+        )
+
+    def test_solve_progress_callback__database_error(self):
+        callback = SolveProgressCallback(Task.objects.create(total=1, completed=0), interval=0)
+        with patch.object(SolveProgressCallback, "WallTime", return_value=2.0), patch.object(
+            SolveProgressCallback, "ObjectiveValue", side_effect=DatabaseError
+        ):
+            callback.on_solution_callback()
+        self.assertEqual(callback.solutions, 1)
+
+    @patch("registrations.team_assignment.connection")
+    def test_solve_progress_callback__connection(self, connection_mock):
+        """Test that the connection is only closed when the solver calls the callback from one of its threads."""
+        callback = SolveProgressCallback(Task.objects.create(total=1, completed=0), interval=0)
+        with patch.object(SolveProgressCallback, "WallTime", return_value=2.0), patch.object(
+            SolveProgressCallback, "ObjectiveValue", return_value=5
+        ), patch.object(SolveProgressCallback, "BestObjectiveBound", return_value=20):
+            callback.on_solution_callback()
+            connection_mock.close.assert_not_called()
+
+            thread = threading.Thread(target=callback.on_solution_callback)
+            thread.start()
+            thread.join()
+        connection_mock.close.assert_called_once()
+
+    @patch("registrations.team_assignment.connection")
+    def test_generate_team_assignment__one_search_worker(self, connection_mock):
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), solver_parameters={"num_search_workers": 1}
+        )
+        with patch.object(
+            SolveProgressCallback,
+            "on_solution_callback",
+            autospec=True,
+            side_effect=SolveProgressCallback.on_solution_callback,
+        ) as callback_mock:
+            self.assertTrue(assignment_generator.generate_team_assignment())
+        callback_mock.assert_called()
+        connection_mock.close.assert_not_called()
+
+    def test_generate_team_assignment__progress_message(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        assignment_generator.generate_team_assignment()
+        self.assertTrue(assignment_generator.task.progress_message.startswith("Solver finished with status"))
+
+    def test_current_assignment(self):
+        self.reg1.project = self.project2
+        self.assertDictEqual(
+            TeamAssignmentGenerator(Registration.objects.all()).current_assignment(), {self.reg1.pk: self.project2}
+        )
+
+    def test_assignment_from_csv(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        output = StringIO()
+        assignment_generator.write_csv(output, {self.reg1.pk: self.project1, self.reg3.pk: self.project3})
+        csv_data = output.getvalue() + '"Unknown","User","","Software Engineering","Project 1"\r\n'
+
+        self.assertDictEqual(
+            assignment_generator.assignment_from_csv(csv_data),
+            {self.reg1.pk: self.project1, self.reg3.pk: self.project3},
+        )
+
+    def test_warm_start__hints(self):
+        self.reg1.project = self.project2
+        previous_assignment = (
+            '"First name","Last name","Student number","Course","Project name"\r\n'
+            '"User1","Test1","","Software Engineering","Project 1"\r\n'
+            '"User2","Test2","","Software Engineering","Project 3"\r\n'
+        )
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), warm_start=True, previous_assignment=previous_assignment
+        )
+        hint = assignment_generator.model.Proto().solution_hint
+        hinted = {
+            assignment_generator.model.Proto().variables[var].name
+            for var, value in zip(hint.vars, hint.values)
+            if value
+        }
+        variables = assignment_generator._assignment_variables()
+        self.assertSetEqual(
+            hinted,
+            {
+                variables[self.reg1.pk][1][assignment_generator.projects.index(self.project2)].Name(),
+                variables[self.reg2.pk][1][assignment_generator.projects.index(self.project3)].Name(),
+            },
+        )
+
+    def test_warm_start__current_assignment_only(self):
+        self.reg1.project = self.project2
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), warm_start=True)
+        self.assertEqual(sum(assignment_generator.model.Proto().solution_hint.values), 1)
+
+    def test_warm_start__fix_assigned(self):
+        self.reg1.project = self.project2
+        self.reg3.project = self.project3
+        actual_assignment = TeamAssignmentGenerator(
+            Registration.objects.all(), fix_assigned=True
+        ).generate_team_assignment()
+        self.assertEqual(actual_assignment[self.reg1.pk], self.project2)
+        self.assertEqual(actual_assignment[self.reg3.pk], self.project3)
+
+    def test_project_preference_weights(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.preference2 = self.project2
+        self.reg1.preference3 = self.project3
+        self.reg1.save()
+        self.reg2.preference1 = self.project1
+        self.reg2.preference3 = self.project2
+        self.reg2.save()
+        self.reg4.preference1 = self.project3
+        self.reg4.preference2 = self.project3
+        self.reg4.save()
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        weights = assignment_generator.project_preference_weights
+        projects = assignment_generator.projects
+        pks = [registration.pk for registration in assignment_generator.registrations]
+        r1, r2, r4 = (pks.index(reg.pk) for reg in [self.reg1, self.reg2, self.reg4])
+        columns = [projects.index(project) for project in [self.project1, self.project2, self.project3]]
+
+        self.assertEqual([weights[r1, p] for p in columns], [5, 4, 3])
+        self.assertEqual([weights[r2, p] for p in columns], [7, 5, 0])
+        self.assertEqual([weights[r4, p] for p in columns], [0, 0, 7])
+        self.assertEqual(weights.sum(), 5 + 4 + 3 + 7 + 5 + 7)
+
+    def test_partner_preference_weights(self):
+        self.reg1.partner_preference1 = str(self.user2)
+        self.reg1.partner_preference2 = str(self.user1)
+        self.reg1.save()
+        self.reg3.partner_preference1 = str(self.user4)
+        self.reg3.partner_preference2 = str(self.user4)
+        self.reg3.partner_preference3 = "Nobody with this name"
+        self.reg3.save()
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        weights = assignment_generator.partner_preference_weights
+        pks = [registration.pk for registration in assignment_generator.registrations]
+        r1, r2, r3, r4 = (pks.index(reg.pk) for reg in [self.reg1, self.reg2, self.reg3, self.reg4])
+
+        self.assertEqual(weights[r1, r2], 6)
+        self.assertEqual(weights[r1, r1], 0)
+        self.assertEqual(weights[r3, r4], 6)
+        self.assertEqual(weights.sum(), 12)
+
+    def test_symmetry_breaking__interchangeable_classes(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        registration_classes = assignment_generator._interchangeable_registrations()
+        self.assertCountEqual([len(members) for members in registration_classes], [3, 6])
+        self.assertEqual(assignment_generator._interchangeable_projects(), [[0, 1, 2]])
+        self.assertTrue(assignment_generator.generate_team_assignment())
+
+    def test_symmetry_breaking__preferences_break_interchangeability(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.save()
+        self.reg2.partner_preference1 = str(self.user4)
+        self.reg2.save()
+        self.reg3.project = self.project2
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        registration_classes = assignment_generator._interchangeable_registrations()
+        pks = [registration.pk for registration in assignment_generator.registrations]
+        excluded = {pks.index(reg.pk) for reg in [self.reg1, self.reg2, self.reg3, self.reg4]}
+        self.assertCountEqual([len(members) for members in registration_classes], [2, 3])
+        self.assertFalse(excluded.intersection(*registration_classes))
+        self.assertEqual(assignment_generator._interchangeable_projects(), [])
+
+        actual_assignment = assignment_generator.generate_team_assignment()
+        self.assertEqual(actual_assignment[self.reg1.pk], self.project1)
+        self.assertEqual(actual_assignment[self.reg2.pk], actual_assignment[self.reg4.pk])
+
+    def test_symmetry_breaking__disabled(self):
+        with_symmetry_breaking = TeamAssignmentGenerator(Registration.objects.all())
+        without_symmetry_breaking = TeamAssignmentGenerator(Registration.objects.all(), symmetry_breaking=False)
+        self.assertGreater(
+            with_symmetry_breaking.model_statistics()["constraints"],
+            without_symmetry_breaking.model_statistics()["constraints"],
+        )
+
+    def test_symmetry_breaking__same_objective(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.save()
+        self.reg5.partner_preference1 = str(self.user7)
+        self.reg5.save()
+        objectives = []
+        for symmetry_breaking in [True, False]:
+            assignment_generator = TeamAssignmentGenerator(
+                Registration.objects.all(), symmetry_breaking=symmetry_breaking
+            )
+            solver = cp_model.CpSolver()
+            solver.Solve(assignment_generator.model)
+            objectives.append(solver.ObjectiveValue())
+        self.assertEqual(objectives[0], objectives[1])
+
+    def _assert_valid_assignment(self, assignment):
+        self.assertEqual(len(assignment), 9)
+        for project in [self.project1, self.project2, self.project3]:
+            members = [pk for pk, assigned in assignment.items() if assigned == project]
+            self.assertEqual(Registration.objects.filter(pk__in=members, course=self.sdm).count(), 1)
+            self.assertEqual(Registration.objects.filter(pk__in=members, course=self.se).count(), 2)
+
+    def test_two_phase(self):
+        self.reg1.preference1 = self.project2
+        self.reg1.save()
+        self.reg3.preference1 = self.project3
+        self.reg3.save()
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), strategy=TeamAssignmentGenerator.STRATEGY_TWO_PHASE
+        )
+        assignment = assignment_generator.generate_team_assignment()
+        self._assert_valid_assignment(assignment)
+        self.assertEqual(assignment[self.reg1.pk], self.project2)
+        self.assertEqual(assignment[self.reg3.pk], self.project3)
+        self.assertEqual(
+            assignment_generator.registrations, assignment_generator.managers + assignment_generator.engineers
+        )
+
+    def test_two_phase__fix_assigned(self):
+        self.reg1.project = self.project2
+        self.reg3.project = self.project3
+        assignment = TeamAssignmentGenerator(
+            Registration.objects.all(), fix_assigned=True, strategy=TeamAssignmentGenerator.STRATEGY_TWO_PHASE
+        ).generate_team_assignment()
+        self.assertEqual(assignment[self.reg1.pk], self.project2)
+        self.assertEqual(assignment[self.reg3.pk], self.project3)
+
+    def test_two_phase__infeasible(self):
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), strategy=TeamAssignmentGenerator.STRATEGY_TWO_PHASE
+        )
+        with patch.object(assignment_generator, "_solve", return_value=(MagicMock(), False)):
+            self.assertEqual(assignment_generator.generate_team_assignment(), [])
+
+        def solve_managers_only(model, time_limit):
+            if time_limit == TeamAssignmentGenerator.MANAGERS_PHASE_TIME:
+                return solve(model, time_limit)
+            return None, False
+
+        solve = assignment_generator._solve
+        with patch.object(assignment_generator, "_solve", side_effect=solve_managers_only):
+            self.assertEqual(assignment_generator.generate_team_assignment(), [])
+
+    def test_diagnose_infeasibility(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        model = assignment_generator.model
+        self.assertEqual(assignment_generator.diagnose_infeasibility(), [])
+        # The model to solve is left as it was
+        self.assertIs(assignment_generator.model, model)
+        self.assertEqual(len(model.Proto().assumptions), 0)
+
+    def test_diagnose_infeasibility__fixed_assignment(self):
+        for registration in [self.reg1, self.reg2, self.reg4]:
+            registration.project = self.project1
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        infeasibility = assignment_generator.diagnose_infeasibility()
+        self.assertIn("Project 1 must have 2 engineers", infeasibility)
+        self.assertGreaterEqual(len([reason for reason in infeasibility if "must stay in Project 1" in reason]), 2)
+
+    def test_diagnose_infeasibility__not_international_manager(self):
+        Registration.objects.filter(pk=self.reg3.pk).update(is_international=True)
+        self.reg3.project = self.project1
+        self.reg6.project = self.project1
+
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), fix_assigned=True, strategy=TeamAssignmentGenerator.STRATEGY_TWO_PHASE
+        )
+        infeasibility = assignment_generator.diagnose_infeasibility()
+        self.assertIn("Project 1 must have 1 managers", infeasibility)
+        self.assertIn("User3 Test3 must stay in Project 1", infeasibility)
+
+    def test_diagnose_infeasibility__no_projects(self):
+        Project.objects.filter(semester=self.semester).delete()
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        self.assertEqual(assignment_generator.diagnose_infeasibility(), ["There are no projects in the semester"])
+
+    @patch.object(TeamAssignmentGenerator, "DIAGNOSTICS_TIME_LIMIT", 0.0)
+    def test_diagnose_infeasibility__time_limit(self):
+        for registration in [self.reg1, self.reg2, self.reg4]:
+            registration.project = self.project1
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        self.assertEqual(assignment_generator.diagnose_infeasibility(), [])
+
+    def test_generate_team_assignment__infeasible(self):
+        logging.disable(logging.CRITICAL)
+        for registration in [self.reg1, self.reg2, self.reg4]:
+            registration.project = self.project1
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        with patch.object(assignment_generator, "_solve") as solve_mock:
+            self.assertEqual(assignment_generator.generate_team_assignment(), [])
+        solve_mock.assert_not_called()
+        self.assertIn("Project 1 must have 2 engineers", assignment_generator.infeasibility)
+        self.assertEqual(assignment_generator.run_statistics["status"], "INFEASIBLE")
+
+    @patch("registrations.team_assignment.TeamAssignmentGenerator.heuristic_assignment")
+    def test_execute_solve_task__infeasible(self, heuristic_mock):
+        logging.disable(logging.CRITICAL)
+        for registration in [self.reg1, self.reg2, self.reg4]:
+            registration.project = self.project1
+
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        assignment_generator.execute_solve_task()
+        heuristic_mock.assert_not_called()
+        task = Task.objects.get(pk=assignment_generator.task.pk)
+        self.assertTrue(task.fail)
+        self.assertEqual(task.completed, 1)
+        self.assertTrue(task.fail_message.startswith("The constraints cannot be satisfied: "))
+        self.assertIn("Project 1 must have 2 engineers", task.fail_message)
+
+    def test_two_phase_lns(self):
+        assignment = TeamAssignmentGenerator(
+            Registration.objects.all(),
+            solver_parameters={"max_time_in_seconds": 5.0},
+            strategy=TeamAssignmentGenerator.STRATEGY_TWO_PHASE_LNS,
+        ).generate_team_assignment()
+        self._assert_valid_assignment(assignment)
+
+    def test_neighbourhood_search__improves_assignment(self):
+        self.reg1.preference1 = self.project2
+        self.reg1.save()
+        assignment = {
+            self.reg3.pk: self.project1,
+            self.reg1.pk: self.project1,
+            self.reg2.pk: self.project1,
+            self.reg6.pk: self.project2,
+            self.reg4.pk: self.project2,
+            self.reg5.pk: self.project2,
+            self.reg9.pk: self.project3,
+            self.reg7.pk: self.project3,
+            self.reg8.pk: self.project3,
+        }
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), solver_parameters={"max_time_in_seconds": 100.0}
+        )
+        improved = assignment_generator._improve_with_neighbourhood_search(assignment, 0, 1.0)
+        self._assert_valid_assignment(improved)
+        self.assertEqual(improved[self.reg1.pk], self.project2)
+
+    def test_neighbourhood_search__hints(self):
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(),
+            solver_parameters={"max_time_in_seconds": 100.0},
+            warm_start=True,
+            heuristic_hints=True,
+            symmetry_breaking=False,
+        )
+        assignment = assignment_generator.heuristic_assignment()
+        project_index = {project.pk: p for p, project in enumerate(assignment_generator.projects)}
+
+        def score(assignment):
+            return assignment_generator._score(
+                [project_index[assignment[registration.pk].pk] for registration in assignment_generator.registrations]
+            )["objective"]
+
+        objective = score(assignment)
+        improved = assignment_generator._improve_with_neighbourhood_search(assignment, objective, 1.0)
+        self._assert_valid_assignment(improved)
+        self.assertGreaterEqual(score(improved), objective)
+        statuses = {statistics["status"] for statistics in assignment_generator.solve_statistics}
+        self.assertTrue(statuses)
+        self.assertNotIn("MODEL_INVALID", statuses)
+
+    def test_neighbourhood_search__too_few_projects(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        assignment = {}
+        with patch.object(TeamAssignmentGenerator, "LNS_NEIGHBOURHOOD_SIZE", 3):
+            self.assertIs(assignment_generator._improve_with_neighbourhood_search(assignment, 0, 1.0), assignment)
+
+    def test_heuristic_hints(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), heuristic_hints=True)
+        heuristic_assignment = assignment_generator.heuristic_assignment()
+        self._assert_valid_assignment(heuristic_assignment)
+        self.assertEqual(sum(assignment_generator.model.Proto().solution_hint.values), 9)
+        self._assert_valid_assignment(assignment_generator.generate_team_assignment())
+
+    @patch("registrations.team_assignment.TeamAssignmentGenerator.generate_team_assignment", return_value=[])
+    def test_solve_task_heuristic_fallback(self, generate_mock):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        assignment_generator.execute_solve_task()
+        self.assertFalse(assignment_generator.task.fail)
+        self.assertIn("Heuristic", assignment_generator.task.success_message)
+        rows = list(csv.DictReader(StringIO(assignment_generator.task.data)))
+        self.assertEqual({row["Assignment engine"] for row in rows}, {"Heuristic"})
+        self._assert_valid_assignment(assignment_generator.heuristic_assignment())
+
+    @override_settings(TASK_WORKER_ENABLED=True)
+    @patch("threading.Thread")
+    def test_start_solve_job__worker(self, thread_mock):
+        task = TeamAssignmentGenerator.start_solve_job(Registration.objects.all(), fix_assigned=True)
+        thread_mock.assert_not_called()
+        self.assertEqual(task.job, "registrations.team_assignment.run_team_assignment_job")
+        self.assertEqual(task.arguments["fix_assigned"], True)
+        self.assertCountEqual(task.arguments["registrations"], Registration.objects.values_list("pk", flat=True))
+
+        run_task(claim_next_task())
+        task.refresh_from_db()
+        self.assertEqual(task.completed, 1)
+        self.assertFalse(task.fail)
+        self.assertIn("CP-SAT", task.data)
+
+    @override_settings(TASK_WORKER_ENABLED=True)
+    def test_start_solve_job__worker_with_profile(self):
+        profile = SolverProfile.objects.create(name="Fast", max_time_in_seconds=2.0)
+        task = TeamAssignmentGenerator.start_solve_job(Registration.objects.all(), profile=profile)
+        self.assertEqual(task.arguments["profile"], profile.pk)
+
+        with patch("registrations.team_assignment.TeamAssignmentGenerator._apply_profile") as apply_profile_mock:
+            run_task(claim_next_task())
+        apply_profile_mock.assert_called_once_with(profile)
+        task.refresh_from_db()
+        self.assertFalse(task.fail)
+
+    @patch("threading.Thread")
+    def test_start_solve_job__thread(self, thread_mock):
+        task = TeamAssignmentGenerator.start_solve_job(Registration.objects.all())
+        thread_mock.assert_called_once()
+        self.assertEqual(task.job, "")
+
+    def test_write_csv__queries(self):
+        for registration in Registration.objects.all():
+            registration.preference1 = self.project1
+            registration.preference2 = self.project2
+            registration.partner_preference1 = str(self.user1)
+            registration.save()
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        assignment = assignment_generator.generate_team_assignment()
+
+        output = StringIO()
+        with self.assertNumQueries(1):
+            assignment_generator.write_csv(output, assignment)
+
+        rows = list(csv.reader(StringIO(output.getvalue())))[1:]
+        self.assertEqual(len(rows), 9)
+        for row in rows:
+            # The rows end with the project preferences, the number of preferred students in the same project and the
+            # student preferences
+            together_with_user1 = assignment[self.reg1.pk].name == row[4]
+            self.assertEqual(row[-4], "1" if together_with_user1 else "0")
+            self.assertEqual(row[-7], str(self.project1))
+
+    def _assert_objective_is_weighted_sum(self, statistics, weights):
+        self.assertEqual(
+            statistics["objective"], sum(weights[name] * value for name, value in statistics["objectives"].items())
+        )
+
+    def test_profile(self):
+        profile = SolverProfile.objects.create(
+            name="Profile",
+            project_preference_weight=2,
+            partner_preference_weight=3,
+            mixed_programming_experience_weight=0,
+            max_time_in_seconds=5.0,
+            num_search_workers=2,
+            not_international_manager_constraint=False,
+        )
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), profile=profile)
+        self.assertEqual(
+            assignment_generator.objective_weights,
+            {"project_preference": 2, "partner_preference": 3, "mixed_programming_experience": 0},
+        )
+        self.assertEqual(assignment_generator.solver_parameters["max_time_in_seconds"], 5.0)
+        self.assertEqual(assignment_generator.solver_parameters["num_search_workers"], 2)
+        self.assertLess(
+            assignment_generator.model_statistics()["constraints"],
+            TeamAssignmentGenerator(Registration.objects.all()).model_statistics()["constraints"],
+        )
+
+        self._assert_valid_assignment(assignment_generator.generate_team_assignment())
+        self._assert_objective_is_weighted_sum(
+            assignment_generator.solve_statistics[-1], assignment_generator.objective_weights
+        )
+
+    def test_set_objective_weights(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.save()
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        model = assignment_generator.model
+
+        assignment_generator.set_objective_weights({"project_preference": 3})
+        self.assertIs(assignment_generator.model, model)
+        self.assertEqual(
+            assignment_generator.objective_weights,
+            {"project_preference": 3, "partner_preference": 1, "mixed_programming_experience": 10},
+        )
+        assignment_generator.generate_team_assignment()
+        statistics = assignment_generator.run_statistics
+        self.assertIs(statistics, assignment_generator.solve_statistics[-1])
+        self.assertEqual(statistics["objectives"]["project_preference"], 12)
+        self._assert_objective_is_weighted_sum(statistics, assignment_generator.objective_weights)
+
+    def test_evaluate_profiles(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.save()
+        same_constraints = SolverProfile.objects.create(name="Projects", project_preference_weight=5)
+        other_constraints = SolverProfile.objects.create(name="Loose", not_international_manager_constraint=False)
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        model = assignment_generator.model
+
+        [(profile, assignment, statistics)] = assignment_generator.evaluate_profiles([same_constraints])
+        self.assertEqual(profile, same_constraints)
+        self.assertIs(assignment_generator.model, model)
+        self._assert_valid_assignment(assignment)
+        self.assertEqual(statistics["objectives"]["project_preference"], 12)
+        self._assert_objective_is_weighted_sum(statistics, same_constraints.objective_weights())
+
+        [(profile, assignment, statistics)] = assignment_generator.evaluate_profiles([other_constraints])
+        self.assertIsNot(assignment_generator.model, model)
+        self._assert_valid_assignment(assignment)
+        self._assert_objective_is_weighted_sum(statistics, other_constraints.objective_weights())
+        self.assertEqual(len(assignment_generator.solve_statistics), 2)
+
+    def test_evaluate_profiles__infeasible(self):
+        logging.disable(logging.CRITICAL)
+        profiles = [SolverProfile.objects.create(name=f"Profile {i}") for i in range(3)]
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        with patch.object(
+            assignment_generator,
+            "diagnose_infeasibility",
+            side_effect=[["Too few managers"], [], ["Too few managers"]],
+        ):
+            results = assignment_generator.evaluate_profiles(profiles)
+
+        self.assertEqual([statistics["status"] for _, _, statistics in results][::2], ["INFEASIBLE", "INFEASIBLE"])
+        self.assertIn(results[1][2]["status"], ["OPTIMAL", "FEASIBLE"])
+        self.assertEqual([len(assignment) for _, assignment, _ in results], [0, 9, 0])
+        self.assertIsNone(results[2][2]["objective"])
+        self.assertEqual(len(assignment_generator.solve_statistics), 1)
+
+    def test_evaluate_profiles__two_phase(self):
+        profiles = [SolverProfile.objects.create(name=f"Profile {i}", max_time_in_seconds=2.0) for i in range(2)]
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), strategy=TeamAssignmentGenerator.STRATEGY_TWO_PHASE
+        )
+        results = assignment_generator.evaluate_profiles(profiles)
+        self.assertEqual([profile for profile, _, _ in results], profiles)
+        for _, assignment, _ in results:
+            self._assert_valid_assignment(assignment)
+        self.assertEqual(len(assignment_generator.solve_statistics), 4)
+
+    def test_generate_portfolio(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.partner_preference1 = str(self.user2)
+        self.reg1.save()
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), solver_parameters={"max_time_in_seconds": 5.0}, portfolio_size=3
+        )
+        portfolio = assignment_generator.generate_portfolio()
+
+        self.assertEqual(len(portfolio), 3)
+        self.assertEqual(len({tuple(sorted((pk, p.pk) for pk, p in a.items())) for a, _ in portfolio}), 3)
+        objectives = [scores["objective"] for _, scores in portfolio]
+        self.assertEqual(objectives, sorted(objectives, reverse=True))
+        for assignment, scores in portfolio:
+            self._assert_valid_assignment(assignment)
+            self._assert_objective_is_weighted_sum(scores, assignment_generator.objective_weights)
+        # The first proposal is the optimal assignment
+        self.assertEqual(portfolio[0][0][self.reg1.pk], self.project1)
+        self.assertEqual(portfolio[0][0][self.reg2.pk], self.project1)
+
+    def test_generate_portfolio__equivalent_solutions(self):
+        # Without preferences all assignments are equivalent, and symmetry breaking leaves only one of them
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), portfolio_size=3)
+        self.assertEqual(len(assignment_generator.generate_portfolio()), 1)
+
+    def test_generate_portfolio__fewer_solutions(self):
+        for registration, project in zip(
+            Registration.objects.order_by("pk"), [self.project1] * 3 + [self.project2] * 3 + [self.project3] * 3
+        ):
+            registration.project = project
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), fix_assigned=True, symmetry_breaking=False, portfolio_size=3
+        )
+        portfolio = assignment_generator.generate_portfolio()
+        self.assertEqual(len(portfolio), 1)
+        self.assertEqual(assignment_generator.solve_statistics[-1]["status"], "INFEASIBLE")
+
+    @patch("registrations.team_assignment.TeamAssignmentGenerator.generate_team_assignment", return_value=[])
+    def test_generate_portfolio__no_solution(self, generate_mock):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all(), portfolio_size=3)
+        self.assertEqual(assignment_generator.generate_portfolio(), [])
+
+    def test_execute_solve_task__portfolio(self):
+        self.reg1.preference1 = self.project1
+        self.reg1.save()
+        assignment_generator = TeamAssignmentGenerator(
+            Registration.objects.all(), solver_parameters={"max_time_in_seconds": 5.0}, portfolio_size=2
+        )
+        assignment_generator.execute_solve_task()
+
+        task = assignment_generator.task
+        results = list(task.results.all())
+        self.assertEqual([result.name for result in results], ["Proposal 1", "Proposal 2"])
+        self.assertEqual(task.data, results[0].data)
+        self.assertNotEqual(results[0].data, results[1].data)
+        self.assertEqual(
+            set(results[0].scores),
+            {"objective", "project_preference", "partner_preference", "mixed_programming_experience"},
+        )
+        self.assertGreaterEqual(results[0].scores["objective"], results[1].scores["objective"])
+        self.assertEqual(str(results[0]), f"Proposal 1 of task {task.pk}")
+
+    def test_execute_solve_task__single_proposal(self):
+        assignment_generator = TeamAssignmentGenerator(Registration.objects.all())
+        assignment_generator.execute_solve_task()
+        self.assertTrue(assignment_generator.task.data)
+        self.assertFalse(TaskResult.objects.exists())
@@ -3,7 +3,7 @@ from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import path
 
-from tasks.models import Task
+from tasks.models import Task, TaskResult
 
 
 @admin.register(Task)
@@ -26,6 +26,8 @@ class TaskAdmin(admin.ModelAdmin):
                 "completed": task.completed,
                 "total": task.total,
                 "hasData": (not task.fail and task.data is not None and task.data != ""),
+                "message": task.progress_message,
+                "results": task.results.count(),
             }
         )
 
@@ -39,13 +41,34 @@ class TaskAdmin(admin.ModelAdmin):
         response.write(t.data)
         return response
 
+    def task_results(self, request, task):
+        """Compare the results of a Task on their scores."""
+        task = get_object_or_404(Task, pk=task)
+        results = list(task.results.all())
+        score_names = list(dict.fromkeys(name for result in results for name in result.scores))
+        rows = [(result, [result.scores.get(name) for name in score_names]) for result in results]
+        return render(
+            request,
+            "admin/tasks/results.html",
+            {"task": task.pk, "score_names": score_names, "rows": rows, "title": "Compare results"},
+        )
+
+    def task_result_download(self, request, task, result):
+        """Download the data of one of the results of a task."""
+        result = get_object_or_404(TaskResult, pk=result, task=task)
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="proposed-groups-{result.pk}.csv"'
+        response.write(result.data)
+        return response
+
     def task_result(self, request, task):
         """Show result of a Task."""
         task = get_object_or_404(Task, pk=task)
         if task.fail:
             messages.error(
                 request,
-                "Something went wrong while processing the task. Look at the log files for more details.",
+                task.fail_message
+                or "Something went wrong while processing the task. Look at the log files for more details.",
             )
         else:
             messages.success(request, task.success_message)
@@ -75,6 +98,16 @@ class TaskAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.task_result),
                 name="result",
             ),
+            path(
+                "task/<int:task>/results",
+                self.admin_site.admin_view(self.task_results),
+                name="results",
+            ),
+            path(
+                "task/<int:task>/results/<int:result>/download",
+                self.admin_site.admin_view(self.task_result_download),
+                name="result_download",
+            ),
             path(
                 "task/<int:task>/download",
                 self.admin_site.admin_view(self.task_download),
@@ -0,0 +1,102 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from tasks.models import Task
+
+logger = logging.getLogger("tasks")
+
+
+def enqueue(task, job, **arguments):
+    """
+    Queue a job for the task worker.
+
+    :param task: The task to report the progress of the job in
+    :param job: The dotted path of the job function, which is called with the task and the arguments
+    :param arguments: JSON serializable keyword arguments for the job function
+    :return: The task
+    """
+    task.job = job
+    task.arguments = arguments
+    task.save(update_fields=["job", "arguments"])
+    return task
+
+
+def claim_next_task():
+    """
+    Claim the oldest queued task.
+
+    Claiming is a single conditional update, so multiple workers never run the same task.
+
+    :return: The claimed task, or None if there are no queued tasks
+    """
+    for task in Task.objects.exclude(job="").filter(claimed_at__isnull=True).order_by("pk"):
+        now = timezone.now()
+        if Task.objects.filter(pk=task.pk, claimed_at__isnull=True).update(claimed_at=now, heartbeat_at=now):
+            task.refresh_from_db()
+            return task
+    return None
+
+
+def fail_stale_tasks():
+    """
+    Fail the claimed tasks that are not completed, and had no heartbeat for settings.TASK_WORKER_STALE_AFTER seconds.
+
+    Such tasks were claimed by a worker that stopped while running them, for example on a deploy. They are failed
+    instead of queued again, as their job may have been partly done, and their progress page would never finish.
+
+    :return: The number of failed tasks
+    """
+    stale = timezone.now() - timedelta(seconds=settings.TASK_WORKER_STALE_AFTER)
+    failed = (
+        Task.objects.exclude(job="")
+        .filter(fail=False, completed__lt=F("total"))
+        .filter(Q(heartbeat_at__lt=stale) | Q(heartbeat_at__isnull=True, claimed_at__lt=stale))
+        .update(fail=True, completed=F("total"), fail_message="The task worker stopped while running this task.")
+    )
+    if failed:
+        logger.warning(f"Failed {failed} tasks of a task worker that stopped")
+    return failed
+
+
+@contextmanager
+def heartbeat(task):
+    """Update the heartbeat of a task every settings.TASK_WORKER_HEARTBEAT_INTERVAL seconds within this context."""
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(settings.TASK_WORKER_HEARTBEAT_INTERVAL):
+            try:
+                Task.objects.filter(pk=task.pk).update(heartbeat_at=timezone.now())
+            except DatabaseError:
+                logger.warning(f"Could not store the heartbeat of task {task.pk}", exc_info=True)
+            finally:
+                connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_task(task):
+    """Run the job of a claimed task, and mark the task as failed if the job raises an exception."""
+    logger.info(f"Running {task.job} for task {task.pk}")
+    try:
+        with heartbeat(task):
+            import_string(task.job)(task, **(task.arguments or {}))
+    except Exception:
+        logger.exception(f"Running {task.job} for task {task.pk} failed")
+        Task.objects.filter(pk=task.pk).update(fail=True, completed=task.total)
+    finally:
+        close_old_connections()
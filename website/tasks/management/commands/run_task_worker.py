@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import claim_next_task, fail_stale_tasks, run_task
+
+
+class Command(BaseCommand):
+    """Command to run queued tasks outside of the web server."""
+
+    help = "Run queued tasks, such as the automatic team assignment, outside of the web server processes"
+
+    def add_arguments(self, parser):
+        """Add the polling arguments."""
+        parser.add_argument("--once", action="store_true", help="Run the queued tasks and exit instead of polling")
+        parser.add_argument(
+            "--poll-interval", type=float, default=5.0, help="Seconds to wait between checks for new tasks"
+        )
+
+    def handle(self, *args, **options):
+        """Claim and run queued tasks one at a time, and fail the tasks of workers that stopped."""
+        while True:
+            fail_stale_tasks()
+            task = claim_next_task()
+            if task is not None:
+                run_task(task)
+            elif options["once"]:
+                return
+            else:
+                time.sleep(options["poll_interval"])
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="progress_message",
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
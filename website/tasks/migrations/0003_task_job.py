@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0002_task_progress_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="arguments",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="job",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+    ]
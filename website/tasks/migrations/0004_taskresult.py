@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0003_task_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskResult",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100)),
+                ("data", models.TextField()),
+                ("scores", models.JSONField(default=dict)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="results", to="tasks.task"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["pk"],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0004_taskresult"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="fail_message",
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
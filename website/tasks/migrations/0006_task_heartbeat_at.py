@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0005_task_fail_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -8,12 +8,39 @@ class Task(models.Model):
     completed = models.IntegerField(null=True, blank=True)
     fail = models.BooleanField(default=False)
     success_message = models.TextField(null=True, blank=True)
+    fail_message = models.TextField(null=True, blank=True)
     data = models.TextField(null=True, blank=True)
+    progress_message = models.TextField(null=True, blank=True)
     redirect_url = models.CharField(max_length=60)
 
+    # Tasks with a job are run by the task worker, which calls the job function with the task and its arguments
+    job = models.CharField(max_length=200, blank=True, default="")
+    arguments = models.JSONField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Updated by the worker while it runs the job, so tasks of a worker that stopped can be told apart
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         """Show task as string."""
         return (
             f"Task with {self.completed} done out of {self.total} and "
             f"{'failed' if self.fail else ''} with redirect to {self.redirect_url}"
         )
+
+
+class TaskResult(models.Model):
+    """One of several results of a task, which can be compared on their scores and downloaded separately."""
+
+    class Meta:
+        """Meta class for TaskResult."""
+
+        ordering = ["pk"]
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="results")
+    name = models.CharField(max_length=100)
+    data = models.TextField()
+    scores = models.JSONField(default=dict)
+
+    def __str__(self):
+        """Show result as string."""
+        return f"{self.name} of task {self.task_id}"
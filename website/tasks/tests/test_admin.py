@@ -1,12 +1,14 @@
+import json
 from unittest.mock import patch
 
 from django.contrib.admin import AdminSite
+from django.contrib.auth import get_user_model
 from django.http import Http404
 from django.test import RequestFactory, TestCase
 from django.urls import reverse
 
 from tasks.admin import TaskAdmin
-from tasks.models import Task
+from tasks.models import Task, TaskResult
 
 
 class MyTestCase(TestCase):
@@ -29,12 +31,55 @@ class MyTestCase(TestCase):
 
         response = self.task_admin.task_progress(self.request, self.task.id)
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(str(response.content, encoding="utf8"), {"completed": 0, "total": 5, "hasData": False})
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"completed": 0, "total": 5, "hasData": False, "message": None, "results": 0},
+        )
 
     def test_task_progress_data(self):
         response = self.task_admin.task_progress(self.request, self.task_data.id)
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(str(response.content, encoding="utf8"), {"completed": 0, "total": 1, "hasData": True})
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"completed": 0, "total": 1, "hasData": True, "message": None, "results": 0},
+        )
+
+    def test_task_progress_results(self):
+        TaskResult.objects.create(task=self.task_data, name="Proposal 1", data="data1")
+        TaskResult.objects.create(task=self.task_data, name="Proposal 2", data="data2")
+        response = self.task_admin.task_progress(self.request, self.task_data.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["results"], 2)
+
+    def test_task_results(self):
+        TaskResult.objects.create(task=self.task_data, name="Proposal 1", data="data1", scores={"objective": 10})
+        TaskResult.objects.create(
+            task=self.task_data, name="Proposal 2", data="data2", scores={"objective": 8, "partner_preference": 4}
+        )
+        with patch("tasks.admin.render") as render:
+            self.task_admin.task_results(self.request, self.task_data.id)
+        context = render.call_args.args[2]
+        self.assertEqual(context["score_names"], ["objective", "partner_preference"])
+        self.assertEqual([scores for _, scores in context["rows"]], [[10, None], [8, 4]])
+
+    def test_task_results__page(self):
+        User = get_user_model()
+        self.client.force_login(User.objects.create_superuser(github_id=0, github_username="super"))
+        result = TaskResult.objects.create(
+            task=self.task_data, name="Proposal 1", data="data1", scores={"objective": 7}
+        )
+
+        response = self.client.get(reverse("admin:results", args=[self.task_data.id]))
+        self.assertContains(response, "Proposal 1")
+        self.assertContains(response, reverse("admin:result_download", args=[self.task_data.id, result.id]))
+
+    def test_task_result_download(self):
+        result = TaskResult.objects.create(task=self.task_data, name="Proposal 1", data="data1")
+        response = self.task_admin.task_result_download(self.request, self.task_data.id, result.id)
+        self.assertEqual(response.content, b"data1")
+
+        with self.assertRaises(Http404):
+            self.task_admin.task_result_download(self.request, self.task.id, result.id)
 
     def test_task_download_no_data(self):
         with self.assertRaises(Http404):
@@ -66,3 +111,12 @@ class MyTestCase(TestCase):
         self.task_admin.task_result(self.request, self.task.id)
         redirect.asser_called_once_with(self.task.redirect_url)
         error_message.assert_called_once()
+
+    @patch("tasks.admin.messages.error")
+    @patch("tasks.admin.redirect")
+    def test_task_result__fail_message(self, redirect, error_message):
+        self.task.fail = True
+        self.task.fail_message = "The constraints cannot be satisfied: Project 1 must have 2 engineers."
+        self.task.save()
+        self.task_admin.task_result(self.request, self.task.id)
+        error_message.assert_called_once_with(self.request, self.task.fail_message)
@@ -0,0 +1,134 @@
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tasks.jobs import claim_next_task, enqueue, fail_stale_tasks, heartbeat, run_task
+from tasks.models import Task
+
+job_mock = MagicMock()
+
+
+def failing_job(task):
+    raise ValueError
+
+
+def heartbeat_job(task):
+    # Wait for the heartbeat, which is updated from another thread
+    for _ in range(100):
+        if Task.objects.get(pk=task.pk).heartbeat_at != task.heartbeat_at:
+            return
+        time.sleep(0.01)
+    raise AssertionError("No heartbeat")
+
+
+class JobsTest(TestCase):
+    def setUp(self):
+        job_mock.reset_mock()
+        self.task = Task.objects.create(total=1, completed=0, redirect_url="test_url")
+
+    def test_enqueue(self):
+        enqueue(self.task, "tasks.tests.test_jobs.job_mock", value=1)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.job, "tasks.tests.test_jobs.job_mock")
+        self.assertEqual(self.task.arguments, {"value": 1})
+        self.assertIsNone(self.task.claimed_at)
+
+    def test_claim_next_task(self):
+        Task.objects.create(total=1, completed=0, redirect_url="test_url")
+        second = enqueue(Task.objects.create(total=1, completed=0, redirect_url="test_url"), "job")
+        first = enqueue(self.task, "job")
+
+        self.assertEqual(claim_next_task(), first)
+        self.assertIsNotNone(Task.objects.get(pk=first.pk).claimed_at)
+        self.assertIsNotNone(Task.objects.get(pk=first.pk).heartbeat_at)
+        self.assertEqual(claim_next_task(), second)
+        self.assertIsNone(claim_next_task())
+
+    def test_claim_next_task__claimed_by_other_worker(self):
+        enqueue(self.task, "job")
+        with patch("tasks.jobs.Task.objects.exclude") as exclude_mock:
+            exclude_mock.return_value.filter.return_value.order_by.return_value = [self.task]
+            Task.objects.filter(pk=self.task.pk).update(claimed_at="2020-01-01T00:00:00Z")
+            self.assertIsNone(claim_next_task())
+
+    def test_run_task(self):
+        run_task(enqueue(self.task, "tasks.tests.test_jobs.job_mock", value=1))
+        job_mock.assert_called_once_with(self.task, value=1)
+
+    def test_run_task__failure(self):
+        with self.assertLogs("tasks", "ERROR"):
+            run_task(enqueue(self.task, "tasks.tests.test_jobs.failing_job"))
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.fail)
+        self.assertEqual(self.task.completed, 1)
+
+    @override_settings(TASK_WORKER_HEARTBEAT_INTERVAL=0.01)
+    def test_heartbeat__database_error(self):
+        with patch("tasks.jobs.Task.objects.filter", side_effect=DatabaseError), patch("tasks.jobs.logger") as logger:
+            with heartbeat(self.task):
+                time.sleep(0.05)
+        logger.warning.assert_called()
+
+    def test_fail_stale_tasks(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        stale = enqueue(self.task, "job")
+        Task.objects.filter(pk=stale.pk).update(claimed_at=long_ago, heartbeat_at=long_ago)
+        stale_without_heartbeat = enqueue(Task.objects.create(total=1, completed=0), "job")
+        Task.objects.filter(pk=stale_without_heartbeat.pk).update(claimed_at=long_ago)
+        running = enqueue(Task.objects.create(total=1, completed=0), "job")
+        Task.objects.filter(pk=running.pk).update(claimed_at=long_ago, heartbeat_at=timezone.now())
+        completed = enqueue(Task.objects.create(total=1, completed=1), "job")
+        Task.objects.filter(pk=completed.pk).update(claimed_at=long_ago, heartbeat_at=long_ago)
+        queued = enqueue(Task.objects.create(total=1, completed=0), "job")
+
+        with patch("tasks.jobs.logger") as logger:
+            self.assertEqual(fail_stale_tasks(), 2)
+        logger.warning.assert_called_once_with("Failed 2 tasks of a task worker that stopped")
+        for task in [stale, stale_without_heartbeat]:
+            task.refresh_from_db()
+            self.assertTrue(task.fail)
+            self.assertEqual(task.completed, 1)
+            self.assertEqual(task.fail_message, "The task worker stopped while running this task.")
+        for task in [running, completed, queued]:
+            task.refresh_from_db()
+            self.assertFalse(task.fail)
+        self.assertEqual(fail_stale_tasks(), 0)
+
+    def test_run_task_worker__fails_stale_tasks(self):
+        enqueue(self.task, "tasks.tests.test_jobs.job_mock")
+        long_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(pk=self.task.pk).update(claimed_at=long_ago, heartbeat_at=long_ago)
+        call_command("run_task_worker", once=True)
+        job_mock.assert_not_called()
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.fail)
+
+    def test_run_task_worker__once(self):
+        enqueue(self.task, "tasks.tests.test_jobs.job_mock")
+        call_command("run_task_worker", once=True)
+        job_mock.assert_called_once_with(self.task)
+
+    @patch("time.sleep", side_effect=KeyboardInterrupt)
+    def test_run_task_worker__polls(self, sleep_mock):
+        with self.assertRaises(KeyboardInterrupt):
+            call_command("run_task_worker", poll_interval=2)
+        sleep_mock.assert_called_once_with(2)
+
+
+class HeartbeatTest(TransactionTestCase):
+    # The heartbeat is updated from another thread, which only sees committed tasks
+
+    @override_settings(TASK_WORKER_HEARTBEAT_INTERVAL=0.01)
+    def test_run_task__heartbeat(self):
+        task = enqueue(
+            Task.objects.create(total=1, completed=0, redirect_url="test_url"), "tasks.tests.test_jobs.heartbeat_job"
+        )
+        with self.assertNoLogs("tasks", "ERROR"):
+            run_task(claim_next_task())
+        task.refresh_from_db()
+        self.assertFalse(task.fail)